@@ -0,0 +1,242 @@
+"""
+This file benchmarks the execution of test sets on a control flow graph, or the construction of
+the control flow graph of a generated program.
+
+Usage:
+    benchmark.py <source_filepath> <testsets_filepath> [--repeat=<n>]
+    benchmark.py --build=<n> [--repeat=<n>]
+
+Options:
+    -h --help           Show this screen.
+    -r --repeat=<n>     Number of runs for each engine [default: 3].
+    -b --build=<n>      Number of statements of the generated program.
+"""
+from array import array
+from copy import deepcopy
+import gc
+from docopt import docopt
+from json import load
+from time import perf_counter
+
+from model.abstract_syntax_tree import ASTree
+from model.compiler import compile_condition, compile_operation, slot_variable
+from model.control_flow_graph import CompactControlFlowGraph
+from model.error import ExecutionError
+from model.parser import ProgramParser
+from model.tokenizer import Tokenizer
+
+
+def legacy_eval_edge(control_flow_graph, edge, values):
+    """Edge evaluation as it was first implemented: operations work on a deep copy of values"""
+    if control_flow_graph.get_edge_condition(edge).eval(values):
+        return control_flow_graph.get_edge_operation(edge).eval(deepcopy(values))
+    return None
+
+
+def legacy_get_path(control_flow_graph, test_set):
+    """
+    Execution as it was first implemented, kept as a reference: the environment is deep-copied
+    before every operation and the taken edge is evaluated twice.
+    """
+    path = []
+    values = test_set
+    vertex = control_flow_graph.root_vertex
+    path.append(vertex)
+    while vertex != control_flow_graph.end_vertex:
+        for edge in control_flow_graph.get_child_edges(vertex):
+            if legacy_eval_edge(control_flow_graph, edge, values):
+                values = legacy_eval_edge(control_flow_graph, edge, values)
+                break
+        else:
+            raise ExecutionError
+        vertex = control_flow_graph.targets[edge]
+        path.append(vertex)
+    return path
+
+
+def interpreted_get_path(control_flow_graph, test_set):
+    """Execution walking the abstract syntax tree of conditions and operations at every step"""
+    path = []
+    values = deepcopy(test_set)
+    vertex = control_flow_graph.root_vertex
+    path.append(vertex)
+    while vertex != control_flow_graph.end_vertex:
+        for edge in control_flow_graph.get_child_edges(vertex):
+            if control_flow_graph.get_edge_condition(edge).eval(values):
+                control_flow_graph.get_edge_operation(edge).eval(values)
+                break
+        else:
+            raise ExecutionError
+        vertex = control_flow_graph.targets[edge]
+        path.append(vertex)
+    return path
+
+
+def compile_step(control_flow_graph):
+    """
+    Returns the execution of a test set one edge at a time: the guard and the operation of each
+    edge are compiled python functions, working on the slot environment of the test set. The false
+    edge of a decision is taken without testing its guard.
+    """
+    variable = slot_variable(control_flow_graph.slots)
+    conditions = [
+        compile_condition(condition, variable) for condition in control_flow_graph.condition_nodes
+    ]
+    operations = [
+        compile_operation(operation, variable) for operation in control_flow_graph.operation_nodes
+    ]
+    false_edges = set(control_flow_graph.false_edges)
+    # (compiled condition, compiled operation, target) of the edges leaving each vertex
+    successors = [
+        tuple(
+            (
+                conditions[control_flow_graph.condition_ids[edge]]
+                if edge not in false_edges else lambda values: True,
+                operations[control_flow_graph.operation_ids[edge]],
+                control_flow_graph.targets[edge],
+            )
+            for edge in control_flow_graph.get_child_edges(vertex)
+        )
+        for vertex in range(len(control_flow_graph.vertices))
+    ]
+
+    def step(test_set):
+        path = array('i')
+        values = control_flow_graph.to_environment(test_set)
+        vertex = control_flow_graph.root_vertex
+        path.append(vertex)
+        while vertex != control_flow_graph.end_vertex:
+            for condition, operation, target in successors[vertex]:
+                if condition(values):
+                    operation(values)
+                    break
+            else:
+                raise ExecutionError
+            vertex = target
+            path.append(vertex)
+        return path
+
+    return step
+
+
+def one_by_one(get_path):
+    """Returns the engine running get_path on each test set"""
+    return lambda test_sets: [get_path(test_set) for test_set in test_sets]
+
+
+def get_engines(control_flow_graph):
+    """
+    Returns the execution engines to compare, the first one is the reference. An engine takes the
+    test sets list and returns their paths.
+    """
+    engines = [
+        ('legacy', one_by_one(lambda test_set: legacy_get_path(control_flow_graph, test_set))),
+        ('interpreted', one_by_one(
+            lambda test_set: interpreted_get_path(control_flow_graph, test_set)
+        )),
+        ('step', one_by_one(compile_step(control_flow_graph))),
+        ('get_path', one_by_one(control_flow_graph.get_path)),
+        ('get_all_paths', control_flow_graph.get_all_paths),
+    ]
+    executor = control_flow_graph.get_batch_executor()
+    if executor is not None:
+        # every test set is run by the batch, test sets with the same key included
+        engines.append(('batch', executor.get_all_paths))
+    return engines
+
+
+def run_engine(engine, test_sets, repeat):
+    """Returns the best time over repeat runs and the paths of the last run"""
+    best_time = None
+    for _ in range(repeat):
+        start = perf_counter()
+        paths = [list(path) for path in engine(test_sets)]
+        elapsed = perf_counter() - start
+        best_time = elapsed if best_time is None else min(best_time, elapsed)
+    return best_time, paths
+
+
+def generate_program(statements):
+    """
+    Returns the source code of a program made of the given number of statements: assignments,
+    conditionals and loops in turn, labelled in increasing order
+    """
+    lines = []
+    label = 0
+    for index in range(statements):
+        if index % 3 == 0:
+            lines.append('{} : X := ( X + 1 )'.format(label + 1))
+            label += 1
+        elif index % 3 == 1:
+            lines.append('if {} : ( X < Y ) then {} : Y := ( Y - 1 ) else {} : skip'.format(
+                label + 1, label + 2, label + 3
+            ))
+            label += 3
+        else:
+            lines.append('while {} : ( Y > X ) do {} : Y := ( Y - 1 )'.format(
+                label + 1, label + 2
+            ))
+            label += 2
+    return ' ;\n'.join(lines)
+
+
+def get_build_stages():
+    """Returns the stages building the compact control flow graph from the source code"""
+    def build(root_node):
+        control_flow_graph = root_node.to_control_flow_graph()
+        control_flow_graph.build_index()
+        return control_flow_graph
+
+    return [
+        ('tokenize', Tokenizer.tokenize),
+        ('parse', lambda tokens: ProgramParser(tokens).parse()),
+        ('build', build),
+        ('freeze', CompactControlFlowGraph),
+    ]
+
+
+def benchmark_build(statements, repeat):
+    """
+    Prints the time of each stage for programs of statements / 8, statements / 4,
+    statements / 2 and statements statements: the time per statement shows whether a stage is
+    linear. As in timeit, the garbage collector is disabled while a stage runs, its full
+    collections would otherwise grow with the number of objects built before.
+    """
+    for size in (statements // 8, statements // 4, statements // 2, statements):
+        result = generate_program(max(1, size))
+        for name, stage in get_build_stages():
+            source, best_time = result, None
+            for _ in range(repeat):
+                gc.disable()
+                try:
+                    start = perf_counter()
+                    result = stage(source)
+                    elapsed = perf_counter() - start
+                finally:
+                    gc.enable()
+                best_time = elapsed if best_time is None else min(best_time, elapsed)
+            print('{:<14} {:>8} statements {:>10.4f}s  {:.2f}us/statement'.format(
+                name, size, best_time, best_time * 1e6 / max(1, size)
+            ))
+
+
+if __name__ == '__main__':
+    args = docopt(__doc__, version='The CCM Project 0.1')
+    repeat = int(args['--repeat'])
+    if args['--build'] is not None:
+        benchmark_build(int(args['--build']), repeat)
+        raise SystemExit
+
+    graph = ASTree(args['<source_filepath>']).to_control_flow_graph().freeze()
+    with open(args['<testsets_filepath>'], 'r') as test_sets_file:
+        test_sets = load(test_sets_file)
+
+    reference_time, reference_paths = None, None
+    for name, engine in get_engines(graph):
+        elapsed, paths = run_engine(engine, test_sets, repeat)
+        if reference_paths is None:
+            reference_time, reference_paths = elapsed, paths
+        elif paths != reference_paths:
+            raise ExecutionError('{} does not produce the reference paths'.format(name))
+        print('{:<14} {:>10.4f}s  x{:.1f}'.format(name, elapsed, reference_time / elapsed))
+    print('{} steps executed per engine run'.format(sum(len(path) for path in reference_paths)))
@@ -2,30 +2,40 @@
 This file will be the cli for using our code.
 
 Usage:
-    coverage.py <source_filepath> <testsets_filepath> [--kTC=<k>] [--iTB=<i>]
+    coverage.py <source_filepath> <testsets_filepath> [--kTC=<k>] [--iTB=<i>] [--jobs=<n>]
+                [--cache-dir=<dir>] [--sample=<n>] [--tu-paths]
 
 Options:
     -h --help      Show this screen.
     -k --kTC=<k>   Length of k-path to check [default: 2].
     -i --iTB=<i>   Length of i-loop to check [default: 1].
+    -j --jobs=<n>  Number of processes running the test sets [default: 1].
+    -c --cache-dir=<dir>  Directory caching the control flow graphs of the programs.
+    -s --sample=<n>  Number of not covered paths shown by kTC and iTB [default: 10].
+    -p --tu-paths  List the def-clear paths of each TU pair (exhaustive, for debugging).
 """
-from copy import deepcopy
 from docopt import docopt
-from json import load
 
-from model.abstract_syntax_tree import ASTree
-from model.criteria import TA, TD, kTC, TC, iTB, TDef, TU
+from model.cache import load_control_flow_graph
+from model.criteria import TA, TD, kTC, TC, iTB, TDef, TU, check_criterias
+from model.testsets import iter_test_sets
 
 
 if __name__ == '__main__':
     args = docopt(__doc__, version='The CCM Project 0.1')
-    criterias = [TA(), TD(), kTC(int(args['--kTC'])), iTB(int(args['--iTB'])), TDef(), TU(), TC()]
-
-    graph = ASTree(args['<source_filepath>']).to_control_flow_graph()
-    with open(args['<testsets_filepath>'], 'r') as test_sets_file:
-        test_sets = load(test_sets_file)
+    sample_size = int(args['--sample'])
+    criterias = [
+        TA(), TD(), kTC(int(args['--kTC']), sample_size), iTB(int(args['--iTB']), sample_size),
+        TDef(), TU(args['--tu-paths']), TC()
+    ]
 
+    graph = load_control_flow_graph(args['<source_filepath>'], args['--cache-dir'])
+    # test sets (a JSON array or JSON Lines) are read lazily and run once, the trace of each test
+    # set is given to all criteria
+    test_sets = iter_test_sets(args['<testsets_filepath>'])
+    session = check_criterias(criterias, graph, test_sets, int(args['--jobs']))
+    # the test sets given several times, run only once
+    print(session.memo)
     for criteria in criterias:
-        criteria.check(graph, deepcopy(test_sets))
         print()
         print(criteria)
@@ -1,14 +1,13 @@
-from copy import deepcopy
-from json import load
 from os import path
 
 from model.abstract_syntax_tree import ASTree
 from model.criteria import TA, TD, kTC, iTB, TDef, TU, TC
+from model.testsets import iter_test_sets
+from model.trace import TraceStore
 
 
 def check_criterias(criterias, control_flow_graph, test_sets_path):
-    with open(test_sets_path, 'r') as test_sets_file:
-        test_sets = load(test_sets_file)
+    test_sets = list(iter_test_sets(test_sets_path))
 
     print('Comparasion between criteria \'{}\' and \'{}\' for program {} with test_sets {}'.format(
         criterias[0].__repr__(),
@@ -17,8 +16,9 @@ def check_criterias(criterias, control_flow_graph, test_sets_path):
         test_sets
     ))
 
+    traces = TraceStore(control_flow_graph, test_sets)
     for criteria in criterias:
-        criteria.check(control_flow_graph, deepcopy(test_sets))
+        criteria.check_traces(traces)
         print(criteria, '\n')
 
 
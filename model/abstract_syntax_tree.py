@@ -14,17 +14,13 @@ class ASTree(object):
 
     def __init__(self, file_path):
         """Create the abstract syntax tree from the given filepath"""
-        # Loading raw content from file path
+        # Source code file path
         self.program_file_path = file_path
 
+        # Tokenize program, comments, ' ' and \t are skipped while reading the file
         with open(file_path, 'r') as program_file:
-            self.raw_program = program_file.read()
-
-        # Clearing raw content from comments, ' ' and \t
-        self.cleared_program = '\n'.join(Tokenizer.clear(self.raw_program.strip().split('\n')))
-
-        # Tokenize program
-        self.tokenized_program = Tokenizer.tokenize(self.cleared_program)
+            self.tokens = list(Tokenizer.iter_tokens(program_file))
+        self.tokenized_program = [token[1] for token in self.tokens]
         if not self.is_well_formed():
             raise ParsingError
 
@@ -39,12 +35,12 @@ class ASTree(object):
         pile = []
         for token in self.tokenized_program:
             if Token.is_opening_bracket(token):
-                pile = [token] + pile
+                pile.append(token)
             elif Token.is_closing_bracket(token):
                 if pile == []:
                     return False
-                elif token == Token.opposite_bracket(pile[0]):
-                    pile = pile[1:]
+                elif token == Token.opposite_bracket(pile[-1]):
+                    pile.pop()
                 else:
                     return False
         return pile == []
@@ -61,6 +57,7 @@ class ASTree(object):
         """Returns the cover graph from this abstract syntax tree."""
         control_flow_graph = self.root_node.to_control_flow_graph()
         control_flow_graph.name = self.program_file_path
+        control_flow_graph.build_index()
         return control_flow_graph
 
     def eval(self, env={}):
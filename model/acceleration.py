@@ -0,0 +1,235 @@
+"""
+Autors: Yoann Gauthier and Thibaut Seys
+Date: 18/10/2026
+
+This file defines the acceleration of loops whose iterations only translate the variables, the
+number of iterations being computed in closed form instead of running them.
+"""
+# model.nodes imports model.control_flow_graph which imports this module: the modules are
+# imported as a whole, their names being read when they are used
+from model import nodes
+
+
+class NotAffine(Exception):
+    """Raised when a cycle can not be accelerated: an expression is not affine in the iteration"""
+    pass
+
+
+# Sets of iterations are lists of disjoint (first, last) intervals in increasing order, last
+# being None for an interval without end. Iterations are numbered from 0.
+ALL_ITERATIONS = [(0, None)]
+NO_ITERATION = []
+
+
+def solve_nonpositive(a, b):
+    """Returns the iterations j for which a + b * j <= 0"""
+    if b == 0:
+        return ALL_ITERATIONS if a <= 0 else NO_ITERATION
+    if b > 0:
+        last = -a // b
+        return [(0, last)] if last >= 0 else NO_ITERATION
+    return [(max(0, -(a // b)), None)]
+
+
+def complement(iterations):
+    to_return = []
+    first = 0
+    for start, last in iterations:
+        if start > first:
+            to_return.append((first, start - 1))
+        if last is None:
+            return to_return
+        first = last + 1
+    to_return.append((first, None))
+    return to_return
+
+
+def intersection(left, right):
+    to_return = []
+    for left_first, left_last in left:
+        for right_first, right_last in right:
+            first = max(left_first, right_first)
+            if left_last is None:
+                last = right_last
+            elif right_last is None:
+                last = left_last
+            else:
+                last = min(left_last, right_last)
+            if last is None or first <= last:
+                to_return.append((first, last))
+    return sorted(to_return)
+
+
+def union(left, right):
+    return complement(intersection(complement(left), complement(right)))
+
+
+def get_prefix_length(iterations):
+    """Returns the number of iterations from 0 on which are in iterations, None if all are"""
+    if not iterations or iterations[0][0] != 0:
+        return 0
+    last = iterations[0][1]
+    return None if last is None else last + 1
+
+
+def meets(iterations, count):
+    """Checks if one of the iterations 0 to count - 1 is in iterations"""
+    return bool(iterations) and iterations[0][0] < count
+
+
+class AffineCycle(object):
+    """
+    A cycle of a compact control flow graph, from a loop vertex back to it, taken from a given
+    environment. Along the cycle, each value is an affine function a + b * j of the iteration j,
+    stored as the (a, b) pair: the cycle can be accelerated if every iteration adds the same
+    amount to each variable. Guards and conditions are then true on sets of iterations, computed
+    exactly with integers.
+    + properties:
+        - steps: for each vertex of the cycle, the edges whose guard is tested and the taken edge
+    + methods:
+        - accelerate: returns the number of iterations which can be skipped and the values taken
+          by the conditions of the tested guards over those iterations
+    """
+    # solutions of the comparisons (left - right) <comparator> 0, a + b * j being left - right
+    comparators = {
+        '<': lambda a, b: solve_nonpositive(a + 1, b),
+        '<=': lambda a, b: solve_nonpositive(a, b),
+        '>': lambda a, b: solve_nonpositive(1 - a, -b),
+        '>=': lambda a, b: solve_nonpositive(-a, -b),
+        '=': lambda a, b: intersection(solve_nonpositive(a, b), solve_nonpositive(-a, -b)),
+    }
+
+    def __init__(self, control_flow_graph, cycle):
+        self.control_flow_graph = control_flow_graph
+        self.steps = self._get_steps(cycle)
+
+    def _get_steps(self, cycle):
+        """Returns the (tested edges, taken edge) of each vertex, None if an edge is ambiguous"""
+        graph = self.control_flow_graph
+        steps = []
+        for index, vertex in enumerate(cycle):
+            target = cycle[(index + 1) % len(cycle)]
+            edges = list(graph.get_child_edges(vertex))
+            taken = [
+                position for position, edge in enumerate(edges) if graph.targets[edge] == target
+            ]
+            if len(taken) != 1:
+                return None
+            tested = edges[:taken[0] + 1]
+            condition = graph.get_edge_condition(tested[0])
+            if len(edges) == 1 and isinstance(condition, nodes.BooleanNode) and condition.eval({}):
+                # a single unconditional edge is taken without testing its guard
+                tested = []
+            steps.append((tested, edges[taken[0]]))
+        return steps
+
+    def accelerate(self, environment):
+        """
+        Returns (count, conditions): count is the number of iterations of the cycle, at least
+        two, which follow the same edges from environment (the slot environment at the loop
+        vertex), conditions the (atom id, value) pairs of the conditions of the tested guards
+        over these iterations. environment is updated to the values after count iterations.
+        Returns None, without changing environment, if the cycle can not be accelerated.
+        """
+        if self.steps is None:
+            return None
+        start = [(value, 0) if type(value) is int else None for value in environment]
+        try:
+            # one concrete iteration gives the translation of each variable, which is checked by
+            # running the cycle with the values of any iteration j
+            end = self._run(start)[0]
+            start = [
+                (value[0], end[slot][0] - value[0]) if value is not None else None
+                for slot, value in enumerate(start)
+            ]
+            end, required, atoms, assigned = self._run(start)
+        except NotAffine:
+            return None
+        for slot in assigned:
+            if start[slot] is not None and end[slot] != (sum(start[slot]), start[slot][1]):
+                return None
+
+        count = None
+        for iterations in required:
+            length = get_prefix_length(iterations)
+            if length is not None and (count is None or length < count):
+                count = length
+        if count is None or count < 2:
+            # the cycle never ends, or accelerating it would not skip anything: it is run as usual
+            return None
+        conditions = set()
+        for atom, iterations in atoms:
+            if meets(iterations, count):
+                conditions.add((atom, True))
+            if meets(complement(iterations), count):
+                conditions.add((atom, False))
+        for slot in assigned:
+            a, b = end[slot]
+            environment[slot] = a + b * (count - 1)
+        return count, conditions
+
+    def _run(self, start):
+        """
+        Runs the cycle on affine values, returns the values at the end of the iteration, the sets
+        of iterations on which each tested guard takes the value it took in the cycle, the
+        (atom id, iterations on which it is true) pairs and the assigned slots
+        """
+        graph = self.control_flow_graph
+        values = list(start)
+        required = []
+        atoms = []
+        assigned = set()
+        for tested, taken in self.steps:
+            for edge in tested:
+                iterations = self._get_iterations(graph.get_edge_condition(edge), values)
+                required.append(iterations if edge == taken else complement(iterations))
+                for atom in graph.edge_atoms[edge]:
+                    atoms.append((atom, self._get_iterations(graph.atoms[atom], values)))
+            operation = graph.get_edge_operation(taken)
+            if isinstance(operation, nodes.AssignmentNode):
+                slot = graph.slots[operation.left_expression.expression]
+                values[slot] = self._get_value(operation.right_expression, values)
+                assigned.add(slot)
+        return values, required, atoms, assigned
+
+    def _get_value(self, node, values):
+        """Returns the (a, b) value of an arithmetic expression"""
+        if isinstance(node, nodes.NumberNode):
+            return (node.expression, 0)
+        if isinstance(node, nodes.VariableNode):
+            value = values[self.control_flow_graph.slots[node.expression]]
+            if value is None:
+                raise NotAffine
+            return value
+        if isinstance(node, (nodes.AddNode, nodes.MinusNode, nodes.TimesNode)):
+            left_a, left_b = self._get_value(node.left_expression, values)
+            right_a, right_b = self._get_value(node.right_expression, values)
+            if isinstance(node, nodes.AddNode):
+                return (left_a + right_a, left_b + right_b)
+            if isinstance(node, nodes.MinusNode):
+                return (left_a - right_a, left_b - right_b)
+            if left_b == 0:
+                return (left_a * right_a, left_a * right_b)
+            if right_b == 0:
+                return (left_a * right_a, left_b * right_a)
+        # divisions give floats, the values of iteration j would not be exact
+        raise NotAffine
+
+    def _get_iterations(self, node, values):
+        """Returns the iterations on which a boolean expression is true"""
+        if isinstance(node, nodes.BooleanNode):
+            return ALL_ITERATIONS if node.expression == 'true' else NO_ITERATION
+        if isinstance(node, nodes.NotNode):
+            return complement(self._get_iterations(node.expression, values))
+        if isinstance(node, (nodes.AndNode, nodes.OrNode)):
+            left = self._get_iterations(node.left_expression, values)
+            right = self._get_iterations(node.right_expression, values)
+            if isinstance(node, nodes.AndNode):
+                return intersection(left, right)
+            return union(left, right)
+        if not isinstance(node, nodes.BooleanComparatorNode):
+            raise NotAffine
+        comparator = self.comparators[node.comparator]
+        left_a, left_b = self._get_value(node.left_expression, values)
+        right_a, right_b = self._get_value(node.right_expression, values)
+        return comparator(left_a - right_a, left_b - right_b)
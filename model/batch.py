@@ -0,0 +1,565 @@
+"""
+Autors: Yoann Gauthier and Thibaut Seys
+Date: 18/10/2026
+
+This file defines the batch execution of test sets: the test sets of a chunk run together on numpy
+arrays, one array per program variable, each guard being evaluated once per vertex and step for
+all the test sets standing on the vertex.
+"""
+import sys
+from array import array
+
+from model import nodes
+from model.compiler import UNDEFINED
+from model.trace import Trace
+
+try:
+    import numpy
+except ImportError:
+    # numpy is only needed by the batch execution, test sets are otherwise run one by one
+    numpy = None
+
+
+# test sets are run as a batch from BATCH_MIN_SIZE test sets, by batches of at most BATCH_SIZE test
+# sets. A step of a batch costs about as much as a few hundreds steps of the compiled tracer, so the
+# test sets still running when fewer than BATCH_MIN_RUNNING remain go on in the compiled tracer, as
+# well as the ones running once BATCH_VISITS vertices (8 bytes each) were visited by the batch.
+BATCH_MIN_SIZE = 1024
+BATCH_SIZE = 4096
+BATCH_MIN_RUNNING = 512
+BATCH_VISITS = 1 << 23
+
+# integers between -EXACT_FLOAT and EXACT_FLOAT are exact as floats, and the product of two int64
+# can not overflow if its float is below SAFE_PRODUCT
+EXACT_FLOAT = 2 ** 53
+SAFE_PRODUCT = 2.0 ** 62
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+# value of a variable missing from a test set, while the columns are built
+MISSING = object()
+
+
+class Batch(object):
+    """
+    Columns of the program variables for the members of a batch (its test sets). A value is an
+    (ints, floats, is_float) triple of arrays over some members: (ints, None, None) if they are
+    all integers, (None, floats, None) if they are all floats, otherwise is_float tells which of
+    ints and floats holds the value of each member, so that every member keeps the python type of
+    its value. Booleans are integers, as in python arithmetic and comparisons.
+    Whenever numpy could give a result python would not (int64 overflow, an integer too large to
+    be exact as a float, a division by zero, an undefined variable), the members concerned fail:
+    they are run again by the compiled tracer, which gives the exact python behaviour.
+    + properties:
+        - ints, floats, is_float: the columns of each slot, floats and is_float being None while
+          no member holds a float in the slot
+        - undefined: mask of the members whose variable is undefined, None if there is none
+        - failed: mask of the members which failed
+        - failure_count: number of times members failed while running
+    + methods:
+        - get_environment: returns the slot environment of a member, for the compiled tracer
+        - load, store: read and write the value of a variable for some members
+    """
+
+    def __init__(self, control_flow_graph, test_sets):
+        count = len(test_sets)
+        self.failed = numpy.zeros(count, dtype=bool)
+        self.failure_count = 0
+        self.ints = []
+        self.floats = []
+        self.is_float = []
+        self.undefined = []
+        for variable in control_flow_graph.variables:
+            values = [test_set.get(variable, MISSING) for test_set in test_sets]
+            ints = None
+            if all(type(value) is int for value in values):
+                try:
+                    ints = numpy.array(values, dtype=numpy.int64)
+                except OverflowError:
+                    pass
+            if ints is not None:
+                self.ints.append(ints)
+                self.floats.append(None)
+                self.is_float.append(None)
+                self.undefined.append(None)
+            else:
+                self._add_column(values)
+
+    def _add_column(self, values):
+        """Adds the column of values holding floats, missing or not numeric values"""
+        count = len(values)
+        ints = numpy.zeros(count, dtype=numpy.int64)
+        floats = numpy.zeros(count, dtype=numpy.float64)
+        is_float = numpy.zeros(count, dtype=bool)
+        undefined = numpy.zeros(count, dtype=bool)
+        for member, value in enumerate(values):
+            kind = type(value)
+            if (kind is int or kind is bool) and INT64_MIN <= value <= INT64_MAX:
+                ints[member] = value
+            elif kind is float:
+                floats[member] = value
+                is_float[member] = True
+            elif value is MISSING:
+                undefined[member] = True
+            else:
+                self.failed[member] = True
+        self.ints.append(ints)
+        self.floats.append(floats if is_float.any() else None)
+        self.is_float.append(is_float if is_float.any() else None)
+        self.undefined.append(undefined if undefined.any() else None)
+
+    def get_environment(self, member):
+        """Returns the slot environment of member, booleans being integers"""
+        environment = []
+        for ints, floats, is_float, undefined in zip(
+            self.ints, self.floats, self.is_float, self.undefined
+        ):
+            if undefined is not None and undefined[member]:
+                environment.append(UNDEFINED)
+            elif is_float is not None and is_float[member]:
+                environment.append(float(floats[member]))
+            else:
+                environment.append(int(ints[member]))
+        return environment
+
+    def fail(self, rows, mask):
+        """Marks the members rows[mask] as failed"""
+        if mask.any():
+            self.failed[rows[mask]] = True
+            self.failure_count += 1
+
+    def load(self, slot, rows):
+        """Returns the value of the variable of slot for the members rows"""
+        undefined = self.undefined[slot]
+        if undefined is not None:
+            self.fail(rows, undefined[rows])
+        ints = self.ints[slot][rows]
+        is_float = self.is_float[slot]
+        if is_float is None:
+            return ints, None, None
+        return normalize(ints, self.floats[slot][rows], is_float[rows])
+
+    def store(self, slot, rows, value):
+        """Sets the variable of slot to value for the members rows"""
+        ints, floats, is_float = value
+        if ints is not None:
+            self.ints[slot][rows] = ints
+        if floats is not None or self.is_float[slot] is not None:
+            if self.is_float[slot] is None:
+                count = len(self.failed)
+                self.floats[slot] = numpy.zeros(count, dtype=numpy.float64)
+                self.is_float[slot] = numpy.zeros(count, dtype=bool)
+            if floats is not None:
+                self.floats[slot][rows] = floats
+            self.is_float[slot][rows] = is_float if is_float is not None else ints is None
+        if self.undefined[slot] is not None:
+            self.undefined[slot][rows] = False
+
+
+def normalize(ints, floats, is_float):
+    """Returns the value of the given arrays, without the arrays which are not used"""
+    if not is_float.any():
+        return ints, None, None
+    if is_float.all():
+        return None, floats, None
+    return ints, floats, is_float
+
+
+def to_floats(value):
+    """Returns the values as floats, integers being converted as python does"""
+    ints, floats, is_float = value
+    if ints is None:
+        return floats
+    if floats is None:
+        return ints.astype(numpy.float64)
+    return numpy.where(is_float, floats, ints.astype(numpy.float64))
+
+
+def get_float_mask(value, count):
+    ints, floats, is_float = value
+    if is_float is not None:
+        return is_float
+    return numpy.full(count, ints is None)
+
+
+def get_ints(value, count):
+    ints = value[0]
+    return ints if ints is not None else numpy.zeros(count, dtype=numpy.int64)
+
+
+def is_inexact(ints):
+    """Mask of the integers which are not exact as floats"""
+    return (ints > EXACT_FLOAT) | (ints < -EXACT_FLOAT)
+
+
+def add_ints(left, right):
+    result = left + right
+    return result, ((left ^ result) & (right ^ result)) < 0
+
+
+def subtract_ints(left, right):
+    result = left - right
+    return result, ((left ^ right) & (left ^ result)) < 0
+
+
+def multiply_ints(left, right):
+    product = left.astype(numpy.float64) * right.astype(numpy.float64)
+    return left * right, numpy.abs(product) >= SAFE_PRODUCT
+
+
+def compile_arithmetic(node, left, right):
+    """Returns the function evaluating an arithmetic operator node for the members rows"""
+    if isinstance(node, nodes.DivideNode):
+        def evaluate(batch, rows):
+            left_value, right_value = left(batch, rows), right(batch, rows)
+            left_floats, right_floats = to_floats(left_value), to_floats(right_value)
+            failed = right_floats == 0
+            if left_value[0] is not None and right_value[0] is not None:
+                # python divides two integers exactly, numpy divides their floats
+                ints = ~(
+                    get_float_mask(left_value, len(rows)) | get_float_mask(right_value, len(rows))
+                )
+                failed |= ints & (is_inexact(left_value[0]) | is_inexact(right_value[0]))
+            batch.fail(rows, failed)
+            return None, left_floats / right_floats, None
+        return evaluate
+
+    int_operation, float_operation = {
+        nodes.AddNode: (add_ints, numpy.add),
+        nodes.MinusNode: (subtract_ints, numpy.subtract),
+        nodes.TimesNode: (multiply_ints, numpy.multiply),
+    }[type(node)]
+
+    def evaluate(batch, rows):
+        left_value, right_value = left(batch, rows), right(batch, rows)
+        if left_value[1] is None and right_value[1] is None:
+            ints, overflow = int_operation(left_value[0], right_value[0])
+            batch.fail(rows, overflow)
+            return ints, None, None
+        floats = float_operation(to_floats(left_value), to_floats(right_value))
+        if left_value[0] is None or right_value[0] is None:
+            return None, floats, None
+        is_float = get_float_mask(left_value, len(rows)) | get_float_mask(right_value, len(rows))
+        ints, overflow = int_operation(
+            get_ints(left_value, len(rows)), get_ints(right_value, len(rows))
+        )
+        batch.fail(rows, overflow & ~is_float)
+        return normalize(ints, floats, is_float)
+    return evaluate
+
+
+def compile_comparator(node, left, right):
+    """Returns the function evaluating a comparator node for the members rows"""
+    operation = {
+        '<': numpy.less,
+        '<=': numpy.less_equal,
+        '>': numpy.greater,
+        '>=': numpy.greater_equal,
+        '=': numpy.equal,
+    }[node.comparator]
+
+    def evaluate(batch, rows):
+        left_value, right_value = left(batch, rows), right(batch, rows)
+        if left_value[1] is None and right_value[1] is None:
+            return operation(left_value[0], right_value[0])
+        result = operation(to_floats(left_value), to_floats(right_value))
+        if left_value[0] is None and right_value[0] is None:
+            return result
+        # python compares an integer and a float exactly, numpy compares their floats
+        left_floats = get_float_mask(left_value, len(rows))
+        right_floats = get_float_mask(right_value, len(rows))
+        left_ints, right_ints = get_ints(left_value, len(rows)), get_ints(right_value, len(rows))
+        batch.fail(rows, (
+            (right_floats & ~left_floats & is_inexact(left_ints)) |
+            (left_floats & ~right_floats & is_inexact(right_ints))
+        ))
+        ints = ~(left_floats | right_floats)
+        result[ints] = operation(left_ints[ints], right_ints[ints])
+        return result
+    return evaluate
+
+
+def compile_node(node, slots):
+    """
+    Returns the function evaluating a condition or an arithmetic expression for the members rows
+    of a batch: an array of booleans for a condition, a value for an expression.
+    """
+    if isinstance(node, nodes.VariableNode):
+        slot = slots[node.expression]
+        return lambda batch, rows: batch.load(slot, rows)
+    if isinstance(node, nodes.NumberNode):
+        value = node.expression
+        if not INT64_MIN <= value <= INT64_MAX:
+            def evaluate(batch, rows):
+                batch.fail(rows, numpy.ones(len(rows), dtype=bool))
+                return numpy.zeros(len(rows), dtype=numpy.int64), None, None
+            return evaluate
+        return lambda batch, rows: (numpy.full(len(rows), value, dtype=numpy.int64), None, None)
+    if isinstance(node, nodes.BooleanNode):
+        value = node.expression == 'true'
+        return lambda batch, rows: numpy.full(len(rows), value)
+    if isinstance(node, nodes.NotNode):
+        expression = compile_node(node.expression, slots)
+        return lambda batch, rows: ~expression(batch, rows)
+    left = compile_node(node.left_expression, slots)
+    right = compile_node(node.right_expression, slots)
+    if isinstance(node, nodes.AndNode):
+        return lambda batch, rows: left(batch, rows) & right(batch, rows)
+    if isinstance(node, nodes.OrNode):
+        return lambda batch, rows: left(batch, rows) | right(batch, rows)
+    if isinstance(node, nodes.BooleanComparatorNode):
+        return compile_comparator(node, left, right)
+    return compile_arithmetic(node, left, right)
+
+
+def is_true(condition):
+    return isinstance(condition, nodes.BooleanNode) and condition.expression == 'true'
+
+
+class BatchExecutor(object):
+    """
+    Executes many test sets at once on a compact control flow graph. The members of the batch are
+    grouped by current vertex at each step, and each group takes the edges whose guards hold on
+    whole columns. The guards, the operations and the recorded conditions (for the traces) are the
+    ones of the compiled tracer (see compile_program). The members which fail (see Batch) or are
+    not made of numbers are run again by the compiled tracer, and the members still running at the
+    end of the batch go on in it from their vertex and values: paths and traces are always the ones
+    of CompactControlFlowGraph.get_path and get_trace.
+    + properties:
+        - control_flow_graph: the compact control flow graph
+        - conditions, atoms: the evaluation functions of the guards and of the atoms
+        - operations: (slot, evaluation function) of each operation, None for a skip
+        - resumable: mask of the vertices at which the compiled tracer can resume an execution,
+          the ones whose edges are tested (see compile_program, the other ones may be inlined)
+    + methods:
+        - get_all_paths: returns the paths of test sets
+        - get_all_traces: returns the traces of test sets
+    """
+
+    def __init__(self, control_flow_graph):
+        self.control_flow_graph = graph = control_flow_graph
+        self.conditions = [
+            None if is_true(condition) else compile_node(condition, graph.slots)
+            for condition in graph.condition_nodes
+        ]
+        self.atoms = [compile_node(atom, graph.slots) for atom in graph.atoms]
+        self.operations = [
+            (
+                graph.slots[operation.left_expression.expression],
+                compile_node(operation.right_expression, graph.slots),
+            ) if isinstance(operation, nodes.AssignmentNode) else None
+            for operation in graph.operation_nodes
+        ]
+        self.resumable = numpy.array([
+            vertex != graph.end_vertex and not self._is_unconditional(vertex)
+            for vertex in range(len(graph.vertices))
+        ], dtype=bool)
+
+    def _is_unconditional(self, vertex):
+        """Tells whether vertex has a single edge, always taken"""
+        graph = self.control_flow_graph
+        edges = graph.get_child_edges(vertex)
+        return len(edges) == 1 and self.conditions[graph.condition_ids[edges[0]]] is None
+
+    def get_all_paths(self, test_sets):
+        """Returns the paths of test_sets, the ones of CompactControlFlowGraph.get_path"""
+        graph = self.control_flow_graph
+        tracer = graph.get_tracer()
+        paths = []
+        for start in range(0, len(test_sets), BATCH_SIZE):
+            chunk = test_sets[start:start + BATCH_SIZE]
+            chunk_paths, _, rest, environments = self._run(chunk, False, sys.maxsize)
+            for member in rest:
+                if member in environments:
+                    path = chunk_paths[member]
+                    tracer(environments[member], path, vertex=path[-1])
+                else:
+                    chunk_paths[member] = tracer(graph.to_environment(chunk[member]), array('i'))
+            paths += chunk_paths
+        return paths
+
+    def get_all_traces(self, test_sets, limit):
+        """
+        Returns the traces of test_sets, the ones of CompactControlFlowGraph.get_trace with limit
+        being ACCELERATION_STEPS: the test sets going on after limit steps, whose trace may be
+        accelerated, and the ones raising an error are run again by get_trace.
+        """
+        graph = self.control_flow_graph
+        tracer = graph.get_tracer(True)
+        traces = []
+        for start in range(0, len(test_sets), BATCH_SIZE):
+            chunk = test_sets[start:start + BATCH_SIZE]
+            paths, conditions, rest, environments = self._run(chunk, True, limit)
+            chunk_traces = [
+                Trace(path, member_conditions)
+                for path, member_conditions in zip(paths, conditions)
+            ]
+            for member in rest:
+                chunk_traces[member] = None
+                if member in environments:
+                    path = paths[member]
+                    try:
+                        tracer(
+                            environments[member], path, conditions[member], vertex=path[-1],
+                            limit=limit
+                        )
+                    except Exception:
+                        pass
+                    else:
+                        if path[-1] == graph.end_vertex:
+                            chunk_traces[member] = Trace(path, conditions[member])
+                if chunk_traces[member] is None:
+                    chunk_traces[member] = graph.get_trace(chunk[member])
+            traces += chunk_traces
+        return traces
+
+    def _run(self, test_sets, record, limit):
+        """
+        Runs the batch of test_sets, the members stopping at a while vertex after limit steps as
+        the compiled tracer does. Returns the paths of the members, their recorded conditions if
+        record, the members whose paths and conditions are not complete and the slot environments
+        of the ones among them which did not fail, to resume their execution from the last vertex
+        of their paths.
+        Summary: every member starts at root_vertex. At each step the running members are grouped
+        by vertex, each group takes the edges of its vertex as the compiled tracer does and the
+        operation of an edge updates the columns of the members taking it. Vertices visited at
+        each step are recorded, then written at once in the paths.
+        """
+        graph = self.control_flow_graph
+        count = len(test_sets)
+        batch = Batch(graph, test_sets)
+        seen = numpy.zeros((2, len(graph.atoms), count), dtype=bool) if record else None
+
+        vertices = numpy.full(count, graph.root_vertex, dtype=numpy.intc)
+        # every running member moves once per step: the visits of a step are at the same position
+        # in the paths of their members, and the paths of the running members have len(visits)
+        # vertices
+        visits = [(numpy.arange(count, dtype=numpy.intc), vertices.copy())]
+        visit_count = count
+        running = numpy.flatnonzero(~batch.failed & (vertices != graph.end_vertex))
+        running = running.astype(numpy.intc)
+        current = vertices[running]
+        stopped = numpy.zeros(count, dtype=bool)
+        with numpy.errstate(all='ignore'):
+            while running.size:
+                if running.size < BATCH_MIN_RUNNING or visit_count > BATCH_VISITS:
+                    resumed = self.resumable[current]
+                    stopped[running[resumed]] = True
+                    running, current = running[~resumed], current[~resumed]
+                    if not running.size:
+                        break
+                # group the running members by vertex
+                first = current[0]
+                if (current == first).all():
+                    groups = [(int(first), running)]
+                else:
+                    order = numpy.argsort(current, kind='stable')
+                    current = current[order]
+                    starts = numpy.flatnonzero(current[1:] != current[:-1]) + 1
+                    groups = zip(
+                        current[numpy.r_[0, starts]].tolist(), numpy.split(running[order], starts)
+                    )
+                failure_count = batch.failure_count
+                limited = False
+                for vertex, rows in groups:
+                    if graph.vertex_operations[vertex] == 'while' and len(visits) > limit:
+                        stopped[rows] = True
+                        limited = True
+                    else:
+                        self._step(batch, vertices, vertex, rows, seen)
+                if limited or batch.failure_count != failure_count:
+                    running = running[~(batch.failed[running] | stopped[running])]
+                current = vertices[running]
+                visits.append((running, current))
+                visit_count += running.size
+                moving = current != graph.end_vertex
+                if not moving.all():
+                    running, current = running[moving], current[moving]
+
+        paths = self._get_paths(visits, count)
+        conditions = self._get_conditions(seen, count) if record else None
+        rest = numpy.flatnonzero(batch.failed | stopped).tolist()
+        environments = {
+            member: batch.get_environment(member) for member in numpy.flatnonzero(stopped).tolist()
+        }
+        return paths, conditions, rest, environments
+
+    def _step(self, batch, vertices, vertex, rows, seen):
+        """Moves the members rows from vertex along the edge they take, as the compiled tracer"""
+        graph = self.control_flow_graph
+        edges = graph.get_child_edges(vertex)
+        if self._is_unconditional(vertex):
+            self._take(batch, vertices, edges[0], rows)
+            return
+        decision = graph.get_decision(vertex)
+        if decision is not None:
+            # the condition is evaluated once, the false edge is taken when it does not hold
+            true_edge, false_edge = decision
+            if seen is not None:
+                atoms = graph.decision_atoms[graph.vertex_decisions[vertex]]
+                self._record(batch, atoms, rows, seen)
+            holds = self._holds(batch, true_edge, rows)
+            self._take(batch, vertices, true_edge, rows[holds])
+            self._take(batch, vertices, false_edge, rows[~holds])
+            return
+        for edge in edges:
+            if seen is not None:
+                self._record(batch, graph.edge_atoms[edge], rows, seen)
+            holds = self._holds(batch, edge, rows)
+            self._take(batch, vertices, edge, rows[holds])
+            rows = rows[~holds]
+            if not rows.size:
+                return
+        # no guard holds, the compiled tracer raises an ExecutionError
+        batch.fail(rows, numpy.ones(len(rows), dtype=bool))
+
+    def _holds(self, batch, edge, rows):
+        """Returns the mask of the members rows for which the guard of edge holds"""
+        condition = self.conditions[self.control_flow_graph.condition_ids[edge]]
+        if condition is None:
+            return numpy.ones(len(rows), dtype=bool)
+        return condition(batch, rows)
+
+    def _record(self, batch, atoms, rows, seen):
+        for atom in atoms:
+            values = self.atoms[atom](batch, rows)
+            seen[1, atom, rows[values]] = True
+            seen[0, atom, rows[~values]] = True
+
+    def _take(self, batch, vertices, edge, rows):
+        if not rows.size:
+            return
+        operation = self.operations[self.control_flow_graph.operation_ids[edge]]
+        if operation is not None:
+            slot, expression = operation
+            batch.store(slot, rows, expression(batch, rows))
+        vertices[rows] = self.control_flow_graph.targets[edge]
+
+    @staticmethod
+    def _get_paths(visits, count):
+        """Writes the visits of each step in the concatenation of the paths, then splits it"""
+        lengths = numpy.zeros(count, dtype=numpy.intp)
+        for step, (members, _) in enumerate(visits):
+            lengths[members] = step + 1
+        offsets = numpy.zeros(count + 1, dtype=numpy.intp)
+        numpy.cumsum(lengths, out=offsets[1:])
+        path_vertices = numpy.empty(offsets[-1], dtype=numpy.intc)
+        for step, (members, visited) in enumerate(visits):
+            path_vertices[offsets[members] + step] = visited
+        path_vertices = path_vertices.tobytes()
+        offsets = (offsets * numpy.dtype(numpy.intc).itemsize).tolist()
+        paths = []
+        for member in range(count):
+            path = array('i')
+            path.frombytes(path_vertices[offsets[member]:offsets[member + 1]])
+            paths.append(path)
+        return paths
+
+    @staticmethod
+    def _get_conditions(seen, count):
+        """Returns the set of (atom id, value) pairs recorded for each member"""
+        conditions = [set() for _ in range(count)]
+        for value in (False, True):
+            atoms, members = numpy.nonzero(seen[int(value)])
+            for atom, member in zip(atoms.tolist(), members.tolist()):
+                conditions[member].add((atom, value))
+        return conditions
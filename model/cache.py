@@ -0,0 +1,82 @@
+"""
+Autors: Yoann Gauthier and Thibaut Seys
+Date: 18/10/2026
+
+This file defines the on-disk cache of the compact control flow graphs of the programs.
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+
+from model.abstract_syntax_tree import ASTree
+from model.control_flow_graph import CompactControlFlowGraph
+
+
+# must be increased whenever the pickled classes (graphs, vertices, nodes) change, the entries
+# written by an older version are then never read again
+CACHE_VERSION = 2
+
+# errors of a cache entry which can not be read back, the graph is then built again
+CACHE_ERRORS = (
+    pickle.UnpicklingError, EOFError, AttributeError, ImportError, IndexError, KeyError,
+    TypeError, ValueError
+)
+
+
+def get_cache_path(cache_dir, source):
+    """Returns the path of the cache entry of the given source code (bytes)"""
+    key = hashlib.sha256(str(CACHE_VERSION).encode() + b'\n' + source).hexdigest()
+    return os.path.join(cache_dir, key + '.pickle')
+
+
+def load_control_flow_graph(source_filepath, cache_dir=None):
+    """
+    Returns the compact control flow graph of the program source_filepath. When cache_dir is
+    given, the graph is read from the cache if the same source code was already seen (the program
+    is then neither tokenized nor parsed), otherwise it is built and saved in the cache.
+    """
+    if cache_dir is None:
+        return ASTree(source_filepath).to_control_flow_graph().freeze()
+
+    with open(source_filepath, 'rb') as source_file:
+        source = source_file.read()
+    cache_path = get_cache_path(cache_dir, source)
+
+    control_flow_graph = _read_entry(cache_path)
+    if control_flow_graph is None:
+        control_flow_graph = ASTree(source_filepath).to_control_flow_graph().freeze()
+        _write_entry(cache_dir, cache_path, control_flow_graph)
+    control_flow_graph.name = source_filepath
+    return control_flow_graph
+
+
+def _read_entry(cache_path):
+    """Returns the graph saved in cache_path, None if it is missing or can not be read"""
+    try:
+        with open(cache_path, 'rb') as cache_file:
+            control_flow_graph = pickle.load(cache_file)
+    except (OSError,) + CACHE_ERRORS:
+        return None
+    if not isinstance(control_flow_graph, CompactControlFlowGraph):
+        return None
+    return control_flow_graph
+
+
+def _write_entry(cache_dir, cache_path, control_flow_graph):
+    """
+    Saves the graph in cache_path. The entry is written in a temporary file which is then renamed,
+    so that a concurrent run never reads a partial entry. The cache is only an optimization: a
+    failed write is ignored.
+    """
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        descriptor, temporary_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    except OSError:
+        return
+    try:
+        with os.fdopen(descriptor, 'wb') as cache_file:
+            pickle.dump(control_flow_graph, cache_file, pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, cache_path)
+    except OSError:
+        os.unlink(temporary_path)
@@ -0,0 +1,190 @@
+"""
+Autors: Yoann Gauthier and Thibaut Seys
+Date: 18/10/2026
+
+This file defines the compilation of edge conditions and operations to python functions, so that
+execution does not walk the abstract syntax tree at every step.
+"""
+import sys
+
+from model.error import ExecutionError
+
+
+class Undefined(object):
+    """
+    Value of the variables missing from a test set in a slot environment. As reading an undefined
+    variable, any use of it raises an ExecutionError.
+    """
+    def _raise_execution_error(self, *args):
+        raise ExecutionError
+
+    __add__ = __radd__ = __sub__ = __rsub__ = _raise_execution_error
+    __mul__ = __rmul__ = __truediv__ = __rtruediv__ = _raise_execution_error
+    __lt__ = __le__ = __gt__ = __ge__ = __eq__ = __ne__ = _raise_execution_error
+
+    def __repr__(self):
+        return 'UNDEFINED'
+
+
+UNDEFINED = Undefined()
+
+
+def dict_variable(name):
+    """Source code to access a variable of an environment stored in a dict"""
+    return 'env[{!r}]'.format(name)
+
+
+def slot_variable(slots):
+    """
+    Returns the function giving the source code to access a variable of an environment stored in
+    a list, slots maps each variable name to its index in the list.
+    """
+    return lambda name: 'env[{}]'.format(slots[name])
+
+
+def compile_condition(condition, variable=dict_variable):
+    """Returns a function taking an environment and returning the value of the condition"""
+    source = 'lambda env: {}'.format(condition.to_python(variable))
+    return eval(compile(source, '<condition>', 'eval'))
+
+
+def compile_operation(operation, variable=dict_variable):
+    """Returns a function updating the given environment in place and returning it"""
+    lines = operation.to_python(variable).split('\n')
+    source = 'def operation(env):\n{}\n    return env\n'.format(
+        '\n'.join('    ' + line for line in lines)
+    )
+    namespace = {'ExecutionError': ExecutionError, 'UNDEFINED': UNDEFINED}
+    exec(compile(source, '<operation>', 'exec'), namespace)
+    return namespace['operation']
+
+
+def compile_program(control_flow_graph, variable=dict_variable, record=False):
+    """
+    Returns a function tracing the whole program of a compact control flow graph. The function
+    takes an environment, updated in place, and an array to which the ids of the visited vertices
+    are appended, and returns that array.
+    When record is True, the function takes a third argument, a set to which the
+    (atom id, value) pairs of the conditions of each tested guard are added (see
+    CompactControlFlowGraph.atoms), just before the guard is tested.
+    The function also takes two optional keyword arguments: vertex, the id of a vertex at which
+    the execution is resumed (the vertex is then not appended again), and limit, a path length
+    after which the function returns when it reaches a while vertex, before testing its guards,
+    so that the caller can look at the loop (see CompactControlFlowGraph.get_trace).
+    The generated code is a state machine over vertex ids: a vertex is found through a binary
+    search on its id, then its guards are tested in the edges order and the operation of the taken
+    edge is inlined. The condition of a decision (see CompactControlFlowGraph.decision_vertices)
+    is only evaluated once, its conditions being recorded once too. Vertices that can only be
+    reached from one edge and have a single unconditional edge (assignments and skips in a
+    sequence) are inlined in the branch leading to them, so a sequence of statements costs a
+    single dispatch.
+    """
+    graph = control_flow_graph
+    vertex_count = len(graph.vertices)
+    in_degrees = [0] * vertex_count
+    for target in graph.targets:
+        in_degrees[target] += 1
+
+    def is_unconditional(edge):
+        condition = graph.get_edge_condition(edge)
+        return condition.to_python(variable) == 'True'
+
+    def is_inlined(vertex):
+        edges = graph.get_child_edges(vertex)
+        return (
+            vertex not in (graph.root_vertex, graph.end_vertex) and
+            in_degrees[vertex] == 1 and
+            len(edges) == 1 and
+            is_unconditional(edges[0])
+        )
+
+    lines = []
+
+    def emit(indent, line):
+        lines.append('    ' * indent + line)
+
+    def emit_branch(indent, edge):
+        """Emits the operation of edge and of the vertices inlined after it"""
+        while True:
+            operation = graph.get_edge_operation(edge).to_python(variable)
+            if operation != 'pass':
+                for line in operation.split('\n'):
+                    emit(indent, line)
+            target = graph.targets[edge]
+            emit(indent, 'append({})'.format(target))
+            if not is_inlined(target):
+                emit(indent, 'vertex = {}'.format(target))
+                return
+            edge = graph.get_child_edges(target)[0]
+
+    def emit_vertex(indent, vertex):
+        edges = graph.get_child_edges(vertex)
+        if graph.vertex_operations[vertex] == 'while':
+            emit(indent, 'if len(path) > limit:')
+            emit(indent + 1, 'return path')
+        if len(edges) == 1 and is_unconditional(edges[0]):
+            emit_branch(indent, edges[0])
+            return
+        decision = graph.get_decision(vertex)
+        if decision is not None:
+            # the condition is evaluated once, the false edge is taken when it does not hold
+            true_edge, false_edge = decision
+            if record:
+                for atom in graph.decision_atoms[graph.vertex_decisions[vertex]]:
+                    emit(indent, 'record(({}, bool({})))'.format(
+                        atom, graph.atoms[atom].to_python(variable)
+                    ))
+            emit(indent, 'if {}:'.format(graph.get_edge_condition(true_edge).to_python(variable)))
+            emit_branch(indent + 1, true_edge)
+            emit(indent, 'else:')
+            emit_branch(indent + 1, false_edge)
+            return
+        if record:
+            # the conditions of a guard are only recorded if the previous guards do not hold
+            for edge in edges:
+                for atom in graph.edge_atoms[edge]:
+                    emit(indent, 'record(({}, bool({})))'.format(
+                        atom, graph.atoms[atom].to_python(variable)
+                    ))
+                emit(indent, 'if {}:'.format(graph.get_edge_condition(edge).to_python(variable)))
+                emit_branch(indent + 1, edge)
+                emit(indent, 'else:')
+                indent += 1
+            emit(indent, 'raise ExecutionError')
+            return
+        for index, edge in enumerate(edges):
+            condition = graph.get_edge_condition(edge).to_python(variable)
+            emit(indent, '{} {}:'.format('if' if index == 0 else 'elif', condition))
+            emit_branch(indent + 1, edge)
+        emit(indent, 'else:')
+        emit(indent + 1, 'raise ExecutionError')
+
+    def emit_dispatch(indent, vertices):
+        if len(vertices) == 1:
+            emit_vertex(indent, vertices[0])
+            return
+        middle = len(vertices) // 2
+        emit(indent, 'if vertex < {}:'.format(vertices[middle]))
+        emit_dispatch(indent + 1, vertices[:middle])
+        emit(indent, 'else:')
+        emit_dispatch(indent + 1, vertices[middle:])
+
+    dispatched = [
+        vertex for vertex in range(vertex_count)
+        if vertex != graph.end_vertex and not is_inlined(vertex)
+    ]
+    arguments = 'env, path, conditions' if record else 'env, path'
+    emit(0, 'def trace({}, vertex=None, limit={}):'.format(arguments, sys.maxsize))
+    if record:
+        emit(1, 'record = conditions.add')
+    emit(1, 'append = path.append')
+    emit(1, 'if vertex is None:')
+    emit(2, 'vertex = {}'.format(graph.root_vertex))
+    emit(2, 'append(vertex)')
+    emit(1, 'while vertex != {}:'.format(graph.end_vertex))
+    emit_dispatch(2, dispatched)
+    emit(1, 'return path')
+
+    namespace = {'ExecutionError': ExecutionError, 'UNDEFINED': UNDEFINED}
+    exec(compile('\n'.join(lines) + '\n', '<program {}>'.format(graph.name), 'exec'), namespace)
+    return namespace['trace']
@@ -4,9 +4,24 @@ Date: 21/02/2018
 
 This file defines all logic needed for control flow graph object
 """
-from copy import deepcopy
+from array import array
+from itertools import islice
 
-from model.error import ExecutionError
+from model import acceleration, batch
+from model.compiler import (
+    UNDEFINED,
+    Undefined,
+    compile_program,
+    slot_variable,
+)
+from model.dataflow import Dataflow
+from model.parallel import STREAM_CHUNK_SIZE, iter_in_parallel, run_in_parallel
+from model.trace import CompressedPath, Trace
+
+
+# steps run before looking for a loop to accelerate and compressing the path, see
+# CompactControlFlowGraph.get_trace
+ACCELERATION_STEPS = 1 << 14
 
 
 class ControlFlowGraph(object):
@@ -18,10 +33,19 @@ class ControlFlowGraph(object):
         - vertices: all vertices stored in a list
         - edges: all edges stored in a list
     + methods:
-        - renamed_edges: changes the old vertex by the new vertex in edges
+        - get_child_edges: returns the edges leaving the given vertex
+        - get_parent_edges: returns the edges arriving to the given vertex
+        - get_vertex: returns the vertex carrying the given label
+        - freeze: returns the compact form of the graph, used for execution and enumeration
         - get_path: returns the node list for the given starting environment
         - get_all_paths: returns the node list for the given starting environment list
         - get_all_k_paths: returns all the path with length if k
+        - iter_k_paths: yields the k paths one by one
+        - count_k_paths: returns the number of k paths without enumerating them
+        - get_all_i_loop_paths: returns all the path going at most i times through each loop
+        - iter_i_loop_paths: yields the i loop paths one by one
+        - count_i_loop_paths: returns the number of i loop paths without enumerating them
+        - get_dataflow: returns the dataflow analyses of the graph (see Dataflow)
     """
 
     def __init__(self, root_vertex=None, end_vertex=None, vertices=[], edges=[]):
@@ -30,23 +54,49 @@ class ControlFlowGraph(object):
         self.vertices = vertices
         self.edges = edges
         self.name = ''
+        self._child_edges = None
+        self._parent_edges = None
+        self._vertices_by_label = None
+        self._compact = None
 
-    def renamed_edges(self, old_vertex, new_vertex):
-        """Return edges with old_vertex replaced by new_vertex. We do not affect self.edges"""
-        new_edges = []
+    def build_index(self):
+        """
+        Build the successor/predecessor adjacency index and the label to vertex map. Edges keep
+        their order from self.edges, so the first edge taken during execution does not change.
+        """
+        self._child_edges = {vertex: [] for vertex in self.vertices}
+        self._parent_edges = {vertex: [] for vertex in self.vertices}
+        self._vertices_by_label = {vertex.label: vertex for vertex in self.vertices}
         for edge in self.edges:
-            edge.root_vertex = (
-                new_vertex
-                if edge.root_vertex == old_vertex
-                else edge.root_vertex
-            )
-            edge.child_vertex = (
-                new_vertex
-                if edge.child_vertex == old_vertex
-                else edge.child_vertex
-            )
-            new_edges.append(edge)
-        return new_edges
+            self._child_edges.setdefault(edge.root_vertex, []).append(edge)
+            self._parent_edges.setdefault(edge.child_vertex, []).append(edge)
+
+    def get_child_edges(self, vertex):
+        """Returns the edges whose root is the given vertex"""
+        if self._child_edges is None:
+            self.build_index()
+        return self._child_edges.get(vertex, [])
+
+    def get_parent_edges(self, vertex):
+        """Returns the edges whose child is the given vertex"""
+        if self._parent_edges is None:
+            self.build_index()
+        return self._parent_edges.get(vertex, [])
+
+    def get_vertex(self, label):
+        """Returns the vertex with the given label, None if there is no such vertex"""
+        if self._vertices_by_label is None:
+            self.build_index()
+        return self._vertices_by_label.get(label)
+
+    def freeze(self):
+        """
+        Returns the compact form of the graph (see CompactControlFlowGraph). It is computed once
+        the graph is built and then cached.
+        """
+        if self._compact is None:
+            self._compact = CompactControlFlowGraph(self)
+        return self._compact
 
     def get_path(self, test_set):
         """
@@ -54,103 +104,46 @@ class ControlFlowGraph(object):
         Summary: We start from root_vertex and we take the succesor which respect the condition. We
         stops arrived at the end_vertex.
         """
-        L = []
-        values = test_set
-        vertex = self.root_vertex
-        L.append(self.root_vertex)
-        while vertex.label != '_':
-            out_edges = [edge for edge in self.edges if edge.root_vertex == vertex]
-            # choose which edge to take
-            for edge in out_edges:
-                if edge.eval(values):  # ie eval was possible and gave a valid path
-                    out_edge = edge
-                    values = edge.eval(values)
-                    break
-            if not out_edge:
-                raise ExecutionError
-            vertex = out_edge.child_vertex
-            L.append(vertex)
-        return L  # list of vertices that we've been through
-
-    def get_all_paths(self, test_sets):
+        compact_graph = self.freeze()
+        return [self.vertices[vertex] for vertex in compact_graph.get_path(test_set)]
+
+    def get_all_paths(self, test_sets, jobs=1):
         """
         Returns all_paths from test_sets.
         test_sets should like [{var1: val1, var2: val2, ...}, ...], each dict is a set of variables
+        With jobs > 1, test sets are run by jobs worker processes.
         """
+        compact_graph = self.freeze()
         paths = []
-        for test_set in test_sets:
-            paths.append(self.get_path(test_set))
+        for path in compact_graph.get_all_paths(test_sets, jobs):
+            paths.append([self.vertices[vertex] for vertex in path])
         return paths  # paths is like [[vertex1, vertex2, ...], [vertex1, vertex4, ...], ...]
 
-    def _get_all_k_paths_util(self, start_vertex, k, current_path, all_paths):
-        """
-        Util function that delegates logic from get_all_k_paths.
-        inspired from https://www.geeksforgeeks.org/find-paths-given-source-destination/
-        except we do not need to mark visited vertices as we only got down in the graph
-        """
-        current_path.append(start_vertex)
-        if len(current_path) > k:
-            pass
-        elif start_vertex.label == '_':
-            all_paths.append(current_path.copy())
-        else:
-            for edge in start_vertex.get_child_edges(self):
-                self._get_all_k_paths_util(edge.child_vertex, k, current_path, all_paths)
-
-        current_path.pop()
-
     def get_all_k_paths(self, k):
         """Returns all k paths of the cover path"""
-        all_paths = []
-        current_path = []
-        self._get_all_k_paths_util(self.root_vertex, k, current_path, all_paths)
-        return all_paths
+        return list(self.iter_k_paths(k))
+
+    def iter_k_paths(self, k):
+        """Yields the k paths of the cover path one by one"""
+        for path in self.freeze().iter_k_paths(k):
+            yield [self.vertices[vertex] for vertex in path]
+
+    def count_k_paths(self, k):
+        """Returns the number of k paths of the cover path"""
+        return self.freeze().count_k_paths(k)
 
     def get_all_i_loop_paths(self, i):
         """Returns all i loop paths of the cover path"""
-        all_paths = []
-        current_path = []
-        self._get_all_i_loop_paths_util(self.root_vertex, i, current_path, all_paths)
-        return all_paths
-
-    def _get_all_i_loop_paths_util(self, start_vertex, i, current_path, all_paths):
-        """Util function that delegates logic from get_all_i_loop_paths."""
-        current_path.append(start_vertex)
-        if self._check_i_loop_pile(i, current_path):
-            pass
-        elif start_vertex.label == '_':
-            all_paths.append(current_path.copy())
-        else:
-            for edge in start_vertex.get_child_edges(self):
-                self._get_all_i_loop_paths_util(edge.child_vertex, i, current_path, all_paths)
-
-        current_path.pop()
-
-    def _check_i_loop_pile(self, i, current_path):
-        pile = [elt for elt in current_path if elt.operation == 'while']
-        if not pile:
-            return False
-
-        length_elt = {elt: 0 for elt in pile}
-        memory = [pile[0]]
-        previous_elt = pile[0]
-        for elt in pile:
-            if elt == previous_elt:
-                length_elt[elt] += 1
-                if length_elt[elt] > i + 1:
-                    return True
-            else:
-                if elt not in memory:
-                    memory.append(elt)
-                    length_elt[elt] = 1
-                else:
-                    memory.remove(previous_elt)
-                    length_elt[elt] += 1
-                    length_elt[previous_elt] = 0
-                    if length_elt[elt] > i + 1:
-                        return True
-                previous_elt = elt
-        return False
+        return list(self.iter_i_loop_paths(i))
+
+    def iter_i_loop_paths(self, i):
+        """Yields the i loop paths of the cover path one by one"""
+        for path in self.freeze().iter_i_loop_paths(i):
+            yield [self.vertices[vertex] for vertex in path]
+
+    def count_i_loop_paths(self, i):
+        """Returns the number of i loop paths of the cover path"""
+        return self.freeze().count_i_loop_paths(i)
 
     def get_labels(self, operations=['assignment', 'skip', 'if', 'while']):
         return [vertex.label for vertex in self.vertices if vertex.operation in operations]
@@ -161,43 +154,703 @@ class ControlFlowGraph(object):
             to_return |= edge.get_variables()
         return to_return
 
+    def get_dataflow(self):
+        """Returns the dataflow analyses of the compact form of the graph"""
+        return self.freeze().get_dataflow()
+
     def get_def_variables(self, vertex):
         to_return = set()
-        for edge in self.edges:
-            if edge.root_vertex.operation == 'assignment' and edge.root_vertex == vertex:
+        if vertex.operation == 'assignment':
+            for edge in self.get_child_edges(vertex):
                 return edge.operation.left_expression.get_variables()
         return to_return
 
     def get_ref_variables(self, vertex):
         to_return = set()
-        for edge in self.edges:
-            if edge.root_vertex == vertex:
-                if edge.root_vertex.operation == 'assignment':
-                    to_return |= edge.operation.right_expression.get_variables()
-                to_return |= edge.condition.get_variables()
+        for edge in self.get_child_edges(vertex):
+            if vertex.operation == 'assignment':
+                to_return |= edge.operation.right_expression.get_variables()
+            to_return |= edge.condition.get_variables()
         return to_return
 
-    def _get_all_possible_paths_util(self, start_vertex, end_vertex, visited, current_path, all_paths):
-        current_path.append(start_vertex)
-        visited.add(start_vertex)
-        if start_vertex == end_vertex:
-            all_paths.append(current_path[:])
+    def __str__(self):
+        return '\n'.join([str(edge) for edge in self.edges])
+
+
+class LoopCounter(object):
+    """
+    Iteration counts of the loops along a path, for the i loop paths: a path is not an i loop
+    path as soon as it goes more than i + 1 times in a row through the vertex of a loop, going
+    through inner loops and coming back does not break the row. The counts are updated when a
+    vertex is added at the end of the path and restored when it is removed, in amortized constant
+    time.
+    + properties:
+        - lengths: lengths[v] is the number of times in a row the path went through the loop
+          vertex v, 0 if its row is over
+        - started: the loop vertices whose row is still going on, outer loops first
+    + methods:
+        - push: adds a vertex at the end of the path, returns False if a loop then goes too many
+          times in a row (the vertex must still be removed with pop)
+        - pop: removes the last vertex of the path
+        - get_state: returns the hashable state of the counts with the last vertex
+    """
+
+    def __init__(self, vertex_operations, i):
+        self.i = i
+        self.loops = [operation == 'while' for operation in vertex_operations]
+        self.lengths = [0] * len(vertex_operations)
+        self.started = []
+        self.path = []
+        # for each vertex of the path: None for a vertex which is not a loop, otherwise the
+        # (loop, length) rows stopped when the vertex was added
+        self._undo = []
+
+    def push(self, vertex):
+        self.path.append(vertex)
+        if not self.loops[vertex]:
+            self._undo.append(None)
+            return True
+        stopped = []
+        if self.lengths[vertex]:
+            # back to a started loop: the rows of the loops started inside it are over
+            while self.started[-1] != vertex:
+                loop = self.started.pop()
+                stopped.append((loop, self.lengths[loop]))
+                self.lengths[loop] = 0
+        else:
+            self.started.append(vertex)
+        self.lengths[vertex] += 1
+        self._undo.append(stopped)
+        return self.lengths[vertex] <= self.i + 1
+
+    def pop(self):
+        vertex = self.path.pop()
+        stopped = self._undo.pop()
+        if stopped is None:
+            return
+        self.lengths[vertex] -= 1
+        if not self.lengths[vertex]:
+            self.started.pop()
+        for loop, length in reversed(stopped):
+            self.started.append(loop)
+            self.lengths[loop] = length
+
+    def get_state(self):
+        return (self.path[-1], tuple((loop, self.lengths[loop]) for loop in self.started))
+
+
+class CompactControlFlowGraph(object):
+    """
+    Compact form of a ControlFlowGraph, built by ControlFlowGraph.freeze(). Vertices are numbered
+    from 0 to V - 1 in the order of the graph vertices, edges from 0 to E - 1 in the order of the
+    graph edges. Paths are sequences of vertex ids.
+    + properties:
+        - vertices: tuple of the original vertices, vertices[i] is the vertex with id i
+        - root_vertex, end_vertex: ids of the source and target vertices
+        - labels, vertex_operations: label and operation of each vertex
+        - variables: the program variables, variables[i] is stored in the slot i of an
+          environment
+        - sources, targets, condition_ids, operation_ids: arrays indexed by edge id
+        - condition_nodes, operation_nodes: node tables referenced by condition_ids and
+          operation_ids
+        - atoms: the conditions of the guards (comparisons), edge_atoms[e] are the atom ids of
+          the guard of edge e
+        - offsets, out_edges: CSR adjacency, edges leaving vertex v are
+          out_edges[offsets[v]:offsets[v + 1]]
+        - decision_vertices, true_edges, false_edges, decision_atoms: arrays indexed by decision
+          id, a decision being an if or while vertex whose condition is evaluated once per visit,
+          decision_atoms[d] are the atom ids of its condition
+        - vertex_decisions: the decision id of each vertex, -1 if it is not a decision
+    + methods:
+        - get_path: returns the vertex ids list for the given starting environment
+        - get_all_paths: returns the vertex ids lists for the given starting environment list,
+          possibly using several processes
+        - get_all_traces: returns the traces (paths and evaluated conditions) of the given
+          starting environment list
+        - iter_traces: yields the traces of the given starting environments one by one
+        - get_test_set_key: returns a hashable key of a test set, see TraceMemo
+        - get_key_test_set: returns the test set of a key
+        - get_decision: returns the true and false edges of the decision of a vertex
+        - get_all_k_paths: returns all the path with length if k
+        - iter_k_paths: yields the k paths one by one
+        - count_k_paths: returns the number of k paths without enumerating them
+        - get_all_i_loop_paths: returns all the path going at most i times through each loop
+        - iter_i_loop_paths: yields the i loop paths one by one
+        - count_i_loop_paths: returns the number of i loop paths without enumerating them
+        - is_i_loop_path: checks if an execution path is an i loop path
+        - get_dataflow: returns the dataflow analyses of the graph (see Dataflow)
+        - get_def_use_pairs: returns the def-use pairs linked by a def-clear path
+        - iter_def_clear_paths: yields the def-clear paths of a def-use pair (debugging)
+    """
+
+    def __init__(self, control_flow_graph):
+        self.name = control_flow_graph.name
+        self._tracer = None
+        self._recording_tracer = None
+        self._batch_executor = None
+        self._dataflow = None
+        self.vertices = tuple(control_flow_graph.vertices)
+        ids = {vertex: index for index, vertex in enumerate(self.vertices)}
+        self.root_vertex = ids[control_flow_graph.root_vertex]
+        self.end_vertex = ids[control_flow_graph.end_vertex]
+        self.labels = [vertex.label for vertex in self.vertices]
+        self.vertex_operations = [vertex.operation for vertex in self.vertices]
+
+        # every program variable gets a slot, environments are lists indexed by slots
+        self.variables = tuple(sorted(control_flow_graph.get_variables()))
+        self.slots = {variable: slot for slot, variable in enumerate(self.variables)}
+
+        self.sources = array('i')
+        self.targets = array('i')
+        self.condition_ids = array('i')
+        self.operation_ids = array('i')
+        self.condition_nodes = []
+        self.operation_nodes = []
+        condition_ids = {}
+        operation_ids = {}
+        for edge in control_flow_graph.edges:
+            self.sources.append(ids[edge.root_vertex])
+            self.targets.append(ids[edge.child_vertex])
+            self.condition_ids.append(
+                self._get_node_id(edge.condition, condition_ids, self.condition_nodes)
+            )
+            self.operation_ids.append(
+                self._get_node_id(edge.operation, operation_ids, self.operation_nodes)
+            )
+
+        # edges sorted by source vertex, keeping the graph order for a given source
+        self.offsets = array('i', [0] * (len(self.vertices) + 1))
+        for source in self.sources:
+            self.offsets[source + 1] += 1
+        for vertex in range(len(self.vertices)):
+            self.offsets[vertex + 1] += self.offsets[vertex]
+        self.out_edges = array('i', [0] * len(self.sources))
+        positions = self.offsets[:-1]
+        for edge, source in enumerate(self.sources):
+            self.out_edges[positions[source]] = edge
+            positions[source] += 1
+
+        # conditions of the guards, as counted by TC, and the atom ids of each edge guard
+        self.atoms = []
+        atom_ids = {}
+        self.edge_atoms = [
+            tuple(
+                self._get_node_id(atom, atom_ids, self.atoms)
+                for atom in self.get_edge_condition(edge).get_conditions()
+            )
+            for edge in range(self.get_edge_count())
+        ]
+
+        self._build_decisions()
+
+    def _build_decisions(self):
+        """
+        The decisions are the if and while vertices, whose first edge is guarded by a condition
+        and the second by its negation (see IfNode, WhileNode): the condition is evaluated once
+        per visit, the second edge being taken when it does not hold.
+        """
+        self.decision_vertices = array('i')
+        self.true_edges = array('i')
+        self.false_edges = array('i')
+        self.decision_atoms = []
+        self.vertex_decisions = array('i', [-1] * len(self.vertices))
+        for vertex, operation in enumerate(self.vertex_operations):
+            edges = self.get_child_edges(vertex)
+            if operation not in ('if', 'while') or len(edges) != 2:
+                continue
+            true_edge, false_edge = edges
+            negation = self.get_edge_condition(false_edge)
+            if getattr(negation, 'expression', None) is not self.get_edge_condition(true_edge):
+                continue
+            self.vertex_decisions[vertex] = len(self.decision_vertices)
+            self.decision_vertices.append(vertex)
+            self.true_edges.append(true_edge)
+            self.false_edges.append(false_edge)
+            # both guards have the conditions of the decision
+            self.decision_atoms.append(self.edge_atoms[true_edge])
+
+    def get_decision(self, vertex):
+        """Returns (true edge, false edge) of the decision of vertex, None if it has none"""
+        decision = self.vertex_decisions[vertex]
+        if decision < 0:
+            return None
+        return self.true_edges[decision], self.false_edges[decision]
+
+    def __getstate__(self):
+        """Compiled functions can not be pickled, they are compiled again from the node tables"""
+        state = self.__dict__.copy()
+        state['_tracer'] = None
+        state['_recording_tracer'] = None
+        state['_batch_executor'] = None
+        # the dataflow analyses are computed again when needed
+        state['_dataflow'] = None
+        return state
+
+    @staticmethod
+    def _get_node_id(node, node_ids, nodes):
+        """Returns the id of node in nodes, adding it if it is not there yet"""
+        if id(node) not in node_ids:
+            node_ids[id(node)] = len(nodes)
+            nodes.append(node)
+        return node_ids[id(node)]
+
+    def freeze(self):
+        """The graph is already compact"""
+        return self
+
+    def to_environment(self, test_set):
+        """Returns the slot environment of a test set, missing variables are UNDEFINED"""
+        return [test_set.get(variable, UNDEFINED) for variable in self.variables]
+
+    def to_test_set(self, environment):
+        """Returns the test set form of a slot environment"""
+        return {
+            variable: value
+            for variable, value in zip(self.variables, environment)
+            if value is not UNDEFINED
+        }
+
+    def get_test_set_key(self, test_set):
+        """
+        Returns a hashable key of test_set, the same for the test sets which run the same way:
+        the values of the program variables (other keys are ignored) followed by their types, as
+        1, 1.0 and True do not always give the same results. A missing variable has the value None
+        and the type Undefined, UNDEFINED itself can not be compared. Returns None if a value can
+        not be hashed.
+        """
+        environment = self.to_environment(test_set)
+        key = tuple(value if value is not UNDEFINED else None for value in environment)
+        key += tuple(type(value) for value in environment)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def get_key_test_set(self, key):
+        """Returns the test set of a key given by get_test_set_key"""
+        variable_count = len(self.variables)
+        return {
+            variable: value
+            for variable, value, kind in zip(
+                self.variables, key[:variable_count], key[variable_count:]
+            )
+            if kind is not Undefined
+        }
+
+    def get_edge_count(self):
+        return len(self.sources)
+
+    def get_child_edges(self, vertex):
+        """Returns the ids of the edges leaving the given vertex"""
+        return self.out_edges[self.offsets[vertex]:self.offsets[vertex + 1]]
+
+    def get_child_vertices(self, vertex):
+        return [self.targets[edge] for edge in self.get_child_edges(vertex)]
+
+    def get_edge_condition(self, edge):
+        return self.condition_nodes[self.condition_ids[edge]]
+
+    def get_edge_operation(self, edge):
+        return self.operation_nodes[self.operation_ids[edge]]
+
+    def get_tracer(self, record=False):
+        """
+        Returns the function tracing the whole program, it is compiled once per graph. With
+        record, the function also records the conditions of the tested guards (see
+        compile_program).
+        """
+        if record:
+            if self._recording_tracer is None:
+                self._recording_tracer = compile_program(self, slot_variable(self.slots), True)
+            return self._recording_tracer
+        if self._tracer is None:
+            self._tracer = compile_program(self, slot_variable(self.slots))
+        return self._tracer
+
+    def get_batch_executor(self):
+        """
+        Returns the BatchExecutor running test sets together on numpy arrays (see model.batch),
+        built once per graph. Returns None if numpy is not installed.
+        """
+        if batch.numpy is None:
+            return None
+        if self._batch_executor is None:
+            self._batch_executor = batch.BatchExecutor(self)
+        return self._batch_executor
+
+    def get_path(self, test_set):
+        """
+        Returns the vertex ids we get from execution given test_set as input. The program is run
+        by its compiled tracer (see compile_program), on the slot environment of test_set.
+        """
+        return self.get_tracer()(self.to_environment(test_set), array('i'))
+
+    def get_all_paths(self, test_sets, jobs=1):
+        """
+        Returns all_paths from test_sets.
+        test_sets should like [{var1: val1, var2: val2, ...}, ...], each dict is a set of variables
+        With jobs > 1, test sets are run by jobs worker processes (see model.parallel).
+        Test sets with the same key (see get_test_set_key) are only run once, they get the same
+        path.
+        """
+        test_sets = list(test_sets)
+        keys = [self.get_test_set_key(test_set) for test_set in test_sets]
+        # position in test_sets of the first test set of each key
+        firsts = {}
+        run_positions = []
+        for position, key in enumerate(keys):
+            if key is None or firsts.setdefault(key, position) == position:
+                run_positions.append(position)
+        if jobs > 1:
+            run_paths = run_in_parallel(
+                self, '_get_all_paths', [test_sets[position] for position in run_positions], jobs
+            )
         else:
-            for vertex in start_vertex.get_child_vertices(self):
-                if vertex not in visited:
-                    self._get_all_possible_paths_util(vertex, end_vertex, visited, current_path, all_paths)
-        current_path.pop()
-        visited.remove(start_vertex)
-
-    def get_all_possible_paths(self, u, v):
-        all_paths = []
-        current_path = []
-        visited = set()
-        self._get_all_possible_paths_util(u, v, visited, current_path, all_paths)
-        return all_paths
+            run_paths = self._get_all_paths([test_sets[position] for position in run_positions])
+        paths = [None] * len(keys)
+        for position, path in zip(run_positions, run_paths):
+            paths[position] = path
+        for position, key in enumerate(keys):
+            if paths[position] is None:
+                paths[position] = paths[firsts[key]]
+        return paths
+
+    def _get_all_paths(self, test_sets):
+        """Runs test_sets as batches when numpy is installed and they are enough"""
+        executor = self.get_batch_executor()
+        if executor is not None and len(test_sets) >= batch.BATCH_MIN_SIZE:
+            return executor.get_all_paths(test_sets)
+        tracer = self.get_tracer()
+        return [tracer(self.to_environment(test_set), array('i')) for test_set in test_sets]
+
+    def get_trace(self, test_set):
+        """
+        Returns the Trace of test_set: its path and the conditions evaluated along it. Errors are
+        stored in the trace instead of being raised. A condition may raise an error python would
+        not have met while only evaluating the guards, the execution is then run again without
+        recording to know whether it fails.
+        The path of a long execution is a CompressedPath, its loops being accelerated when
+        possible (see _run_accelerated).
+        """
+        conditions = set()
+        try:
+            path = self._run_accelerated(
+                self.get_tracer(True), self.to_environment(test_set), conditions
+            )
+            return Trace(path, conditions)
+        except Exception as error:
+            condition_error = error
+        try:
+            path = self._run_accelerated(self.get_tracer(), self.to_environment(test_set))
+        except Exception as error:
+            return Trace(None, conditions, error, condition_error)
+        return Trace(path, conditions, condition_error=condition_error)
+
+    def _run_accelerated(self, tracer, environment, *conditions):
+        """
+        Runs tracer (see get_tracer) on environment. Every ACCELERATION_STEPS steps, the tracer
+        stops at a while vertex and the last iteration of its loop is given to AffineCycle: if the
+        iteration only translates the variables, the following iterations taking the same edges
+        are skipped, their number and the values of their conditions being computed in closed
+        form, and the execution is resumed after them. The steps run so far are added to a
+        CompressedPath, in which the repeated iterations of the loop form a single segment.
+        Returns the path, a CompressedPath if the execution was stopped.
+        """
+        compressed = CompressedPath()
+        previous_loop_vertex = None
+        path = tracer(environment, array('i'), *conditions, limit=ACCELERATION_STEPS)
+        while path[-1] != self.end_vertex:
+            loop_vertex = path[-1]
+            if (
+                previous_loop_vertex not in (None, loop_vertex) and
+                len(path) < 2 * ACCELERATION_STEPS
+            ):
+                # the path is cut at the same loop vertex as before, so that the repeated
+                # iterations of the previous part go on in this one
+                tracer(environment, path, *conditions, vertex=loop_vertex, limit=len(path))
+                continue
+            previous_loop_vertex = loop_vertex
+            start = len(path) - 2
+            while start >= 0 and path[start] != loop_vertex:
+                start -= 1
+            accelerated = None
+            if start >= 0:
+                cycle = acceleration.AffineCycle(self, path[start:-1])
+                accelerated = cycle.accelerate(environment)
+            if accelerated is None:
+                path = compressed.extend(path, loop_vertex)
+            else:
+                count, cycle_conditions = accelerated
+                for recorded in conditions:
+                    recorded.update(cycle_conditions)
+                compressed.extend(path)
+                # the path ends at the loop vertex, each skipped iteration goes back to it
+                compressed.append(path[start + 1:], count)
+                path = array('i')
+            # limit is a path length, and path may start with vertices given back by extend
+            length = len(path)
+            tracer(
+                environment, path, *conditions, vertex=loop_vertex,
+                limit=length + ACCELERATION_STEPS
+            )
+            assert len(path) > length, 'the execution did not go on from the loop vertex'
+        if not compressed.segments:
+            return path
+        compressed.extend(path)
+        return compressed
+
+    def get_all_traces(self, test_sets, jobs=1):
+        """
+        Returns the traces of test_sets, using jobs processes if jobs > 1. The test sets (of each
+        process) are run as batches when numpy is installed and they are enough (see
+        model.batch), the traces being the ones of get_trace.
+        """
+        if jobs > 1:
+            return run_in_parallel(self, 'get_all_traces', test_sets, jobs)
+        test_sets = list(test_sets)
+        executor = self.get_batch_executor()
+        if executor is not None and len(test_sets) >= batch.BATCH_MIN_SIZE:
+            return executor.get_all_traces(test_sets, ACCELERATION_STEPS)
+        return [self.get_trace(test_set) for test_set in test_sets]
+
+    @staticmethod
+    def get_chunk_size(jobs):
+        """
+        Returns the number of test sets read at once when they are read lazily: STREAM_CHUNK_SIZE
+        test sets are sent to a worker process, BATCH_SIZE test sets are run as a batch by a
+        single process.
+        """
+        return STREAM_CHUNK_SIZE if jobs > 1 else batch.BATCH_SIZE
+
+    def iter_traces(self, test_sets, jobs=1):
+        """
+        Yields the traces of test_sets one by one, test_sets being any iterable read lazily by
+        chunks of get_chunk_size(jobs) test sets, using jobs processes if jobs > 1
+        """
+        if jobs > 1:
+            return iter_in_parallel(self, 'get_all_traces', test_sets, jobs)
+        test_sets = iter(test_sets)
+        chunks = iter(lambda: list(islice(test_sets, self.get_chunk_size(jobs))), [])
+        return (trace for chunk in chunks for trace in self.get_all_traces(chunk))
+
+    def _get_k_path_counts(self, k):
+        """
+        Returns counts, counts[r][v] being the number of paths from the vertex v to the end vertex
+        with at most r vertices, for r from 0 to k. Each row is computed from the previous one
+        over the edges, in O(k * E).
+        """
+        targets = self.targets
+        counts = [[0] * len(self.vertices)]
+        for _ in range(k):
+            previous = counts[-1]
+            current = [
+                sum(previous[targets[edge]] for edge in self.get_child_edges(vertex))
+                for vertex in range(len(self.vertices))
+            ]
+            current[self.end_vertex] = 1
+            counts.append(current)
+        return counts
+
+    def count_k_paths(self, k):
+        """Returns the number of k paths, without enumerating them"""
+        if k < 1:
+            return 0
+        return self._get_k_path_counts(k)[k][self.root_vertex]
+
+    def iter_k_paths(self, k):
+        """
+        Yields the k paths one by one, in the order of get_all_k_paths: a depth first search which
+        only goes down to the vertices from which the end vertex can still be reached (see
+        _get_k_path_counts), so that every step leads to a path.
+        """
+        if k < 1:
+            return
+        counts = self._get_k_path_counts(k)
+        if not counts[k][self.root_vertex]:
+            return
+        offsets, out_edges, targets = self.offsets, self.out_edges, self.targets
+        path = [self.root_vertex]
+        # positions[i] is the next edge to follow in out_edges from path[i]
+        positions = [offsets[self.root_vertex]]
+        while path:
+            vertex = path[-1]
+            position = positions[-1]
+            if vertex == self.end_vertex or position == offsets[vertex + 1]:
+                if vertex == self.end_vertex:
+                    yield tuple(path)
+                path.pop()
+                positions.pop()
+                continue
+            positions[-1] += 1
+            target = targets[out_edges[position]]
+            if counts[k - len(path)][target]:
+                path.append(target)
+                positions.append(offsets[target])
+
+    def get_all_k_paths(self, k):
+        """Returns all k paths of the cover path"""
+        return list(self.iter_k_paths(k))
+
+    def get_all_i_loop_paths(self, i):
+        """Returns all i loop paths of the cover path"""
+        return list(self.iter_i_loop_paths(i))
+
+    def iter_i_loop_paths(self, i):
+        """
+        Yields the i loop paths one by one: a depth first search along which the loop counts are
+        updated by a LoopCounter, in constant time for each vertex added to or removed from the
+        path. The search only goes down to the vertices from which an i loop path can still be
+        completed (see _get_i_loop_path_counts), so that every step leads to a path.
+        """
+        offsets, out_edges, targets = self.offsets, self.out_edges, self.targets
+        counts = self._get_i_loop_path_counts(i)
+        counter = LoopCounter(self.vertex_operations, i)
+        if not counter.push(self.root_vertex) or not counts[counter.get_state()]:
+            return
+        path = [self.root_vertex]
+        # positions[i] is the next edge to follow in out_edges from path[i]
+        positions = [offsets[self.root_vertex]]
+        while path:
+            vertex = path[-1]
+            position = positions[-1]
+            if vertex == self.end_vertex or position == offsets[vertex + 1]:
+                if vertex == self.end_vertex:
+                    yield tuple(path)
+                path.pop()
+                positions.pop()
+                counter.pop()
+                continue
+            positions[-1] += 1
+            target = targets[out_edges[position]]
+            if counter.push(target) and counts[counter.get_state()]:
+                path.append(target)
+                positions.append(offsets[target])
+            else:
+                counter.pop()
+
+    def _get_i_loop_path_counts(self, i):
+        """
+        Returns counts, counts[state] being the number of ways to complete a prefix of i loop path
+        into an i loop path, state being the state of the loop counts after the prefix
+        (LoopCounter.get_state, which includes the last vertex). The paths which can follow a
+        prefix only depend on this state, the number of paths is thus computed once for each
+        state reached from the root vertex.
+        """
+        offsets, out_edges, targets = self.offsets, self.out_edges, self.targets
+        counter = LoopCounter(self.vertex_operations, i)
+        counts = {}
+        if not counter.push(self.root_vertex):
+            return counts
+        # frames of the depth first search: vertex, next edge position, paths counted, state
+        frames = [[self.root_vertex, offsets[self.root_vertex], 0, counter.get_state()]]
+        while frames:
+            frame = frames[-1]
+            vertex, position = frame[0], frame[1]
+            if vertex != self.end_vertex and position < offsets[vertex + 1]:
+                frame[1] += 1
+                target = targets[out_edges[position]]
+                if counter.push(target):
+                    state = counter.get_state()
+                    if state not in counts:
+                        frames.append([target, offsets[target], 0, state])
+                        continue
+                    frame[2] += counts[state]
+                counter.pop()
+                continue
+            count = 1 if vertex == self.end_vertex else frame[2]
+            counts[frame[3]] = count
+            frames.pop()
+            counter.pop()
+            if frames:
+                frames[-1][2] += count
+        return counts
+
+    def count_i_loop_paths(self, i):
+        """Returns the number of i loop paths without enumerating them"""
+        counter = LoopCounter(self.vertex_operations, i)
+        if not counter.push(self.root_vertex):
+            return 0
+        return self._get_i_loop_path_counts(i)[counter.get_state()]
+
+    def is_i_loop_path(self, path, i):
+        """Check if the path, from the root vertex to the end vertex, is an i loop path"""
+        counter = LoopCounter(self.vertex_operations, i)
+        return all(counter.push(vertex) for vertex in path)
+
+    def get_labels(self, operations=['assignment', 'skip', 'if', 'while']):
+        return [
+            label
+            for label, operation in zip(self.labels, self.vertex_operations)
+            if operation in operations
+        ]
+
+    def get_variables(self):
+        to_return = set()
+        for edge in range(self.get_edge_count()):
+            to_return |= self.get_edge_condition(edge).get_variables()
+            to_return |= self.get_edge_operation(edge).get_variables()
+        return to_return
+
+    def get_dataflow(self):
+        """
+        Returns the dataflow analyses of the graph (definitions and uses of each vertex, reaching
+        definitions, live variables), computed once and then cached
+        """
+        if self._dataflow is None:
+            self._dataflow = Dataflow(self)
+        return self._dataflow
+
+    def get_def_variables(self, vertex):
+        return set(self.get_dataflow().def_variables[vertex])
+
+    def get_ref_variables(self, vertex):
+        return set(self.get_dataflow().use_variables[vertex])
+
+    def get_def_use_pairs(self):
+        """Returns the def-use pairs (variable, def vertex, use vertex), see Dataflow"""
+        return self.get_dataflow().get_def_use_pairs()
+
+    def iter_def_clear_paths(self, variable, def_vertex, use_vertex):
+        """
+        Yields the simple paths from def_vertex to use_vertex along which variable is not defined
+        again (the use vertex may be the def vertex itself, through a loop). There can be
+        exponentially many of them: they are only listed for debugging.
+        """
+        offsets, out_edges, targets = self.offsets, self.out_edges, self.targets
+        def_variables = self.get_dataflow().def_variables
+        path = [def_vertex]
+        visited = {def_vertex}
+        # positions[i] is the next edge to follow in out_edges from path[i]
+        positions = [offsets[def_vertex]]
+        while path:
+            vertex = path[-1]
+            position = positions[-1]
+            if position == offsets[vertex + 1]:
+                path.pop()
+                positions.pop()
+                if vertex != def_vertex:
+                    visited.discard(vertex)
+                continue
+            positions[-1] += 1
+            target = targets[out_edges[position]]
+            if target == use_vertex:
+                yield tuple(path) + (target,)
+            elif target not in visited and variable not in def_variables[target]:
+                visited.add(target)
+                path.append(target)
+                positions.append(offsets[target])
 
     def __str__(self):
-        return '\n'.join([str(edge) for edge in self.edges])
+        return '\n'.join([
+            '{} --({}/{})--> {}'.format(
+                self.labels[self.sources[edge]],
+                self.get_edge_condition(edge),
+                self.get_edge_operation(edge),
+                self.labels[self.targets[edge]],
+            )
+            for edge in range(self.get_edge_count())
+        ])
 
 
 class Vertex(object):
@@ -210,6 +863,7 @@ class Vertex(object):
         - get_edges: return all edges that contain the vertex
         - get_child_edges: return a list of all child edges connected to this vertex
     """
+    __slots__ = ('label', 'operation')
     possible_operations = ['assignment', 'skip', 'if', 'while', 'end']
 
     def __init__(self, label, operation):
@@ -218,27 +872,18 @@ class Vertex(object):
 
     def get_edges(self, cover_graph):
         """Returns a list of all the edges connected to this vertex"""
-        L = []
-        for edge in cover_graph.edges:
-            if edge.root_vertex == self or edge.child_vertex == self:
+        L = list(cover_graph.get_child_edges(self))
+        for edge in cover_graph.get_parent_edges(self):
+            if edge.root_vertex != self:
                 L.append(edge)
         return L
 
     def get_child_edges(self, cover_graph):
         """Returns a list of all the child edges connected to this vertex"""
-        L = []
-        for edge in cover_graph.edges:
-            # self is root of the edge, so the edge is child of self
-            if edge.root_vertex == self:
-                L.append(edge)
-        return L
+        return list(cover_graph.get_child_edges(self))
 
     def get_child_vertices(self, cover_graph):
-        L = []
-        for edge in cover_graph.edges:
-            if edge.root_vertex == self:
-                L.append(edge.child_vertex)
-        return L
+        return [edge.child_vertex for edge in cover_graph.get_child_edges(self)]
 
     def __repr__(self):
         return '<Vertex {}>'.format(self.label)
@@ -248,6 +893,7 @@ class Edge(object):
     """An edge should represent a step between two nodes, and might be paired
     with a condition (if there are possibly many children to the node, each
     edge represent a possibility for the condition)"""
+    __slots__ = ('root_vertex', 'child_vertex', 'condition', 'operation')
 
     def __init__(self, root_vertex, child_vertex, condition, operation):
         self.root_vertex = root_vertex
@@ -256,9 +902,12 @@ class Edge(object):
         self.operation = operation  # assignement or skip node
 
     def eval(self, values):
-        """Returns a value if the eval was possible, None otherwise"""
+        """
+        Returns the updated values if the condition holds, None otherwise. values is updated in
+        place, callers copy the environment once before running the program.
+        """
         if self.condition.eval(values):
-            return self.operation.eval(deepcopy(values))
+            return self.operation.eval(values)
         else:
             return None
 
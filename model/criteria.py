@@ -4,60 +4,152 @@ Date: 21/02/2018
 
 This file defines all the logic for criteria classes.
 """
-from model.nodes import BooleanOperatorNode, BooleanComparatorNode, BooleanNode, NotNode
-from model.error import ExecutionError
+from model.session import CoverageSession
+from model.trace import CompressedPath, TraceStore, iter_bounded_path
 
 
 class Criteria(object):
+    """
+    Criteria are checked against the compact form of the control flow graph (see
+    ControlFlowGraph.freeze), elements to cover are expressed with vertex ids and execution paths
+    are sequences of vertex ids. Several criteria can be checked against the same execution of
+    the test sets with check_traces.
+    Elements to cover are numbered once by prepare, coverage is then tracked in a bitmap indexed
+    by those numbers while execution paths are added one by one with add_path (or traces with
+    add_trace). to_cover and covered stay the lists of the elements to cover and of the covered
+    elements.
+    """
 
     def __init__(self):
         self.to_cover = []
         self.covered = []
+        self.control_flow_graph = None
+        self._element_ids = {}
+        self._covered_elements = bytearray()
+
+    def check(self, control_flow_graph, test_sets, jobs=1):
+        """
+        Generate all paths from test_sets list and then compare different paths. With jobs > 1,
+        the test sets are run by jobs worker processes.
+        """
+        return self.check_traces(TraceStore(control_flow_graph, test_sets, jobs))
+
+    def check_traces(self, trace_store):
+        """Compare the paths of the traces of a TraceStore"""
+        self.prepare(trace_store.control_flow_graph)
+        for trace in trace_store.traces:
+            self.add_trace(trace)
 
-    def check(self, control_flow_graph, test_sets):
-        """Generate all paths from test_sets list and then compare different paths."""
-        self.to_cover = []
+    def check_criteria_against_paths(self, control_flow_graph, execution_paths):
+        """Prepare the elements to cover of the graph, then add the execution paths"""
+        self.prepare(control_flow_graph)
+        for path in execution_paths:
+            self.add_path(path)
+
+    def prepare(self, control_flow_graph):
+        """Get the elements to cover of the compact control flow graph and number them"""
+        self.control_flow_graph = control_flow_graph
+        self.to_cover = self.get_to_cover(control_flow_graph)
         self.covered = []
-        execution_paths = control_flow_graph.get_all_paths(test_sets)
-        return self.check_criteria_against_paths(control_flow_graph, execution_paths)
+        # an element appearing several times in to_cover gets a single number
+        self._element_ids = {}
+        for element in self.to_cover:
+            self._element_ids.setdefault(element, len(self._element_ids))
+        self._covered_elements = bytearray(len(self._element_ids))
+
+    def get_to_cover(self, control_flow_graph):
+        """Should return the list of the elements to cover, elements are hashable"""
+        raise NotImplementedError
 
-    def check_criteria_against_paths(self, control_flow_graph, execution_paths):
-        """Should return True or False depending on the criteria"""
+    def add_path(self, path):
+        """Should cover the elements covered by the execution path"""
         raise NotImplementedError
 
+    def add_trace(self, trace):
+        """Cover the elements covered by the execution of a trace, raising its error if it failed"""
+        error = self.get_trace_error(trace)
+        if error is not None:
+            raise error
+        self.add_path(trace.path)
+
+    def get_trace_error(self, trace):
+        """Returns the error add_trace raises for the trace, None if it can take the trace"""
+        return trace.error
+
+    def cover(self, element):
+        """Mark element as covered, elements which are not to cover are ignored"""
+        element_id = self._element_ids.get(element)
+        if element_id is not None and not self._covered_elements[element_id]:
+            self._covered_elements[element_id] = 1
+            self.covered.append(element)
+
+    def is_covered(self, element):
+        element_id = self._element_ids.get(element)
+        return element_id is not None and self._covered_elements[element_id] == 1
+
+    def get_covered_count(self):
+        return len(self.covered)
+
+    def get_to_cover_count(self):
+        return len(self.to_cover)
+
+    def get_coverage(self):
+        """Returns the coverage in percent, 100 if there is nothing to cover"""
+        to_cover_count = self.get_to_cover_count()
+        if not to_cover_count:
+            return 100.0
+        return 100 * self.get_covered_count() / to_cover_count
+
+    def _display(self, element):
+        """Returns the element to print, by default elements are vertex ids"""
+        return self.control_flow_graph.vertices[element]
+
+    def _display_path(self, path):
+        return [self.control_flow_graph.vertices[vertex] for vertex in path]
+
     def __repr__(self):
         return "Criteria Type"
 
     def __str__(self):
         to_return = self.__repr__()
         to_return += '\n======================================\n'
-        try:
-            to_return += 'Overall coverage : {:.2f}%'.format(
-                100 * len(self.covered) / len(self.to_cover)
-            )
-        except ZeroDivisionError:
-            to_return += 'Overall coverage : 100.00%'
+        to_return += 'Overall coverage : {:.2f}%'.format(self.get_coverage())
         for elt in self.to_cover:
-            if elt in self.covered:
-                to_return += '\nElement {} -- o'.format(elt)
+            if self.is_covered(elt):
+                to_return += '\nElement {} -- o'.format(self._display(elt))
             else:
-                to_return += '\nElement {} -- x'.format(elt)
+                to_return += '\nElement {} -- x'.format(self._display(elt))
         return to_return
 
 
+def check_criterias(criterias, control_flow_graph, test_sets, jobs=1):
+    """
+    Checks several criteria against test_sets, any iterable read lazily (see
+    model.testsets.iter_test_sets): each test set is run once, its trace is given to every
+    criteria and then dropped, so that memory does not grow with the number of test sets. With
+    jobs > 1, the test sets are run by jobs worker processes. Test sets given several times are
+    only run once (see TraceMemo). Returns the CoverageSession.
+    """
+    session = CoverageSession(control_flow_graph, criterias)
+    session.add_all(test_sets, jobs)
+    return session
+
+
 class TA(Criteria):
     """Get all the labels of the cover graph, and checks if they are all defined
     in the nodes of the programm"""
 
-    def check_criteria_against_paths(self, control_flow_graph, execution_paths):
-        for vertex in control_flow_graph.vertices:
-            if vertex.operation == 'assignment':
-                self.to_cover.append(vertex)
+    def get_to_cover(self, control_flow_graph):
+        return [
+            vertex
+            for vertex, operation in enumerate(control_flow_graph.vertex_operations)
+            if operation == 'assignment'
+        ]
 
-        for path in execution_paths:
-            for vertex in path:
-                if vertex.operation == 'assignment' and vertex not in self.covered:
-                    self.covered.append(vertex)
+    def add_path(self, path):
+        # vertices which are not assignments are not to cover, cover ignores them
+        for vertex in iter_bounded_path(path):
+            self.cover(vertex)
 
     def __repr__(self):
         return 'TA - All assignments'
@@ -66,35 +158,138 @@ class TA(Criteria):
 class TD(Criteria):
     """Get all the edges of type "while" or "if" and checks that they are evaluated"""
 
-    def check_criteria_against_paths(self, control_flow_graph, execution_paths):
-        for edge in control_flow_graph.edges:
-            if edge.root_vertex.operation in ['if', 'while']:
-                self.to_cover.append(edge.child_vertex)
-
-        for path in execution_paths:
-            for index, vertex in enumerate(path):
-                if vertex.operation in ['if', 'while'] and path[index + 1] not in self.covered:
-                    self.covered.append(path[index + 1])
+    def get_to_cover(self, control_flow_graph):
+        operations = control_flow_graph.vertex_operations
+        return [
+            control_flow_graph.targets[edge]
+            for edge in range(control_flow_graph.get_edge_count())
+            if operations[control_flow_graph.sources[edge]] in ['if', 'while']
+        ]
+
+    def add_path(self, path):
+        operations = self.control_flow_graph.vertex_operations
+        previous_vertex = None
+        for vertex in iter_bounded_path(path):
+            if previous_vertex is not None and operations[previous_vertex] in ['if', 'while']:
+                self.cover(vertex)
+            previous_vertex = vertex
 
     def __repr__(self):
         return 'TD - All decisions'
 
 
-class kTC(Criteria):
-    """We get all the k paths from the cover graph (all the "small paths") and
-    check if they are in the execution_paths we got from execution."""
+class PathCriteria(Criteria):
+    """
+    Parent class of the criteria whose elements to cover are paths from the root vertex to the
+    end vertex (kTC, iTB). Those paths are never listed, their number grows exponentially: it is
+    computed by count_paths while the execution paths which are to cover (is_path_to_cover) are
+    kept in a set. The report shows the covered paths and at most sample_size paths which are not
+    covered (all of them if sample_size is None), enumerated lazily by iter_paths.
+    """
 
-    def __init__(self, k=1):
+    def __init__(self, sample_size=10):
         super().__init__()
+        self.sample_size = sample_size
+        self.to_cover_count = 0
+        self._covered_paths = set()
+
+    def prepare(self, control_flow_graph):
+        self.control_flow_graph = control_flow_graph
+        self.to_cover = None
+        self.to_cover_count = self.count_paths(control_flow_graph)
+        self.covered = []
+        self._covered_paths = set()
+
+    def count_paths(self, control_flow_graph):
+        """Should return the number of paths to cover"""
+        raise NotImplementedError
+
+    def iter_paths(self, control_flow_graph):
+        """Should yield the paths to cover, in the order of a depth first search"""
+        raise NotImplementedError
+
+    def is_path_to_cover(self, path):
+        """Should check if an execution path is to cover"""
+        raise NotImplementedError
+
+    def add_path(self, path):
+        if isinstance(path, CompressedPath) and not self.is_path_to_cover(path):
+            # accelerated paths are long, they are not expanded unless they are to cover
+            return
+        path = tuple(path)
+        if path not in self._covered_paths and self.is_path_to_cover(path):
+            self._covered_paths.add(path)
+            self.covered.append(path)
+
+    def is_covered(self, element):
+        return tuple(element) in self._covered_paths
+
+    def get_to_cover_count(self):
+        return self.to_cover_count
+
+    def get_sample(self):
+        """
+        Returns the covered paths and the first sample_size paths which are not covered, as
+        (path, covered) pairs in the order of iter_paths
+        """
+        not_covered = []
+        for path in self.iter_paths(self.control_flow_graph):
+            if self.sample_size is not None and len(not_covered) >= self.sample_size:
+                break
+            if path not in self._covered_paths:
+                not_covered.append(path)
+        # paths are sorted by the positions of their edges among the edges leaving each vertex,
+        # as in a depth first search
+        return sorted(
+            [(path, True) for path in self.covered] + [(path, False) for path in not_covered],
+            key=lambda element: self._get_path_key(element[0])
+        )
+
+    def _get_path_key(self, path):
+        control_flow_graph = self.control_flow_graph
+        return [
+            control_flow_graph.get_child_vertices(vertex).index(next_vertex)
+            for vertex, next_vertex in zip(path, path[1:])
+        ]
+
+    def _display(self, element):
+        return self._display_path(element)
+
+    def __str__(self):
+        to_return = self.__repr__()
+        to_return += '\n======================================\n'
+        to_return += 'Overall coverage : {:.2f}%'.format(self.get_coverage())
+        to_return += '\nCovered paths : {} / {}'.format(len(self.covered), self.to_cover_count)
+        sample = self.get_sample()
+        for path, covered in sample:
+            to_return += '\nElement {} -- {}'.format(self._display(path), 'o' if covered else 'x')
+        hidden = self.to_cover_count - len(sample)
+        if hidden:
+            to_return += '\n... and {} other paths not covered'.format(hidden)
+        return to_return
+
+
+class kTC(PathCriteria):
+    """We get all the k paths from the cover graph (all the "small paths") and
+    check if they are in the execution_paths we got from execution.
+    The k paths are counted by dynamic programming (see count_k_paths).
+    """
+
+    def __init__(self, k=1, sample_size=10):
+        super().__init__(sample_size)
         self.k = k
 
-    def check_criteria_against_paths(self, control_flow_graph, execution_paths):
+    def count_paths(self, control_flow_graph):
+        return control_flow_graph.count_k_paths(self.k)
+
+    def iter_paths(self, control_flow_graph):
         # all the k paths from the cover graph
-        self.to_cover = control_flow_graph.get_all_k_paths(self.k)
+        return control_flow_graph.iter_k_paths(self.k)
 
-        # we get all the possible paths
-        for path in execution_paths:
-            self.covered.append(path) if len(path) <= self.k and path not in self.covered else None
+    def is_path_to_cover(self, path):
+        # an execution path goes from the root vertex to the end vertex, it is a k path as soon
+        # as it is short enough
+        return len(path) <= self.k
 
     def __repr__(self):
         return 'k - TC - All {} paths'.format(self.k)
@@ -102,72 +297,67 @@ class kTC(Criteria):
 
 class TC(Criteria):
     """
-    We get all the conditions from the cover graph (get all decisions, then
-    extract conditions from these decisions) and check if they are in some of
-    the condition of the execution_paths we got from execution.
+    We get all the conditions from the cover graph (the atoms of the compact graph, numbered
+    once when it is built) and check if they are evaluated to True and to False by the
+    executions. The values seen are kept in two bitsets, bit i standing for the condition of atom
+    id i: bitsets of executions run apart (by other processes) are merged with a bitwise or.
+    The conditions of a decision are control_flow_graph.decision_atoms[d], so that a criteria on
+    the decisions (MC/DC) can use the same ids.
+    + properties:
+        - seen_true, seen_false: the bitsets (ints) of the conditions evaluated to True, False
+    + methods:
+        - add_outcomes: merges the bitsets of other executions
+        - merge: merges the values seen by another TC on the same graph
+        - is_outcome_covered: checks if a condition was evaluated to a value
     """
     def __init__(self):
         self.to_cover = 0
-        self.covered = 0
+        self.seen_true = 0
+        self.seen_false = 0
+
+    def prepare(self, control_flow_graph):
+        """Collect the conditions of the graph, none of their values being covered yet"""
+        self.control_flow_graph = control_flow_graph
+        self._atoms = control_flow_graph.atoms
+        self.to_cover = 2 * len(self._atoms)
+        self.seen_true = 0
+        self.seen_false = 0
+
+    def add_trace(self, trace):
+        """Collect the values taken by the conditions of the graph during the execution"""
+        error = self.get_trace_error(trace)
+        if error is not None:
+            raise error
+        seen_true, seen_false = self.seen_true, self.seen_false
+        for atom, value in trace.conditions:
+            if value:
+                seen_true |= 1 << atom
+            else:
+                seen_false |= 1 << atom
+        self.seen_true, self.seen_false = seen_true, seen_false
 
-    def check(self, control_flow_graph, test_sets):
-        """Generate all paths from test_sets list and then compare different paths."""
-        self.to_cover = 0
-        self.covered = 0
-
-        self.conditions = self.get_conditions(control_flow_graph)
-        self.conditions = {condition: {True: None, False: None} for condition in self.conditions}
-
-        for test_set in test_sets:
-            self.check_conditions_from_test_set(control_flow_graph, test_set)
-
-        for evaluation in self.conditions.values():
-            self.to_cover += 2
-            if evaluation[True]:
-                self.covered += 1
-            if evaluation[False]:
-                self.covered += 1
-
-    def check_conditions_from_test_set(self, control_flow_graph, test_set):
-        vertex = control_flow_graph.root_vertex
-        while vertex.label != '_':
-            out_edges = [edge for edge in control_flow_graph.edges if edge.root_vertex == vertex]
-            for edge in out_edges:
-                possible_conditions = []
-                self.get_conditions_from_decision(edge.condition, possible_conditions)
-                for condition in possible_conditions:
-                    if condition.eval(test_set):
-                        self.conditions[condition][True] = True
-                    else:
-                        self.conditions[condition][False] = True
-                if edge.eval(test_set):
-                    out_edge = edge
-                    test_set = edge.eval(test_set)
-                    break
-            if not out_edge:
-                raise ExecutionError
-            vertex = out_edge.child_vertex
-
-    def get_conditions(self, control_flow_graph):
-        # get all conditions in cover graph
-        decisions = [edge.condition for edge in control_flow_graph.edges]
-        conditions = []
-        for subdecision in decisions:
-            self.get_conditions_from_decision(subdecision, conditions)
-        return conditions
-
-    def get_conditions_from_decision(self, decision, conditions):
-        if isinstance(decision, BooleanComparatorNode):
-            conditions.append(decision)
-        elif isinstance(decision, BooleanOperatorNode):
-            self.get_conditions_from_decision(decision.left_expression, conditions)
-            self.get_conditions_from_decision(decision.right_expression, conditions)
-        elif isinstance(decision, NotNode):
-            self.get_conditions_from_decision(decision.expression, conditions)
-        elif isinstance(decision, BooleanNode):
-            pass
-        else:
-            raise ExecutionError
+    def get_trace_error(self, trace):
+        # the conditions are evaluated along the execution, stopping at the first error
+        return trace.condition_error or trace.error
+
+    def add_outcomes(self, seen_true, seen_false):
+        """Merge the bitsets of the conditions evaluated to True and False by other executions"""
+        self.seen_true |= seen_true
+        self.seen_false |= seen_false
+
+    def merge(self, other):
+        """Merge the values seen by other, a TC prepared for the same graph"""
+        self.add_outcomes(other.seen_true, other.seen_false)
+
+    def is_outcome_covered(self, atom, value):
+        """Checks if the condition of atom id atom was evaluated to value"""
+        return bool((self.seen_true if value else self.seen_false) >> atom & 1)
+
+    def get_covered_count(self):
+        return bin(self.seen_true).count('1') + bin(self.seen_false).count('1')
+
+    def get_to_cover_count(self):
+        return self.to_cover
 
     def __repr__(self):
         return 'TC - All conditions'
@@ -175,25 +365,33 @@ class TC(Criteria):
     def __str__(self):
         to_return = self.__repr__()
         to_return += '\n======================================\n'
-        to_return += 'Overall coverage : {:.2f}%'.format(100 * self.covered / self.to_cover)
-        for condition, evaluation in self.conditions.items():
+        to_return += 'Overall coverage : {:.2f}%'.format(self.get_coverage())
+        for atom, condition in enumerate(self._atoms):
             to_return += '\nCondition {} is evaluated to:'.format(condition)
-            to_return += '\n\tTrue: o' if evaluation[True] else '\n\tTrue: x'
-            to_return += '\n\tFalse: o' if evaluation[False] else '\n\tFalse: x'
+            to_return += '\n\tTrue: o' if self.is_outcome_covered(atom, True) else '\n\tTrue: x'
+            to_return += '\n\tFalse: o' if self.is_outcome_covered(atom, False) else '\n\tFalse: x'
         return to_return
 
 
-class iTB(Criteria):
-    def __init__(self, i=1):
-        super().__init__()
+class iTB(PathCriteria):
+    """
+    We get all the i loop paths from the cover graph and check if they are in the
+    execution_paths we got from execution. The loop counts are updated incrementally along the
+    paths (see LoopCounter).
+    """
+
+    def __init__(self, i=1, sample_size=10):
+        super().__init__(sample_size)
         self.i = i
 
-    def check_criteria_against_paths(self, control_flow_graph, execution_paths):
-        self.to_cover = control_flow_graph.get_all_i_loop_paths(self.i)
+    def count_paths(self, control_flow_graph):
+        return control_flow_graph.count_i_loop_paths(self.i)
 
-        for path in execution_paths:
-            if path in self.to_cover and path not in self.covered:
-                self.covered.append(path)
+    def iter_paths(self, control_flow_graph):
+        return control_flow_graph.iter_i_loop_paths(self.i)
+
+    def is_path_to_cover(self, path):
+        return self.control_flow_graph.is_i_loop_path(path, self.i)
 
     def __repr__(self):
         return 'i - TB - All {} loops'.format(self.i)
@@ -206,27 +404,75 @@ class TDef(Criteria):
     execution.
     """
 
-    def check_criteria_against_paths(self, control_flow_graph, execution_paths):
+    def get_to_cover(self, control_flow_graph):
         # All elements to cover are variables defined in vertices
-        for vertex in control_flow_graph.vertices:
-            def_variables = control_flow_graph.get_def_variables(vertex)
-            for variable in def_variables:
-                self.to_cover.append((variable, vertex))
-
-        # A covered element is a variable which is ref after being def
-        for path in execution_paths:
-            pile = []
-            for vertex in path:
-                ref_variables = control_flow_graph.get_ref_variables(vertex)
-                for variable in ref_variables:
-                    for elt in pile:
-                        if (variable == elt[0] and elt not in self.covered):
-                            self.covered.append(elt)
-                            pile.remove(elt)
-
-                def_variables = control_flow_graph.get_def_variables(vertex)
-                for variable in def_variables:
-                    pile.append((variable, vertex))
+        return list(control_flow_graph.get_dataflow().definitions)
+
+    def prepare(self, control_flow_graph):
+        super().prepare(control_flow_graph)
+        dataflow = control_flow_graph.get_dataflow()
+        self._ref_variables = dataflow.use_variables
+        self._def_variables = dataflow.def_variables
+
+    def add_path(self, path):
+        """
+        A covered element is a variable which is ref after being def.
+        The definitions met along the path form a pile. When a variable is ref, the pile is
+        scanned and every definition of this variable not covered yet is covered and removed from
+        the pile, the removal making the scan skip the definition following it in the pile.
+        Covered definitions are never removed, so instead of scanning the whole pile, only the
+        pending definitions of the variable are visited: definitions are numbered in the order
+        they enter the pile, which is a linked list on those numbers.
+        """
+        elements = []  # (variable, vertex) of each definition
+        nexts = []  # definition following each definition in the pile
+        previouses = []
+        last = None
+        first_definitions = {}  # first definition in the pile of the elements not covered
+        pending = {}  # definitions of each variable whose element is not covered
+
+        def remove(definition):
+            nonlocal last
+            previous, following = previouses[definition], nexts[definition]
+            if previous is not None:
+                nexts[previous] = following
+            if following is not None:
+                previouses[following] = previous
+            else:
+                last = previous
+
+        for vertex in iter_bounded_path(path):
+            for variable in self._ref_variables[vertex]:
+                remaining = []
+                skipped = None
+                for definition in pending.get(variable, ()):
+                    element = elements[definition]
+                    if self.is_covered(element):
+                        continue
+                    if definition == skipped:
+                        remaining.append(definition)
+                        continue
+                    self.cover(element)
+                    skipped = nexts[definition]
+                    remove(first_definitions.pop(element))
+                pending[variable] = remaining
+
+            for variable in self._def_variables[vertex]:
+                element = (variable, vertex)
+                definition = len(elements)
+                elements.append(element)
+                nexts.append(None)
+                previouses.append(last)
+                if last is not None:
+                    nexts[last] = definition
+                last = definition
+                if not self.is_covered(element):
+                    first_definitions.setdefault(element, definition)
+                    pending.setdefault(variable, []).append(definition)
+
+    def _display(self, element):
+        variable, vertex = element
+        return (variable, self.control_flow_graph.vertices[vertex])
 
     def __repr__(self):
         return 'TDef - All definitions'
@@ -234,47 +480,57 @@ class TDef(Criteria):
 
 class TU(Criteria):
     """
-    We get the vertices where variables are assigned and references, then we
-    get all the possible paths for those variables where there is no re-defintion
-    of those varibles. The last step is ensuring that those possible paths are
-    effectively used during the execution.
+    We get the def-use pairs of the cover graph: a vertex defining a variable and a vertex
+    referencing it, linked by a path without re-definition of the variable (def-clear path),
+    which are given by the reaching definitions (see Dataflow).
+    A pair is covered when an execution path goes from the definition to the reference without
+    defining the variable in between, which is checked in a single scan of the path.
+    With paths=True, the report also lists the def-clear paths of each pair, which can be
+    exponentially many: this is only meant for debugging.
     """
-    def check_criteria_against_paths(self, control_flow_graph, execution_paths):
-        prog_vars = control_flow_graph.get_variables()
-        # we get all the vertices where there is an reference in the graph
-        ref_vertices = []
-        ref_variables = set()
-        for var in prog_vars:
-            for vertex in control_flow_graph.vertices:
-                if var in control_flow_graph.get_ref_variables(vertex):
-                    ref_vertices.append((var, vertex))
-                    ref_variables.add(var)
-
-        # we also get all the vertices where there is a definition in the graph
-        def_vertices = []
-        for var in ref_variables:
-            for vertex in control_flow_graph.vertices:
-                if var in control_flow_graph.get_def_variables(vertex):
-                    def_vertices.append((var, vertex))
-
-        # we get all the path without re-defintion of variables
-        for var, u in def_vertices:
-            for var2, v in ref_vertices:
-                # just need to check the ref if the variables are def
-                if var == var2 and int(u.label) < int(v.label):
-                    self.to_cover += control_flow_graph.get_all_possible_paths(u, v)
-
-        # we check that the path without redefinition is effectively executed
-        for path in self.to_cover:
-            for exec_path in execution_paths:
-                if self.is_sublist(path, exec_path) and path not in self.covered:
-                    self.covered.append(path)
-
-    def is_sublist(self, small_lst, big_lst):
-        for el in small_lst:
-            if el not in big_lst:
-                return False
-        return True
+
+    def __init__(self, paths=False):
+        super().__init__()
+        self.paths = paths
+
+    def get_to_cover(self, control_flow_graph):
+        return control_flow_graph.get_dataflow().get_def_use_pairs()
+
+    def prepare(self, control_flow_graph):
+        super().prepare(control_flow_graph)
+        dataflow = control_flow_graph.get_dataflow()
+        self._ref_variables = dataflow.use_variables
+        self._def_variables = dataflow.def_variables
+
+    def add_path(self, path):
+        """
+        The last definition of each variable is kept along the path: a reference covers the pair
+        of this definition, whatever the vertices between them.
+        """
+        last_definitions = {}
+        for vertex in iter_bounded_path(path):
+            for variable in self._ref_variables[vertex]:
+                def_vertex = last_definitions.get(variable)
+                if def_vertex is not None:
+                    self.cover((variable, def_vertex, vertex))
+            for variable in self._def_variables[vertex]:
+                last_definitions[variable] = vertex
+
+    def _display(self, element):
+        variable, def_vertex, use_vertex = element
+        vertices = self.control_flow_graph.vertices
+        return (variable, vertices[def_vertex], vertices[use_vertex])
 
     def __repr__(self):
         return 'TU - All Uses'
+
+    def __str__(self):
+        to_return = super().__str__()
+        if not self.paths:
+            return to_return
+        to_return += '\nDef-clear paths:'
+        for element in self.to_cover:
+            to_return += '\nElement {}'.format(self._display(element))
+            for path in self.control_flow_graph.iter_def_clear_paths(*element):
+                to_return += '\n\tPath {}'.format(self._display_path(path))
+        return to_return
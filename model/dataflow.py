@@ -0,0 +1,160 @@
+"""
+Autors: Yoann Gauthier and Thibaut Seys
+Date: 18/10/2026
+
+This file defines the dataflow analyses of the compact control flow graph, used by the
+definition and use based criteria.
+"""
+from collections import deque
+
+
+def iter_bits(mask):
+    """Yields the positions of the bits set in the integer mask, lowest first"""
+    while mask:
+        low_bit = mask & -mask
+        yield low_bit.bit_length() - 1
+        mask ^= low_bit
+
+
+class Dataflow(object):
+    """
+    Definitions and uses of the variables at each vertex of a CompactControlFlowGraph, with the
+    reaching definitions and the live variables. Sets are bitsets stored in python integers:
+    definitions are numbered in the vertices order, variables by their slot in the graph.
+    Both analyses are solved by a worklist algorithm, a vertex being visited again only when the
+    set of one of its neighbours changed.
+    + properties:
+        - def_variables, use_variables: def_variables[v] are the variables assigned at vertex v,
+          use_variables[v] the variables its guards and assignment reference (evaluated before
+          the assignment)
+        - definitions: the (variable, vertex) pairs, definitions[d] is the definition with id d
+        - variable_definitions: bitset of the definitions of each variable
+        - reaching_in, reaching_out: bitsets of the definitions reaching the entry and the exit
+          of each vertex
+        - live_in, live_out: bitsets of the variables live at the entry and the exit of each
+          vertex, a variable being live if it can be used before being assigned again
+    + methods:
+        - get_reaching_definitions: returns the definitions reaching a vertex
+        - get_live_variables: returns the variables live at the entry of a vertex
+        - get_def_use_pairs: returns the def-use pairs linked by a def-clear path
+    """
+
+    def __init__(self, control_flow_graph):
+        self.control_flow_graph = control_flow_graph
+        vertex_count = len(control_flow_graph.vertices)
+        self.successors = [[] for _ in range(vertex_count)]
+        self.predecessors = [[] for _ in range(vertex_count)]
+        for source, target in zip(control_flow_graph.sources, control_flow_graph.targets):
+            self.successors[source].append(target)
+            self.predecessors[target].append(source)
+        self._build_tables()
+        self._solve_reaching_definitions()
+        self._solve_live_variables()
+
+    def _build_tables(self):
+        """Scans the edges once to get the definitions and uses of every vertex"""
+        control_flow_graph = self.control_flow_graph
+        operations = control_flow_graph.vertex_operations
+        vertex_count = len(operations)
+        def_variables = [set() for _ in range(vertex_count)]
+        use_variables = [set() for _ in range(vertex_count)]
+        for edge, source in enumerate(control_flow_graph.sources):
+            if operations[source] == 'assignment':
+                operation = control_flow_graph.get_edge_operation(edge)
+                def_variables[source] |= operation.left_expression.get_variables()
+                use_variables[source] |= operation.right_expression.get_variables()
+            use_variables[source] |= control_flow_graph.get_edge_condition(edge).get_variables()
+        self.def_variables = [tuple(sorted(variables)) for variables in def_variables]
+        self.use_variables = [tuple(sorted(variables)) for variables in use_variables]
+
+        slots = control_flow_graph.slots
+        self.definitions = []
+        self.variable_definitions = {variable: 0 for variable in slots}
+        self.generated = [0] * vertex_count
+        for vertex in range(vertex_count):
+            for variable in self.def_variables[vertex]:
+                bit = 1 << len(self.definitions)
+                self.definitions.append((variable, vertex))
+                self.variable_definitions[variable] |= bit
+                self.generated[vertex] |= bit
+        self.killed = [
+            sum(self.variable_definitions[variable] for variable in variables)
+            for variables in self.def_variables
+        ]
+        self.defined = [
+            sum(1 << slots[variable] for variable in variables) for variables in self.def_variables
+        ]
+        self.used = [
+            sum(1 << slots[variable] for variable in variables) for variables in self.use_variables
+        ]
+
+    @staticmethod
+    def _solve(flows_in, flows_out, transfer, vertex_count):
+        """
+        Worklist algorithm: the input set of a vertex is the union of the output sets of
+        flows_in[vertex], its output set is transfer(vertex, input set). Returns the input and
+        output sets once they do not change anymore.
+        """
+        inputs = [0] * vertex_count
+        outputs = [transfer(vertex, 0) for vertex in range(vertex_count)]
+        worklist = deque(range(vertex_count))
+        queued = bytearray([1]) * vertex_count
+        while worklist:
+            vertex = worklist.popleft()
+            queued[vertex] = 0
+            input_set = 0
+            for neighbour in flows_in[vertex]:
+                input_set |= outputs[neighbour]
+            inputs[vertex] = input_set
+            output_set = transfer(vertex, input_set)
+            if output_set != outputs[vertex]:
+                outputs[vertex] = output_set
+                for neighbour in flows_out[vertex]:
+                    if not queued[neighbour]:
+                        queued[neighbour] = 1
+                        worklist.append(neighbour)
+        return inputs, outputs
+
+    def _solve_reaching_definitions(self):
+        generated, killed = self.generated, self.killed
+        self.reaching_in, self.reaching_out = self._solve(
+            self.predecessors,
+            self.successors,
+            lambda vertex, reaching: generated[vertex] | (reaching & ~killed[vertex]),
+            len(generated),
+        )
+
+    def _solve_live_variables(self):
+        # a backward analysis: the sets flow from the successors
+        used, defined = self.used, self.defined
+        self.live_out, self.live_in = self._solve(
+            self.successors,
+            self.predecessors,
+            lambda vertex, live: used[vertex] | (live & ~defined[vertex]),
+            len(used),
+        )
+
+    def get_reaching_definitions(self, vertex):
+        """Returns the (variable, vertex) definitions reaching the entry of vertex"""
+        return [self.definitions[definition] for definition in iter_bits(self.reaching_in[vertex])]
+
+    def get_live_variables(self, vertex):
+        """Returns the variables live at the entry of vertex"""
+        variables = self.control_flow_graph.variables
+        return {variables[slot] for slot in iter_bits(self.live_in[vertex])}
+
+    def get_def_use_pairs(self):
+        """
+        Returns the def-use pairs (variable, def vertex, use vertex), sorted by def vertex, use
+        vertex and variable: a definition of a variable used at a vertex forms a pair if it
+        reaches the entry of the vertex (the uses of a vertex are evaluated before its
+        assignment).
+        """
+        pairs = []
+        for vertex, variables in enumerate(self.use_variables):
+            for variable in variables:
+                reaching = self.reaching_in[vertex] & self.variable_definitions[variable]
+                for definition in iter_bits(reaching):
+                    pairs.append((variable, self.definitions[definition][1], vertex))
+        pairs.sort(key=lambda pair: (pair[1], pair[2], pair[0]))
+        return pairs
@@ -6,15 +6,42 @@ This file defines all different nodes used in abstract syntax tree construction.
 """
 from pprint import pformat
 
-from model.control_flow_graph import ControlFlowGraph, Edge, Vertex
+# imported as a whole, model.control_flow_graph imports model.acceleration which reads the nodes
+from model import control_flow_graph
 from model.error import ExecutionError
 from model.tokenizer import Token
 
 
 class Node(object):
     seen_labels = []
+    # precedence of the python operator of to_python, the higher the tighter it binds: operands
+    # are only put between parentheses when python needs them, deep chains of parentheses do not
+    # compile (too many nested parentheses)
+    python_precedence = 7
+
+    def _set_kinds(self):
+        """
+        Decide the kinds of the node once, when it is built: the kinds of its children are
+        already known, so it takes a constant time and is_arithmetic, is_boolean and is_program
+        just return them.
+        """
+        self.arithmetic = self._decide_arithmetic()
+        self.boolean = self._decide_boolean()
+        self.program = self._decide_program()
 
     def is_arithmetic(self):
+        """Check if the current node is an arithmetic node"""
+        return self.arithmetic
+
+    def is_boolean(self):
+        """Check if the current node is a boolean node"""
+        return self.boolean
+
+    def is_program(self):
+        """Check if the current node is a program node"""
+        return self.program
+
+    def _decide_arithmetic(self):
         """Decide if the current node is an arithmetic node"""
         if isinstance(self, VariableNode):
             return self.is_variable()
@@ -25,7 +52,7 @@ class Node(object):
         else:
             return False
 
-    def is_boolean(self):
+    def _decide_boolean(self):
         """Decide if the current node is a boolean node"""
         if isinstance(self, BooleanNode):
             return self.is_boolean_variable()
@@ -38,7 +65,7 @@ class Node(object):
         else:
             return False
 
-    def is_program(self):
+    def _decide_program(self):
         """Decide if the current node is a program node"""
         if isinstance(self, SkipNode):
             return True
@@ -64,10 +91,26 @@ class Node(object):
     def get_variables(self, variables=set()):
         raise NotImplementedError
 
+    def get_conditions(self):
+        """Return the conditions (comparisons) of a decision, from left to right"""
+        raise ExecutionError
+
     def eval(self, env):
         """Return the updated environments variables"""
         raise NotImplementedError
 
+    def to_python(self, variable):
+        """
+        Return the python source code of the node. variable is a function returning the source
+        code used to access a program variable from its name.
+        """
+        raise NotImplementedError
+
+    def to_python_operand(self, variable, precedence):
+        """Return the python source code of the node as an operand of a precedence operator"""
+        source = self.to_python(variable)
+        return '({})'.format(source) if self.python_precedence < precedence else source
+
     def to_dict(self):
         """Transform the current to a dict object"""
         raise NotImplementedError
@@ -80,6 +123,7 @@ class Node(object):
 class UnaryNode(Node):
     def __init__(self, expression):
         self.expression = expression
+        self._set_kinds()
 
 
 class VariableNode(UnaryNode):
@@ -93,11 +137,14 @@ class VariableNode(UnaryNode):
         except KeyError:
             raise ExecutionError
 
+    def to_python(self, variable):
+        return variable(self.expression)
+
     def to_dict(self):
         return {'variable': self.expression}
 
     def get_variables(self, variables=set()):
-        return variables | set(self.expression)
+        return variables | {self.expression}
 
 
 class NumberNode(UnaryNode):
@@ -108,6 +155,9 @@ class NumberNode(UnaryNode):
     def eval(self, env):
         return self.expression
 
+    def to_python(self, variable):
+        return repr(self.expression)
+
     def to_dict(self):
         return {'number': self.expression}
 
@@ -119,6 +169,7 @@ class BinaryNode(Node):
     def __init__(self, left_expression, right_expression):
         self.left_expression = left_expression
         self.right_expression = right_expression
+        self._set_kinds()
 
     def get_variables(self, variables=set()):
         return (
@@ -127,9 +178,23 @@ class BinaryNode(Node):
             self.right_expression.get_variables(variables)
         )
 
+    def to_python_binary(self, variable, operator):
+        """
+        Return the python source code of a left associative operator: the right operand is put
+        between parentheses when its operator has the same precedence
+        """
+        return '{} {} {}'.format(
+            self.left_expression.to_python_operand(variable, self.python_precedence),
+            operator,
+            self.right_expression.to_python_operand(variable, self.python_precedence + 1)
+        )
+
 
 class ArithmeticOperatorNode(BinaryNode):
     """Parent class for arthmetic operator node (+, -, *, /)"""
+    def to_python(self, variable):
+        return self.to_python_binary(variable, self.operator)
+
     def to_dict(self):
         return {
             'arithmetic operator': self.operator,
@@ -140,6 +205,7 @@ class ArithmeticOperatorNode(BinaryNode):
 
 class AddNode(ArithmeticOperatorNode):
     operator = '+'
+    python_precedence = 5
 
     def eval(self, env):
         return self.left_expression.eval(env) + self.right_expression.eval(env)
@@ -147,6 +213,7 @@ class AddNode(ArithmeticOperatorNode):
 
 class MinusNode(ArithmeticOperatorNode):
     operator = '-'
+    python_precedence = 5
 
     def eval(self, env):
         return self.left_expression.eval(env) - self.right_expression.eval(env)
@@ -154,6 +221,7 @@ class MinusNode(ArithmeticOperatorNode):
 
 class TimesNode(ArithmeticOperatorNode):
     operator = '*'
+    python_precedence = 6
 
     def eval(self, env):
         return self.left_expression.eval(env) * self.right_expression.eval(env)
@@ -161,6 +229,7 @@ class TimesNode(ArithmeticOperatorNode):
 
 class DivideNode(ArithmeticOperatorNode):
     operator = '/'
+    python_precedence = 6
 
     def eval(self, env):
         return self.left_expression.eval(env) / self.right_expression.eval(env)
@@ -174,15 +243,29 @@ class BooleanNode(UnaryNode):
     def eval(self, env):
         return True if self.expression == 'true' else False
 
+    def to_python(self, variable):
+        return 'True' if self.expression == 'true' else 'False'
+
     def to_dict(self):
         return {'boolean': self.expression}
 
     def get_variables(self, variables=set()):
         return variables
 
+    def get_conditions(self):
+        return []
+
 
 class BooleanComparatorNode(BinaryNode):
     """Parent class for boolean comparator (<, <=, >, >=, =)"""
+    python_precedence = 4
+
+    def get_conditions(self):
+        return [self]
+
+    def to_python(self, variable):
+        return self.to_python_binary(variable, '==' if self.comparator == '=' else self.comparator)
+
     def to_dict(self):
         return {
             'comparator': self.comparator,
@@ -228,6 +311,12 @@ class EqualNode(BooleanComparatorNode):
 
 class BooleanOperatorNode(BinaryNode):
     """Parent class for boolean operator node (and or)"""
+    def get_conditions(self):
+        return self.left_expression.get_conditions() + self.right_expression.get_conditions()
+
+    def to_python(self, variable):
+        return self.to_python_binary(variable, self.operator)
+
     def to_dict(self):
         return {
             'boolean operator': self.operator,
@@ -238,6 +327,7 @@ class BooleanOperatorNode(BinaryNode):
 
 class AndNode(BooleanOperatorNode):
     operator = 'and'
+    python_precedence = 2
 
     def eval(self, env):
         return self.left_expression.eval(env) and self.right_expression.eval(env)
@@ -245,15 +335,24 @@ class AndNode(BooleanOperatorNode):
 
 class OrNode(BooleanOperatorNode):
     operator = 'or'
+    python_precedence = 1
 
     def eval(self, env):
         return self.left_expression.eval(env) or self.right_expression.eval(env)
 
 
 class NotNode(UnaryNode):
+    python_precedence = 3
+
     def eval(self, env):
         return not self.expression.eval(env)
 
+    def get_conditions(self):
+        return self.expression.get_conditions()
+
+    def to_python(self, variable):
+        return 'not {}'.format(self.expression.to_python_operand(variable, self.python_precedence))
+
     def to_dict(self):
         return {'not': self.expression.to_dict()}
 
@@ -262,26 +361,69 @@ class NotNode(UnaryNode):
 
 
 class ProgramNode(object):
-    """Works as an interface that force to implement the conversion to a control_flow_graph"""
+    """
+    Works as an interface that force to implement the conversion to a control_flow_graph. Each
+    program node adds its own vertex and edges with add_to_control_flow_graph and returns its
+    children to add, with the vertex they start from and the vertex they continue to. Every vertex
+    and every edge is thus created once and the graph is built in a time linear in the size of the
+    program, without recursion.
+    """
+    # operation of the vertex of the node
+    vertex_operation = None
+
     def to_control_flow_graph(self):
+        """Returns the control flow graph of the program"""
+        root_vertex = self.new_root_vertex()
+        end_vertex = control_flow_graph.Vertex('_', 'end')
+        vertices = []
+        edges = []
+        # nodes still to add with their root and exit vertices, or edges to add after them
+        pile = [(self, root_vertex, end_vertex)]
+        while pile:
+            item = pile.pop()
+            if isinstance(item, control_flow_graph.Edge):
+                edges.append(item)
+            else:
+                node, node_root_vertex, exit_vertex = item
+                pile += reversed(
+                    node.add_to_control_flow_graph(node_root_vertex, exit_vertex, vertices, edges)
+                )
+        vertices.append(end_vertex)
+        return control_flow_graph.ControlFlowGraph(root_vertex, end_vertex, vertices, edges)
+
+    def new_root_vertex(self):
+        """Returns a new vertex for the first instruction of the program"""
+        return control_flow_graph.Vertex(self.label, self.vertex_operation)
+
+    def add_to_control_flow_graph(self, root_vertex, exit_vertex, vertices, edges):
+        """
+        Adds the vertices and edges of the node to vertices and edges, root_vertex being the
+        vertex of the node (see new_root_vertex) and exit_vertex the vertex reached at the end of
+        the node. Returns the list of the (node, root vertex, exit vertex) to add next, and of the
+        edges to add after them, in order.
+        """
         raise NotImplementedError
 
 
 class SkipNode(UnaryNode, ProgramNode):
+    vertex_operation = 'skip'
+
     def __init__(self, expression, label):
         super().__init__(expression)
         self.label = label
         self.seen_labels.append(label)
 
-    def to_control_flow_graph(self):
-        root_vertex = Vertex(self.label, 'skip')
-        end_vertex = Vertex('_', 'end')
-        edge = Edge(root_vertex, end_vertex, BooleanNode('true'), self)
-        return ControlFlowGraph(root_vertex, end_vertex, [root_vertex, end_vertex], [edge])
+    def add_to_control_flow_graph(self, root_vertex, exit_vertex, vertices, edges):
+        vertices.append(root_vertex)
+        edges.append(control_flow_graph.Edge(root_vertex, exit_vertex, BooleanNode('true'), self))
+        return []
 
     def eval(self, env):
         return env
 
+    def to_python(self, variable):
+        return 'pass'
+
     def to_dict(self):
         return {'{}: skip'.format(self.label): self.expression}
 
@@ -290,21 +432,33 @@ class SkipNode(UnaryNode, ProgramNode):
 
 
 class AssignmentNode(BinaryNode, ProgramNode):
+    vertex_operation = 'assignment'
+
     def __init__(self, left_expression, right_expression, label):
         super().__init__(left_expression, right_expression)
         self.label = label
         self.seen_labels.append(label)
 
-    def to_control_flow_graph(self):
-        root_vertex = Vertex(self.label, 'assignment')
-        end_vertex = Vertex('_', 'end')
-        edge = Edge(root_vertex, end_vertex, BooleanNode('true'), self)
-        return ControlFlowGraph(root_vertex, end_vertex, [root_vertex, end_vertex], [edge])
+    def add_to_control_flow_graph(self, root_vertex, exit_vertex, vertices, edges):
+        vertices.append(root_vertex)
+        edges.append(control_flow_graph.Edge(root_vertex, exit_vertex, BooleanNode('true'), self))
+        return []
 
     def eval(self, env):
         env[self.left_expression.expression] = self.right_expression.eval(env)
         return env
 
+    def to_python(self, variable):
+        left = self.left_expression.to_python(variable)
+        right = self.right_expression.to_python(variable)
+        if isinstance(self.right_expression, VariableNode):
+            # copying a variable must fail as any other read when the variable is undefined (see
+            # model.compiler.UNDEFINED), the value itself is copied as is
+            return 'if {right} is UNDEFINED:\n    raise ExecutionError\n{left} = {right}'.format(
+                left=left, right=right
+            )
+        return '{} = {}'.format(left, right)
+
     def to_dict(self):
         return {
             '{}: assignment'.format(self.label): {
@@ -315,18 +469,19 @@ class AssignmentNode(BinaryNode, ProgramNode):
 
 
 class SequenceNode(BinaryNode, ProgramNode):
-    def to_control_flow_graph(self):
-        cover_graph_1 = self.left_expression.to_control_flow_graph()
-        cover_graph_2 = self.right_expression.to_control_flow_graph()
-        root_vertex = cover_graph_1.root_vertex
-        end_vertex = cover_graph_2.end_vertex
-        vertices = cover_graph_1.vertices + cover_graph_2.vertices
-        vertices.remove(cover_graph_1.end_vertex)
-        edges = (
-            cover_graph_1.renamed_edges(cover_graph_1.end_vertex, cover_graph_2.root_vertex) +
-            cover_graph_2.edges
-        )
-        return ControlFlowGraph(root_vertex, end_vertex, vertices, edges)
+    def new_root_vertex(self):
+        # the vertex of a sequence is the one of its first instruction
+        node = self.left_expression
+        while isinstance(node, SequenceNode):
+            node = node.left_expression
+        return node.new_root_vertex()
+
+    def add_to_control_flow_graph(self, root_vertex, exit_vertex, vertices, edges):
+        right_root_vertex = self.right_expression.new_root_vertex()
+        return [
+            (self.left_expression, root_vertex, right_root_vertex),
+            (self.right_expression, right_root_vertex, exit_vertex),
+        ]
 
     def eval(self, env):
         env = self.left_expression.eval(env)
@@ -340,31 +495,31 @@ class SequenceNode(BinaryNode, ProgramNode):
 
 
 class WhileNode(BinaryNode, ProgramNode):
+    vertex_operation = 'while'
+
     def __init__(self, left_expression, right_expression, label):
         super().__init__(left_expression, right_expression)
         self.label = label
         self.seen_labels.append(label)
 
-    def to_control_flow_graph(self):
-        cover_graph = self.right_expression.to_control_flow_graph()
-        root_vertex = Vertex(self.label, 'while')
-        end_vertex = cover_graph.end_vertex
-        vertices = [root_vertex] + cover_graph.vertices
-        edges = [
-            Edge(
-                root_vertex,
-                cover_graph.root_vertex,
-                self.left_expression, SkipNode('_', self.label)
+    def add_to_control_flow_graph(self, root_vertex, exit_vertex, vertices, edges):
+        body_root_vertex = self.right_expression.new_root_vertex()
+        vertices.append(root_vertex)
+        edges.append(
+            control_flow_graph.Edge(
+                root_vertex, body_root_vertex, self.left_expression, SkipNode('_', self.label)
             )
-        ] + cover_graph.renamed_edges(cover_graph.end_vertex, root_vertex) + [
-            Edge(
+        )
+        # the body goes back to the while vertex
+        return [
+            (self.right_expression, body_root_vertex, root_vertex),
+            control_flow_graph.Edge(
                 root_vertex,
-                end_vertex,
+                exit_vertex,
                 NotNode(self.left_expression),
                 SkipNode('_', self.label)
             )
         ]
-        return ControlFlowGraph(root_vertex, end_vertex, vertices, edges)
 
     def eval(self, env):
         if self.left_expression.eval(env):
@@ -380,35 +535,39 @@ class WhileNode(BinaryNode, ProgramNode):
 
 
 class IfNode(Node, ProgramNode):
+    vertex_operation = 'if'
+
     def __init__(self, condition_expression, then_expression, else_expression, label):
         self.condition_expression = condition_expression
         self.then_expression = then_expression
         self.else_expression = else_expression
+        self._set_kinds()
         self.label = label
         self.seen_labels.append(label)
 
-    def to_control_flow_graph(self):
-        cover_graph_1 = self.then_expression.to_control_flow_graph()
-        cover_graph_2 = self.else_expression.to_control_flow_graph()
-        root_vertex = Vertex(self.label, 'if')
-        end_vertex = cover_graph_2.end_vertex
-        vertices = [root_vertex] + cover_graph_1.vertices[:-1] + cover_graph_2.vertices
-        edges = [
-            Edge(
+    def add_to_control_flow_graph(self, root_vertex, exit_vertex, vertices, edges):
+        then_root_vertex = self.then_expression.new_root_vertex()
+        else_root_vertex = self.else_expression.new_root_vertex()
+        vertices.append(root_vertex)
+        edges.append(
+            control_flow_graph.Edge(
                 root_vertex,
-                cover_graph_1.root_vertex,
+                then_root_vertex,
                 self.condition_expression,
-                SkipNode('_', cover_graph_1.root_vertex.label)
+                SkipNode('_', then_root_vertex.label)
             )
-        ] + cover_graph_1.renamed_edges(cover_graph_1.end_vertex, cover_graph_2.end_vertex) + [
-            Edge(
+        )
+        # both branches continue to the exit vertex of the if
+        return [
+            (self.then_expression, then_root_vertex, exit_vertex),
+            control_flow_graph.Edge(
                 root_vertex,
-                cover_graph_2.root_vertex,
+                else_root_vertex,
                 NotNode(self.condition_expression),
-                SkipNode('_', cover_graph_2.root_vertex.label)
-            )
-        ] + cover_graph_2.edges
-        return ControlFlowGraph(root_vertex, end_vertex, vertices, edges)
+                SkipNode('_', else_root_vertex.label)
+            ),
+            (self.else_expression, else_root_vertex, exit_vertex),
+        ]
 
     def eval(self, env):
         if self.condition_expression.eval(env):
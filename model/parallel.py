@@ -0,0 +1,86 @@
+"""
+Autors: Yoann Gauthier and Thibaut Seys
+Date: 18/10/2026
+
+This file defines the execution of test sets by a pool of worker processes.
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+
+# number of test sets sent at once to a worker when they are read lazily
+STREAM_CHUNK_SIZE = 256
+
+# compact control flow graph of a worker process, set once by _init_worker
+_control_flow_graph = None
+
+
+def _init_worker(control_flow_graph):
+    global _control_flow_graph
+    _control_flow_graph = control_flow_graph
+
+
+def _run_chunk(method, test_sets):
+    return getattr(_control_flow_graph, method)(test_sets)
+
+
+def get_chunks(test_sets, jobs, chunks_per_job=4):
+    """
+    Splits test_sets in consecutive chunks. Each job gets several chunks so that a chunk of long
+    executions does not keep the other workers waiting.
+    """
+    chunk_size = max(1, -(-len(test_sets) // (jobs * chunks_per_job)))
+    return [test_sets[start:start + chunk_size] for start in range(0, len(test_sets), chunk_size)]
+
+
+def run_in_parallel(control_flow_graph, method, test_sets, jobs):
+    """
+    Returns the results of the given method of a compact control flow graph (get_all_paths or
+    get_all_traces) on test_sets, in the test_sets order, using jobs worker processes. The graph
+    is sent once to each worker (its compiled functions are rebuilt there, see
+    CompactControlFlowGraph.__getstate__), then test sets are sent by chunks.
+    """
+    test_sets = list(test_sets)
+    chunks = get_chunks(test_sets, jobs)
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=_init_worker, initargs=(control_flow_graph,)
+    ) as executor:
+        results = []
+        for chunk_results in executor.map(_run_chunk, [method] * len(chunks), chunks):
+            results += chunk_results
+    return results
+
+
+def iter_in_parallel(control_flow_graph, method, test_sets, jobs, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Yields the results of run_in_parallel one by one, in the test_sets order. test_sets can be
+    any iterable, it is read lazily by chunks of chunk_size test sets: at most two chunks per job
+    are waiting for their results at any time, so that memory does not grow with the number of
+    test sets.
+    """
+    test_sets = iter(test_sets)
+    chunks = iter(lambda: list(islice(test_sets, chunk_size)), [])
+    for results in iter_chunks_in_parallel(control_flow_graph, method, chunks, jobs):
+        yield from results
+
+
+def iter_chunks_in_parallel(control_flow_graph, method, chunks, jobs):
+    """
+    Yields the results of the given method on each chunk of test sets, in the chunks order.
+    chunks is read lazily, at most two chunks per job waiting for their results. An empty chunk
+    is not sent to a worker: its empty results are yielded as soon as the chunks before it are
+    done, which lets the caller yield what it already knows (see TraceMemo.iter_traces).
+    """
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=_init_worker, initargs=(control_flow_graph,)
+    ) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_run_chunk, method, chunk) if chunk else None)
+            while pending and (pending[0] is None or len(pending) >= 2 * jobs):
+                future = pending.popleft()
+                yield future.result() if future is not None else []
+        while pending:
+            future = pending.popleft()
+            yield future.result() if future is not None else []
@@ -32,6 +32,28 @@ from model.tokenizer import Token
 
 
 class ProgramParser(object):
+    """
+    Parses the tokens in a single left to right pass, without backtracking. The grammar is:
+        program     ::= statement (';' statement)*
+        statement   ::= [label ':'] ('skip' | variable ':=' arithmetic | '{' program '}' |
+                        'while' [label ':'] boolean 'do' statement |
+                        'if' [label ':'] boolean 'then' statement 'else' statement)
+        arithmetic  ::= number | variable | '(' parenthesized ')'
+        boolean     ::= 'true' | 'false' | '!' boolean | arithmetic comparator arithmetic |
+                        '(' parenthesized ')'
+        parenthesized ::= operand (arithmetic_operator arithmetic)* |
+                          operand [comparator arithmetic] (('&' | '|') boolean)*
+        operand     ::= 'true' | 'false' | '!' boolean | arithmetic
+    Arithmetic operators share the same precedence and are left associative, comparators bind
+    tighter than '&' and '|', which are left associative. 'true' and 'false' are variables when
+    they are compared.
+    This is precedence climbing with a single level per kind of operator: arithmetic operators
+    and '&' / '|' never mix in a pair of parentheses, and a comparator only follows its first
+    operand, so the climbing comes down to the left folding loops of parse_parenthesized.
+    Each parsing method is a generator which yields the generators parsing its sub expressions
+    and receives their nodes: _run keeps them on an explicit stack, so deeply nested programs do
+    not reach the python recursion limit.
+    """
     arithmetic_operator_mapping = {
         '+': AddNode,
         '-': MinusNode,
@@ -59,202 +81,178 @@ class ProgramParser(object):
         """Method to call to parse an entire source code"""
         Node.seen_labels = []
         self.index = 0
-        self.tokens = ['{'] + self.tokens + ['}']
         self.end = len(self.tokens)
-        to_return = self.parse_program()
-        self.tokens = self.tokens[1:-1]
-        return to_return
+        return self._run(self.parse_program())
 
-    def parse_program(self, previous_nodes=[], expected=[]):
-        """Parsing logic for program instructions"""
-        self._check_end()
+    def parse_program(self, closing=None):
+        """Parsing logic for a sequence of instructions, ended by closing (None for the end)"""
+        node = yield self.parse_statement()
+        while self._peek() == ';':
+            self.index += 1
+            right_node = yield self.parse_statement()
+            node = SequenceNode(node, right_node)
+        if closing is None:
+            if self.index != self.end:
+                raise ParsingError
+        else:
+            self._expect(closing)
+        return node
+
+    def parse_statement(self):
+        """Parsing logic for one instruction"""
         label = self._parse_label()
-        current_token = self.tokens[self.index]
-        self.index += 1
+        current_token = self._next()
 
         if current_token == 'skip':
-            current_node = SkipNode('_', label)
-            return self._parse_if_expected_not_empty(
-                expected, current_node, previous_nodes, self.parse_program
-            )
-        elif current_token == ';':
-            self._check_not_empty(previous_nodes)
-            left_node = previous_nodes[0]
-            right_node = self.parse_program()
-            current_node = SequenceNode(left_node, right_node)
-            return self._parse_if_expected_not_empty(
-                expected, current_node, previous_nodes, self.parse_program
-            )
+            return SkipNode('_', label)
         elif current_token == '{':
-            return self.parse_program(previous_nodes, ['}'] + expected)
-        elif current_token == '}':
-            return self._parse_closing_bracket(
-                '}', previous_nodes, expected, self.parse_program
-            )
-        elif Token.is_identifier(current_token):
-            if self.tokens[self.index] == ':=':
-                self.index += 1
-                left_node = VariableNode(current_token)
-                right_node = self.parse_arithmetic()
-                current_node = AssignmentNode(left_node, right_node, label)
-                return self._parse_if_expected_not_empty(
-                    expected, current_node, previous_nodes, self.parse_program
-                )
-            raise ParsingError
+            return (yield self.parse_program('}'))
         elif current_token == 'while':
             label = self._parse_label()
-            left_node = self.parse_boolean()
-            if self.tokens[self.index] == 'do':
-                self.index += 1
-                right_node = self.parse_program()
-                current_node = WhileNode(left_node, right_node, label)
-                return self._parse_if_expected_not_empty(
-                    expected, current_node, previous_nodes, self.parse_program
-                )
-            raise ParsingError
+            condition_node = yield self.parse_boolean()
+            self._expect('do')
+            body_node = yield self.parse_statement()
+            return WhileNode(condition_node, body_node, label)
         elif current_token == 'if':
             label = self._parse_label()
-            condition_node = self.parse_boolean()
-
-            if self.tokens[self.index] == 'then':
-                self.index += 1
-                then_node = self.parse_program()
-            else:
-                raise ParsingError
-
-            if self.tokens[self.index] == 'else':
-                self.index += 1
-                else_node = self.parse_program()
-            else:
-                raise ParsingError
-
-            current_node = IfNode(condition_node, then_node, else_node, label)
-            return self._parse_if_expected_not_empty(
-                expected, current_node, previous_nodes, self.parse_program
-            )
+            condition_node = yield self.parse_boolean()
+            self._expect('then')
+            then_node = yield self.parse_statement()
+            self._expect('else')
+            else_node = yield self.parse_statement()
+            return IfNode(condition_node, then_node, else_node, label)
+        elif self._is_identifier(current_token) and self._peek() == ':=':
+            self.index += 1
+            right_node = yield self.parse_arithmetic()
+            return AssignmentNode(VariableNode(current_token), right_node, label)
         raise ParsingError
 
-    def parse_arithmetic(self, previous_nodes=[], expected=[]):
-        """Parsing logic for arithmetic expression"""
-        self._check_end()
-        current_token = self.tokens[self.index]
-        self.index += 1
+    def parse_arithmetic(self):
+        """Parsing logic for an arithmetic operand: a number, a variable or a parenthesized
+        expression"""
+        current_token = self._next()
 
-        if type(current_token) == int:
-            current_node = NumberNode(current_token)
-            return self._parse_if_expected_not_empty(
-                expected, current_node, previous_nodes, self.parse_arithmetic
-            )
-        elif Token.is_identifier(current_token):
-            current_node = VariableNode(current_token)
-            return self._parse_if_expected_not_empty(
-                expected, current_node, previous_nodes, self.parse_arithmetic
-            )
+        if Token.is_number(current_token):
+            return NumberNode(current_token)
+        elif self._is_identifier(current_token):
+            return VariableNode(current_token)
         elif current_token == '(':
-            return self.parse_arithmetic(previous_nodes, [')'] + expected)
-        elif current_token == ')':
-            return self._parse_closing_bracket(
-                ')', previous_nodes, expected, self.parse_arithmetic
-            )
-        elif current_token in Token.arithmetic_operators:
-            self._check_not_empty(previous_nodes)
-            current_node = self.arithmetic_operator_mapping[current_token](
-                previous_nodes[0], self.parse_arithmetic()
-            )
-            return self._parse_if_expected_not_empty(
-                expected, current_node, previous_nodes, self.parse_arithmetic
-            )
+            node = yield self.parse_parenthesized()
+            if node.is_arithmetic():
+                return node
         raise ParsingError
 
-    def parse_boolean(self, previous_nodes=[], expected=[]):
-        """Parsing logic for boolean expression"""
-        try:
-            current_index = self.index
-            current_node = self.parse_arithmetic()
+    def parse_boolean(self):
+        """Parsing logic for a boolean expression (condition or operand of '&' and '|')"""
+        current_token = self._peek()
 
-            return self.parse_boolean([current_node] + previous_nodes, expected)
-        except ParsingError:
-            self.index = current_index
-            self._check_end()
-            current_token = self.tokens[self.index]
+        if current_token == '!':
+            self.index += 1
+            return NotNode((yield self.parse_boolean()))
+        elif current_token in Token.boolean_key_words and self._peek(1) not in Token.comparators:
+            self.index += 1
+            return BooleanNode(current_token)
+        elif current_token == '(':
             self.index += 1
+            left_node = yield self.parse_parenthesized()
+            if not left_node.is_arithmetic():
+                return left_node
+        else:
+            left_node = yield self.parse_arithmetic()
 
-            if current_token in Token.boolean_key_words:
-                current_node = BooleanNode(current_token)
-                return self._parse_if_expected_not_empty(
-                    expected, current_node, previous_nodes, self.parse_boolean
-                )
-            elif current_token == '!':
-                current_node = NotNode(self.parse_boolean(previous_nodes, expected))
-                return self._parse_if_expected_not_empty(
-                    expected, current_node, previous_nodes, self.parse_boolean
-                )
-            elif current_token == '(':
-                return self.parse_boolean(previous_nodes, [')'] + expected)
-            elif current_token == ')':
-                return self._parse_closing_bracket(
-                    ')', previous_nodes, expected, self.parse_boolean
-                )
-            elif current_token in Token.comparators:
-                self._check_not_empty(previous_nodes)
-                left_node = previous_nodes[0]
-                if left_node.is_arithmetic():
-                    right_node = self.parse_arithmetic(previous_nodes[1:])
-                    current_node = self.comparator_mapping[current_token](
-                        left_node, right_node
-                    )
-                    return self._parse_if_expected_not_empty(
-                        expected, current_node, previous_nodes, self.parse_boolean
-                    )
-                raise ParsingError
-            elif current_token in Token.boolean_operators:
-                self._check_not_empty(previous_nodes)
-                left_node = previous_nodes[0]
-                if left_node.is_boolean():
-                    right_node = self.parse_boolean(previous_nodes[1:])
-                    current_node = self.boolean_operator_mapping[current_token](
-                        left_node, right_node
-                    )
-                    return self._parse_if_expected_not_empty(
-                        expected, current_node, previous_nodes, self.parse_boolean
-                    )
-                raise ParsingError
+        current_token = self._next()
+        if current_token not in Token.comparators:
             raise ParsingError
+        right_node = yield self.parse_arithmetic()
+        return self.comparator_mapping[current_token](left_node, right_node)
+
+    def parse_parenthesized(self):
+        """Parsing logic for an arithmetic or boolean expression between parentheses, the
+        opening one being already read"""
+        current_token = self._peek()
+        next_token = self._peek(1)
+        if current_token in Token.boolean_key_words and next_token in self.boolean_operator_mapping:
+            self.index += 1
+            node = BooleanNode(current_token)
+        elif current_token == '!':
+            self.index += 1
+            node = NotNode((yield self.parse_boolean()))
+        elif current_token == '(':
+            self.index += 1
+            node = yield self.parse_parenthesized()
+        else:
+            node = yield self.parse_arithmetic()
+
+        current_token = self._peek()
+        if current_token in self.arithmetic_operator_mapping:
+            while current_token in self.arithmetic_operator_mapping:
+                if not node.is_arithmetic():
+                    raise ParsingError
+                self.index += 1
+                right_node = yield self.parse_arithmetic()
+                node = self.arithmetic_operator_mapping[current_token](node, right_node)
+                current_token = self._peek()
+        else:
+            if current_token in self.comparator_mapping:
+                if not node.is_arithmetic():
+                    raise ParsingError
+                self.index += 1
+                right_node = yield self.parse_arithmetic()
+                node = self.comparator_mapping[current_token](node, right_node)
+                current_token = self._peek()
+            while current_token in self.boolean_operator_mapping:
+                if not node.is_boolean():
+                    raise ParsingError
+                self.index += 1
+                right_node = yield self.parse_boolean()
+                node = self.boolean_operator_mapping[current_token](node, right_node)
+                current_token = self._peek()
+        self._expect(')')
+        return node
 
-    def _check_end(self):
-        """Check if we are at the end of the token list"""
+    @staticmethod
+    def _run(parser):
+        """Runs the parser generator and the generators it yields, returns its node"""
+        pile = [parser]
+        node = None
+        while pile:
+            try:
+                child = pile[-1].send(node)
+            except StopIteration as stop:
+                pile.pop()
+                node = stop.value
+            else:
+                pile.append(child)
+                node = None
+        return node
+
+    def _peek(self, offset=0):
+        """Returns the token offset tokens after the current one, None after the end"""
+        index = self.index + offset
+        return self.tokens[index] if index < self.end else None
+
+    def _next(self):
+        """Returns the current token and moves to the next one"""
         if self.index == self.end:
             raise ParsingError
+        self.index += 1
+        return self.tokens[self.index - 1]
 
-    def _check_not_empty(self, to_check):
-        """Check if given variable is empty"""
-        if to_check == []:
+    def _expect(self, token):
+        """Moves to the next token if the current one is token"""
+        if self._next() != token:
             raise ParsingError
 
-    def _parse_if_expected_not_empty(self, expected, current_node, previous_nodes, parsing_func):
-        """Parsing logic when we expect expected not empty"""
-        if expected == []:
-            return current_node
-        return parsing_func([current_node] + previous_nodes, expected)
-
-    def _parse_closing_bracket(self, bracket, previous_nodes, expected, parsing_func):
-        """Parsing logic when it is a closing bracket"""
-        if expected == [] or previous_nodes == []:
-            raise ParsingError
-        elif expected[0] == bracket:
-            if len(expected) == 1:
-                return previous_nodes[0]
-            else:
-                return parsing_func(previous_nodes, expected[1:])
-        raise ParsingError
+    @staticmethod
+    def _is_identifier(token):
+        """Check if token is an identifier"""
+        return type(token) == str and Token.is_identifier(token)
 
     def _parse_label(self):
         """Util function to parse label"""
-        label = self.tokens[self.index]
+        label = self._peek()
         if not Token.is_number(label):
             return None
         self.index += 1
-        if not self.tokens[self.index] == ':':
-            raise ParsingError
-        self.index += 1
+        self._expect(':')
         return label
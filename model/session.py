@@ -0,0 +1,95 @@
+"""
+Autors: Yoann Gauthier and Thibaut Seys
+Date: 18/10/2026
+
+This file defines the coverage sessions, which check criteria against test sets added one by one.
+"""
+from model.trace import TraceMemo
+
+
+class CoverageSession(object):
+    """
+    Coverage of several criteria on a control flow graph, updated each time a test set is added.
+    The elements to cover are computed once, when the session is created: adding a test set only
+    runs it and gives its trace to every criteria, so that a test generator can ask whether an
+    input adds coverage without checking the previous test sets again. A test set added again is
+    skipped, it can not cover new elements: the memo of the session only keeps the keys of the
+    test sets added (see TraceMemo).
+    + properties:
+        - control_flow_graph: the compact control flow graph
+        - criterias: the criteria, prepared for the graph
+        - memo: the TraceMemo running the test sets
+        - test_set_count: the number of test sets added
+    + methods:
+        - add: runs a test set, returns True if it covered new elements
+        - add_all: adds test sets read lazily, only running the distinct ones
+        - add_trace: same as add for an already executed test set (see Trace)
+        - get_covered_count: returns the total number of covered elements
+        - get_status: returns the coverage of each criteria
+    """
+
+    def __init__(self, control_flow_graph, criterias):
+        self.control_flow_graph = control_flow_graph.freeze()
+        self.criterias = criterias
+        self.memo = TraceMemo(self.control_flow_graph, keep_traces=False)
+        self.test_set_count = 0
+        for criteria in criterias:
+            criteria.prepare(self.control_flow_graph)
+
+    def add(self, test_set):
+        """Runs test_set, returns True if it covered elements no previous test set covered"""
+        trace = self.memo.get_trace(test_set)
+        if trace is None:
+            self.test_set_count += 1
+            return False
+        return self.add_trace(trace)
+
+    def add_all(self, test_sets, jobs=1):
+        """
+        Adds test_sets, any iterable read lazily, the distinct test sets being run by jobs
+        processes if jobs > 1 (see TraceMemo.iter_traces)
+        """
+        test_set_count = self.test_set_count - self.memo.test_set_count
+        for trace in self.memo.iter_traces(test_sets, jobs):
+            self.add_trace(trace)
+        # the test sets skipped by the memo are counted too
+        self.test_set_count = test_set_count + self.memo.test_set_count
+
+    def add_trace(self, trace):
+        """
+        Gives the trace to every criteria, returns True if it covered new elements. The error of
+        a failed execution (or of a condition, for TC) is raised before any criteria is updated.
+        """
+        for criteria in self.criterias:
+            error = criteria.get_trace_error(trace)
+            if error is not None:
+                raise error
+        covered_count = self.get_covered_count()
+        for criteria in self.criterias:
+            criteria.add_trace(trace)
+        self.test_set_count += 1
+        return self.get_covered_count() > covered_count
+
+    def get_covered_count(self):
+        """Returns the number of covered elements, over all the criteria"""
+        return sum(criteria.get_covered_count() for criteria in self.criterias)
+
+    def get_status(self):
+        """Returns (criteria, covered count, to cover count, coverage in %) for each criteria"""
+        return [
+            (
+                criteria,
+                criteria.get_covered_count(),
+                criteria.get_to_cover_count(),
+                criteria.get_coverage(),
+            )
+            for criteria in self.criterias
+        ]
+
+    def __str__(self):
+        to_return = 'Coverage after {} test sets'.format(self.test_set_count)
+        for criteria, covered_count, to_cover_count, coverage in self.get_status():
+            to_return += '\n{} : {} / {} ({:.2f}%)'.format(
+                repr(criteria), covered_count, to_cover_count, coverage
+            )
+        return to_return
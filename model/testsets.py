@@ -0,0 +1,125 @@
+"""
+Autors: Yoann Gauthier and Thibaut Seys
+Date: 18/10/2026
+
+This file defines the lazy readers of the test sets files, which are never loaded as a whole.
+"""
+from json import JSONDecodeError, loads
+import re
+
+
+# number of characters read at once from a JSON array file
+CHUNK_SIZE = 1 << 16
+
+# characters delimiting the values of a JSON array, and the ones ending a string or escaping
+_STRUCTURE = re.compile(r'[\[\]{},"]')
+_STRING_END = re.compile(r'["\\]')
+
+
+def iter_test_sets(filepath, chunk_size=CHUNK_SIZE):
+    """
+    Yields the test sets of the file one by one. The file is either a JSON array of test sets or
+    a JSON Lines file, with one test set per line: the format is given by the first character of
+    the file.
+    """
+    with open(filepath, 'r') as test_sets_file:
+        first_character = ' '
+        while first_character and first_character.isspace():
+            first_character = test_sets_file.read(1)
+        test_sets_file.seek(0)
+        if first_character == '[':
+            yield from iter_json_array(test_sets_file, chunk_size)
+        else:
+            yield from iter_json_lines(test_sets_file)
+
+
+def iter_json_lines(lines_file):
+    """Yields the values of a JSON Lines file, blank lines are skipped"""
+    for line_number, line in enumerate(lines_file, 1):
+        if line.strip():
+            try:
+                yield loads(line)
+            except JSONDecodeError as error:
+                raise JSONDecodeError(
+                    'line {}: {}'.format(line_number, error.msg), error.doc, error.pos
+                ) from None
+
+
+def iter_json_array(array_file, chunk_size=CHUNK_SIZE):
+    """
+    Yields the values of a top level JSON array one by one. The file is read by chunks of
+    chunk_size characters, which are scanned for the commas separating the values of the array
+    (outside of strings and nested values): each value is decoded as soon as it is complete, so
+    that only one value is kept in memory. Anything but whitespace after the array raises a
+    JSONDecodeError, once the values of the array have been yielded.
+    """
+    opened = False
+    depth = 0  # depth of the current position inside the current value
+    in_string = escaped = False
+    after_comma = False
+    pieces = []  # text of the current value, over several chunks
+    while True:
+        chunk = array_file.read(chunk_size)
+        if not chunk:
+            raise JSONDecodeError('Unterminated array', ''.join(pieces), 0)
+        position = 0
+        if not opened:
+            position = len(chunk) - len(chunk.lstrip())
+            if position == len(chunk):
+                continue
+            if chunk[position] != '[':
+                raise JSONDecodeError('Expecting \'[\'', chunk, position)
+            opened = True
+            position += 1
+        start = position
+        while True:
+            if in_string:
+                if escaped:
+                    if position == len(chunk):
+                        break
+                    position += 1
+                    escaped = False
+                match = _STRING_END.search(chunk, position)
+                if match is None:
+                    break
+                position = match.end()
+                if match.group() == '\\':
+                    escaped = True
+                else:
+                    in_string = False
+                continue
+            match = _STRUCTURE.search(chunk, position)
+            if match is None:
+                break
+            character = match.group()
+            position = match.end()
+            if character == '"':
+                in_string = True
+            elif character in '[{':
+                depth += 1
+            elif depth:
+                if character != ',':
+                    depth -= 1
+            elif character in '],':
+                # end of a value of the array
+                pieces.append(chunk[start:position - 1])
+                text = ''.join(pieces)
+                pieces = []
+                start = position
+                if text.strip():
+                    yield loads(text)
+                elif character == ',' or after_comma:
+                    raise JSONDecodeError('Expecting value', chunk, position - 1)
+                if character == ']':
+                    # as with json.load, only whitespace can follow the array
+                    while chunk:
+                        rest = chunk[position:]
+                        if rest.strip():
+                            extra = position + len(rest) - len(rest.lstrip())
+                            raise JSONDecodeError('Extra data', chunk, extra)
+                        chunk, position = array_file.read(chunk_size), 0
+                    return
+                after_comma = True
+            else:
+                raise JSONDecodeError('Unexpected \'}\'', chunk, position - 1)
+        pieces.append(chunk[start:])
@@ -5,65 +5,59 @@ Date: 21/02/2018
 This file defines the Tokenizer class which is used to tokenized a given source code. The Token
 class defines the Token class as well which contains some control functions for token.
 """
+import re
 
 
 class Tokenizer(object):
+    """
+    The tokenizer reads the source code line by line and cuts each line with a single regular
+    expression: spaces and comments (from '#' to the end of the line) are skipped, symbols are
+    one character long except ':=', '<=' and '>=', and the other characters are grouped into
+    words, which are numbers or names.
+    """
+    token_regex = re.compile(r"""
+        \s*(?:
+            (?P<comment>\#.*)
+            |(?P<symbol>[:<>]=?|[!(){}\-+*/&|;=])
+            |(?P<word>[^\s\#!(){}\-+*/&|;=:<>]+)
+        )
+    """, re.VERBOSE)
+
+    @staticmethod
+    def iter_tokens(program_file):
+        """
+        Yields the (kind, value, line, column) tokens of the source code read from program_file,
+        kind being 'symbol', 'name' or 'number' (value is then an int). Lines and columns start
+        at 1.
+        """
+        finditer = Tokenizer.token_regex.finditer
+        for line_number, line in enumerate(program_file, 1):
+            for match in finditer(line):
+                kind = match.lastgroup
+                if kind == 'comment':
+                    break
+                value = match.group(kind)
+                column = match.start(kind) + 1
+                if kind == 'word':
+                    # only words starting with a digit can be numbers
+                    value = Token.number(value) if value[0].isdigit() else value
+                    kind = 'number' if Token.is_number(value) else 'name'
+                yield kind, value, line_number, column
+
     @staticmethod
     def clear(text_lines):
         """This method clear comments, spaces and tabulations from raw code"""
-        if text_lines == []:
-            return []
-        elif text_lines[0] == '':
-            return Tokenizer.clear(text_lines[1:])
-        elif text_lines[0][0] == '#':
-            return Tokenizer.clear(text_lines[1:])
-        elif text_lines[0][0] in [' ', '\t']:
-            return Tokenizer.clear([text_lines[0][1:]] + text_lines[1:])
-        else:
-            return [text_lines[0]] + Tokenizer.clear(text_lines[1:])
+        cleared_lines = []
+        for line in text_lines:
+            line = line.lstrip(' \t')
+            if line and line[0] != '#':
+                cleared_lines.append(line)
+        return cleared_lines
 
     @staticmethod
     def tokenize(text):
         """Tokenenize text from raw source code"""
-        tokenized_text = []
-        current_token = ''
-
-        for char in text:
-            if char in ' \n\t':
-                if len(current_token) > 0:
-                    tokenized_text.append(current_token)
-                    current_token = ''
-                continue
-
-            if len(current_token) == 1 and current_token in ':<>':
-                if char != '=':
-                    tokenized_text.append(current_token)
-                    current_token = char
-                else:
-                    current_token += char
-                    tokenized_text.append(current_token)
-                    current_token = ''
-                continue
-
-            if char in '!(){}-+*/&|;=':
-                if len(current_token) > 0:
-                    tokenized_text.append(current_token)
-                    current_token = ''
-                tokenized_text.append(char)
-                continue
-
-            if char in ':<>':
-                if len(current_token) > 0:
-                    tokenized_text.append(current_token)
-                    current_token = ''
-                current_token += char
-                continue
-
-            current_token += char
-
-        tokenized_text.append(current_token) if current_token else None
-
-        return [Token.number(token) for token in tokenized_text]
+        return [token[1] for token in Tokenizer.iter_tokens(text.split('\n'))]
 
 
 class Token(object):
@@ -0,0 +1,383 @@
+"""
+Autors: Yoann Gauthier and Thibaut Seys
+Date: 18/10/2026
+
+This file defines the execution traces of test sets, shared by all the criteria.
+"""
+import heapq
+from array import array
+from collections import OrderedDict, deque
+
+from model.parallel import iter_chunks_in_parallel
+
+
+class Trace(object):
+    """
+    Execution of one test set.
+    + properties:
+        - path: the vertex ids visited by the execution, None if the execution failed, a
+          CompressedPath if loops of the execution were accelerated
+        - conditions: set of (atom id, value) pairs for the conditions of every guard tested,
+          an atom id being an index in CompactControlFlowGraph.atoms
+        - error: the exception which stopped the execution, None if it succeeded
+        - condition_error: the exception raised by a condition the execution did not need to
+          evaluate (python does not evaluate the right side of and/or when the left side is
+          enough), None if there is no such exception
+    """
+    __slots__ = ('path', 'conditions', 'error', 'condition_error')
+
+    def __init__(self, path, conditions, error=None, condition_error=None):
+        self.path = path
+        self.conditions = conditions
+        self.error = error
+        self.condition_error = condition_error
+
+
+# number of distinct test sets whose keys (and traces) are kept by a TraceMemo, and number of test
+# sets given several times shown in its report
+MEMO_SIZE = 1 << 16
+SHOWN_MULTIPLICITIES = 10
+# size of the bitmap of the hashes of the keys forgotten by a TraceMemo (1 MiB)
+FORGOTTEN_BITS = 1 << 23
+
+# number of iterations of a loop after which its iterations are expected to repeat, see
+# CompressedPath.extend
+MAX_PERIOD = 16
+
+
+def count_repetitions(data, block, start, end, backward=False):
+    """
+    Returns the number of times block is repeated in data[start:end], from start (or backward
+    from end). The repetitions are compared as a whole, the largest number being found by a
+    binary search.
+    """
+    low, high = 0, (end - start) // len(block)
+    while low < high:
+        middle = (low + high + 1) // 2
+        size = middle * len(block)
+        piece = data[end - size:end] if backward else data[start:start + size]
+        if piece == block * middle:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+class CompressedPath(object):
+    """
+    Execution path of a test set with long loops, stored as a list of segments repeated a given
+    number of times: the iterations of a loop following the same edges (or the same sequence of
+    at most MAX_PERIOD iterations) form a single segment, so that the memory used depends on the
+    different behaviours of the loops and not on their number of iterations. Loops accelerated
+    by model.acceleration are segments too. The path is only expanded on iteration.
+    + properties:
+        - segments: list of (vertex ids array, count) pairs, in the path order
+    + methods:
+        - append: appends a segment, merging it with the previous one if they are the same
+        - extend: appends a part of the path, compressing the iterations of its loop
+        - iter_vertices: yields the vertices of the path, each segment being repeated at most a
+          given number of times
+    """
+    __slots__ = ('segments',)
+
+    def __init__(self, segments=None):
+        self.segments = segments if segments is not None else []
+
+    def append(self, vertices, count=1):
+        """Appends vertices repeated count times, segments which are not repeated are joined"""
+        if self.segments:
+            last, last_count = self.segments[-1]
+            if last == vertices:
+                self.segments[-1] = (last, last_count + count)
+                return
+            if last_count == 1 and count == 1:
+                self.segments[-1] = (last + vertices, 1)
+                return
+        self.segments.append((vertices, count))
+
+    def extend(self, path, loop_vertex=None):
+        """
+        Appends path, the vertex ids run after the current end of the compressed path. Its first
+        vertices are merged with the last segment as long as they repeat it. When path ends at
+        loop_vertex, its end is scanned for the iterations of the loop: if the last n iterations
+        (n up to MAX_PERIOD) are repeated, they become a segment. Returns the vertices which were
+        not added, the beginning of one more repetition of the last segment: they are to be given
+        again at the beginning of the next part of the path.
+        """
+        data = path.tobytes()
+        start, end = 0, len(data)
+        if self.segments:
+            last, last_count = self.segments[-1]
+            block = last.tobytes()
+            repetitions = count_repetitions(data, block, start, end)
+            if repetitions:
+                self.segments[-1] = (last, last_count + repetitions)
+                start = repetitions * len(block)
+            if loop_vertex is not None and block.startswith(data[start:end]):
+                return self._to_array(data[start:end])
+        periodic = None
+        if loop_vertex is not None and start < end:
+            periodic = self._find_period(data, start, end, loop_vertex)
+        if periodic is not None:
+            block, repetitions = periodic
+            end -= repetitions * len(block)
+        if start < end:
+            self.append(self._to_array(data[start:end]))
+        if periodic is not None:
+            self.append(self._to_array(block), repetitions)
+        return array('i')
+
+    @staticmethod
+    def _find_period(data, start, end, loop_vertex):
+        """
+        Returns (block, repetitions) for the shortest sequence of iterations of the loop repeated
+        at least twice at the end of data[start:end], None if there is no such sequence
+        """
+        item = array('i', [loop_vertex]).tobytes()
+        size = len(item)
+        occurrence = end - size
+        for _ in range(MAX_PERIOD):
+            # previous visit of the loop vertex, at a position aligned on the vertex ids
+            search_end = occurrence
+            while True:
+                occurrence = data.rfind(item, start, search_end)
+                if occurrence < 0 or occurrence % size == 0:
+                    break
+                search_end = occurrence + size - 1
+            if occurrence < 0:
+                return None
+            block = data[occurrence + size:end]
+            repetitions = count_repetitions(data, block, start, end, backward=True)
+            if repetitions >= 2:
+                return block, repetitions
+        return None
+
+    @staticmethod
+    def _to_array(data):
+        vertices = array('i')
+        vertices.frombytes(data)
+        return vertices
+
+    def iter_vertices(self, max_count=None):
+        for vertices, count in self.segments:
+            if max_count is not None:
+                count = min(count, max_count)
+            for _ in range(count):
+                yield from vertices
+
+    def __iter__(self):
+        return self.iter_vertices()
+
+    def __len__(self):
+        return sum(len(vertices) * count for vertices, count in self.segments)
+
+    def __repr__(self):
+        return 'CompressedPath({!r})'.format(self.segments)
+
+
+def iter_bounded_path(path, max_count=2):
+    """
+    Returns the vertices of an execution path, the repeated segments of a CompressedPath being
+    only repeated max_count times: the criteria which only look at the vertices following each
+    other (not at how many times a loop is taken) cover the same elements on this shorter path.
+    """
+    if isinstance(path, CompressedPath):
+        return path.iter_vertices(max_count)
+    return path
+
+
+class TraceMemo(object):
+    """
+    Runs the distinct test sets of a control flow graph, so that a test set given again is not
+    run again. Test sets are compared by their key (see CompactControlFlowGraph.get_test_set_key),
+    the size most recently used keys being kept (all of them if size is None). With keep_traces,
+    the trace of each key is kept and given again to the test sets with the same key. Otherwise
+    only the keys are kept and those test sets are skipped, as in a CoverageSession where they can
+    not cover anything new: the keys of failed executions are then not kept, so that their error
+    is raised again.
+    The test sets given several times are counted. The counts of the forgotten keys are only kept
+    for the SHOWN_MULTIPLICITIES most given ones, and the hashes of those keys are set in a bitmap
+    to count the test sets run again because their key was forgotten (two keys may share a bit,
+    the count is an upper bound).
+    + properties:
+        - control_flow_graph: the compact control flow graph
+        - size: the number of keys kept
+        - keep_traces: whether the traces of the keys are kept
+        - test_set_count: the number of test sets given
+        - run_count: the number of test sets run
+        - rerun_count: the number of test sets run whose key had been forgotten
+    + methods:
+        - get_trace: returns the trace of a test set, None if it is skipped
+        - iter_traces: yields the traces of test sets, only running the distinct ones
+        - get_multiplicities: returns the test sets given the most times, with their number
+    """
+
+    def __init__(self, control_flow_graph, size=MEMO_SIZE, keep_traces=True):
+        self.control_flow_graph = control_flow_graph.freeze()
+        self.size = size
+        self.keep_traces = keep_traces
+        self.test_set_count = 0
+        self.run_count = 0
+        self.rerun_count = 0
+        self._entries = OrderedDict()  # [trace, number of times] of each key kept
+        self._forgotten = bytearray(FORGOTTEN_BITS // 8 if size is not None else 0)
+        self._forgotten_multiplicities = {}  # the forgotten keys given the most times
+
+    def _get_entry(self, key):
+        """Returns the entry of a key already run, counting the test set, None if it is unknown"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            entry[1] += 1
+        return entry
+
+    def _count_run(self, key):
+        """Counts a test set run, and whether its key was forgotten"""
+        self.run_count += 1
+        if key is not None and self._forgotten:
+            bit = hash(key) % FORGOTTEN_BITS
+            if self._forgotten[bit >> 3] >> (bit & 7) & 1:
+                self.rerun_count += 1
+
+    def _add_trace(self, key, trace, count=1):
+        """Keeps the key of a test set run, given count times, and its trace with keep_traces"""
+        if key is None:
+            return
+        if not self.keep_traces:
+            if trace.error is not None or trace.condition_error is not None:
+                return
+            trace = None
+        count += self._forgotten_multiplicities.pop(key, 0)
+        self._entries[key] = [trace, count]
+        if self.size is None or len(self._entries) <= self.size:
+            return
+        forgotten_key, (_, forgotten_count) = self._entries.popitem(last=False)
+        bit = hash(forgotten_key) % FORGOTTEN_BITS
+        self._forgotten[bit >> 3] |= 1 << (bit & 7)
+        if forgotten_count > 1:
+            multiplicities = self._forgotten_multiplicities
+            multiplicities[forgotten_key] = forgotten_count
+            if len(multiplicities) > SHOWN_MULTIPLICITIES:
+                del multiplicities[min(multiplicities, key=multiplicities.get)]
+
+    def get_trace(self, test_set):
+        """
+        Returns the trace of test_set, running it only if its key is not known. Without
+        keep_traces, returns None if its key is known.
+        """
+        self.test_set_count += 1
+        key = self.control_flow_graph.get_test_set_key(test_set)
+        entry = self._get_entry(key) if key is not None else None
+        if entry is not None:
+            return entry[0]
+        self._count_run(key)
+        trace = self.control_flow_graph.get_trace(test_set)
+        self._add_trace(key, trace)
+        return trace
+
+    def iter_traces(self, test_sets, jobs=1):
+        """
+        Yields the traces of test_sets one by one, test_sets being any iterable read lazily. Only
+        the test sets whose key is not known are run, by jobs processes if jobs > 1, as batches
+        otherwise (see CompactControlFlowGraph.get_all_traces): each test set then gets a cell,
+        filled with its trace once it is known, a test set whose key is being run sharing the cell
+        of the first one. Test sets are run by chunks of test sets read (see
+        CompactControlFlowGraph.get_chunk_size), and a known trace is yielded as soon as no test
+        set read before it is waiting for its trace, so that memory does not grow on a long run of
+        known test sets.
+        Without keep_traces, the test sets whose key is known are skipped.
+        """
+        chunk_size = self.control_flow_graph.get_chunk_size(jobs)
+        cells = deque()  # cell of each test set read and not yielded yet, in order
+        run_cells = deque()  # (key, cell) of each test set run and not returned yet
+        running = {}  # [cell, number of times] of each key being run
+
+        def iter_chunks():
+            chunk = []
+            read_count = 0  # test sets read since the last chunk
+            for test_set in test_sets:
+                self.test_set_count += 1
+                read_count += 1
+                key = self.control_flow_graph.get_test_set_key(test_set)
+                entry = self._get_entry(key) if key is not None else None
+                if entry is not None:
+                    if self.keep_traces:
+                        cells.append([entry[0]])
+                elif key is not None and key in running:
+                    running[key][1] += 1
+                    if self.keep_traces:
+                        cells.append(running[key][0])
+                else:
+                    cell = [None]
+                    cells.append(cell)
+                    run_cells.append((key, cell))
+                    if key is not None:
+                        running[key] = [cell, 1]
+                    self._count_run(key)
+                    chunk.append(test_set)
+                # a known trace with no test set waiting before it is yielded now, the chunk
+                # (empty then) giving the hand back
+                if read_count >= chunk_size or not run_cells:
+                    yield chunk
+                    chunk = []
+                    read_count = 0
+            if chunk:
+                yield chunk
+
+        if jobs > 1:
+            chunks = iter_chunks_in_parallel(
+                self.control_flow_graph, 'get_all_traces', iter_chunks(), jobs
+            )
+        else:
+            # the chunks are run in this process, as batches (see model.batch)
+            chunks = map(self.control_flow_graph.get_all_traces, iter_chunks())
+        for traces in chunks:
+            for trace in traces:
+                key, cell = run_cells.popleft()
+                cell[0] = trace
+                if key is not None:
+                    self._add_trace(key, trace, running.pop(key)[1])
+            while cells and cells[0][0] is not None:
+                yield cells.popleft()[0]
+
+    def get_multiplicities(self):
+        """
+        Returns the (test set, number of times) pairs of the SHOWN_MULTIPLICITIES test sets given
+        the most times, among the ones given several times
+        """
+        multiplicities = [(key, entry[1]) for key, entry in self._entries.items() if entry[1] > 1]
+        multiplicities += self._forgotten_multiplicities.items()
+        multiplicities = heapq.nlargest(
+            SHOWN_MULTIPLICITIES, multiplicities, key=lambda item: item[1]
+        )
+        return [
+            (self.control_flow_graph.get_key_test_set(key), count)
+            for key, count in multiplicities
+        ]
+
+    def __str__(self):
+        to_return = 'Test sets : {} ({} run'.format(self.test_set_count, self.run_count)
+        if self.rerun_count:
+            to_return += ', {} again after their key was forgotten'.format(self.rerun_count)
+        to_return += ')'
+        for test_set, count in self.get_multiplicities():
+            to_return += '\nTest set {} -- x{}'.format(test_set, count)
+        return to_return
+
+
+class TraceStore(object):
+    """
+    Traces of a list of test sets on a control flow graph. Each distinct test set is run once
+    (see TraceMemo), then every criteria is checked against the same traces (see
+    Criteria.check_traces).
+    + properties:
+        - control_flow_graph: the compact control flow graph
+        - memo: the TraceMemo which ran the test sets
+        - traces: the traces, in the test sets order
+    """
+
+    def __init__(self, control_flow_graph, test_sets, jobs=1):
+        self.control_flow_graph = control_flow_graph.freeze()
+        # all the traces are kept, the memo does not need to forget any
+        self.memo = TraceMemo(self.control_flow_graph, None)
+        self.traces = list(self.memo.iter_traces(test_sets, jobs))
@@ -0,0 +1,35 @@
+"""
+Autors: Yoann Gauthier and Thibaut Seys
+Date: 18/10/2026
+
+This file defines the fixtures shared by the tests.
+"""
+import os
+
+import pytest
+
+from model.abstract_syntax_tree import ASTree
+
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Examples')
+
+
+@pytest.fixture
+def parse_program(tmp_path):
+    """Returns the function building the control flow graph of a program source"""
+    def parse(source):
+        path = tmp_path / 'program.txt'
+        path.write_text(source + '\n')
+        return ASTree(str(path)).to_control_flow_graph()
+    return parse
+
+
+@pytest.fixture
+def build_graph(parse_program):
+    """Returns the function building the compact control flow graph of a program source"""
+    return lambda source: parse_program(source).freeze()
+
+
+@pytest.fixture
+def pgcd():
+    return ASTree(os.path.join(EXAMPLES, 'pgcd.txt')).to_control_flow_graph().freeze()
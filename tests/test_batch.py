@@ -0,0 +1,175 @@
+"""
+Autors: Yoann Gauthier and Thibaut Seys
+Date: 18/10/2026
+
+This file tests the batch execution of the test sets against the compiled tracer, test set by
+test set.
+"""
+import random
+from array import array
+
+import pytest
+
+import model.batch
+from model.trace import CompressedPath
+from tests.test_execution import PROGRAMS
+
+pytest.importorskip('numpy')
+
+
+# values the batch runs, and values it gives back to the compiled tracer
+VALUES = [
+    0, 1, 2, 3, -1, -4, 7, True, False, 0.5, 2.0, -1.5, float('inf'), float('nan'),
+    2 ** 53 + 1, -2 ** 53 - 1, 2 ** 62, 2 ** 63 - 1, -2 ** 63, 2 ** 63, 'text', None,
+]
+
+
+@pytest.fixture(autouse=True)
+def small_batches(monkeypatch):
+    """Every run is a batch, which runs until its last member ends"""
+    monkeypatch.setattr(model.batch, 'BATCH_MIN_SIZE', 1)
+    monkeypatch.setattr(model.batch, 'BATCH_MIN_RUNNING', 1)
+
+
+@pytest.fixture(params=['batch', 'resumed after 500 visits', 'resumed under 150 members'])
+def resumed(request, monkeypatch):
+    """Members still running at the end of the batch go on in the compiled tracer"""
+    if request.param == 'resumed after 500 visits':
+        monkeypatch.setattr(model.batch, 'BATCH_VISITS', 500)
+    elif request.param == 'resumed under 150 members':
+        monkeypatch.setattr(model.batch, 'BATCH_MIN_RUNNING', 150)
+
+
+def get_test_sets(graph, seed, values=None, count=200):
+    """Returns random test sets of the program whose execution ends or fails"""
+    generator = random.Random(seed)
+    tracer = graph.get_tracer()
+    test_sets = []
+    while len(test_sets) < count:
+        test_set = {
+            variable: (
+                generator.choice(values) if values is not None else generator.randint(-4, 8)
+            )
+            for variable in graph.variables
+            if generator.random() < 0.95
+        }
+        try:
+            path = tracer(graph.to_environment(test_set), array('i'), limit=2000)
+        except Exception:
+            path = None
+        if path is None or path[-1] == graph.end_vertex:
+            test_sets.append(test_set)
+    return test_sets
+
+
+def describe(trace):
+    if isinstance(trace.path, CompressedPath):
+        path = [(list(vertices), count) for vertices, count in trace.path.segments]
+    else:
+        path = list(trace.path) if trace.path is not None else None
+    return path, trace.conditions, type(trace.error), type(trace.condition_error)
+
+
+def check_traces(graph, test_sets):
+    traces = graph.get_all_traces(test_sets)
+    assert [describe(trace) for trace in traces] == [
+        describe(graph.get_trace(test_set)) for test_set in test_sets
+    ]
+
+
+@pytest.mark.parametrize('source', PROGRAMS)
+def test_integers_are_not_run_again(build_graph, source):
+    graph = build_graph(source)
+    test_sets = [
+        test_set for test_set in get_test_sets(graph, source)
+        if graph.get_trace(test_set).error is None and
+        graph.get_trace(test_set).condition_error is None
+    ]
+    executor = graph.get_batch_executor()
+    paths, conditions, rest, _ = executor._run(test_sets, True, 10 ** 6)
+    assert rest == []
+    for test_set, path, member_conditions in zip(test_sets, paths, conditions):
+        trace = graph.get_trace(test_set)
+        assert (list(path), member_conditions) == (list(trace.path), trace.conditions)
+
+
+@pytest.mark.parametrize('source', PROGRAMS)
+def test_traces(build_graph, resumed, source):
+    graph = build_graph(source)
+    check_traces(graph, get_test_sets(graph, source))
+    check_traces(graph, get_test_sets(graph, source, VALUES))
+
+
+@pytest.mark.parametrize('source', PROGRAMS)
+def test_paths(build_graph, resumed, source):
+    graph = build_graph(source)
+    test_sets = []
+    for test_set in get_test_sets(graph, source, VALUES):
+        try:
+            test_sets.append((test_set, list(graph.get_path(test_set))))
+        except Exception:
+            pass
+    paths = graph.get_all_paths([test_set for test_set, _ in test_sets])
+    assert [list(path) for path in paths] == [path for _, path in test_sets]
+
+
+def test_paths_raise_errors(build_graph):
+    graph = build_graph('1: Y := ( 10 / X )')
+    with pytest.raises(ZeroDivisionError):
+        graph.get_all_paths([{'X': 1}, {'X': 0}, {'X': 2}])
+
+
+@pytest.mark.parametrize('source, test_set', [
+    # int64 overflow, python integers grow
+    ('if 1: ( ( X * X ) > 0 ) then { 2: skip } else { 3: skip }', {'X': 2 ** 32}),
+    ('if 1: ( ( X + 1 ) > 0 ) then { 2: skip } else { 3: skip }', {'X': 2 ** 63 - 1}),
+    ('if 1: ( ( X - 1 ) < 0 ) then { 2: skip } else { 3: skip }', {'X': -2 ** 63}),
+    ('1: Y := ( X * 3 ) ; if 2: ( Y > 0 ) then { 3: skip } else { 4: skip }', {'X': 2 ** 62}),
+    ('if 1: ( X < 0 ) then { 2: skip } else { 3: skip }', {'X': 10 ** 30}),
+    ('if 1: ( X > 0 ) then { 2: skip } else { 3: skip }', {'X': 10 ** 30}),
+    # integers compared to floats and divided exactly
+    ('if 1: ( X > Y ) then { 2: skip } else { 3: skip }', {'X': 2 ** 53 + 1, 'Y': 2.0 ** 53}),
+    ('if 1: ( X = Y ) then { 2: skip } else { 3: skip }', {'X': 2 ** 53 + 1, 'Y': 2.0 ** 53}),
+    ('if 1: ( ( X / 3 ) = Y ) then { 2: skip } else { 3: skip }', {'X': 3 ** 35, 'Y': 3 ** 34}),
+    # division by zero, and by an integer rounded to zero as a float
+    ('if 1: ( ( 1 / X ) > 0 ) then { 2: skip } else { 3: skip }', {'X': 0.0}),
+    ('if 1: ( ( 1 / X ) > 0 ) then { 2: skip } else { 3: skip }', {'X': False}),
+    # not a number, undefined
+    ('if 1: ( X = 1 ) then { 2: skip } else { 3: skip }', {'X': 'text'}),
+    ('1: Y := X ; if 2: ( Z = 1 ) then { 3: skip } else { 4: skip }', {'Z': 1}),
+    # number of the program larger than int64
+    ('if 1: ( X < 100000000000000000000 ) then { 2: skip } else { 3: skip }', {'X': 1}),
+])
+def test_values_run_again(build_graph, source, test_set):
+    graph = build_graph(source)
+    executor = graph.get_batch_executor()
+    assert executor._run([test_set], True, 10 ** 6)[2:] == ([0], {})
+    check_traces(graph, [test_set, {'X': 1, 'Y': 1, 'Z': 1}])
+
+
+def test_mixed_columns(build_graph):
+    """Integer and float members of a column keep their own arithmetic"""
+    graph = build_graph(
+        '1: Y := ( X / 2 ) ; 2: Z := ( X + Y ) ; while 3: ( Z > 1 ) do { 4: Z := ( Z - 1 ) }'
+    )
+    test_sets = [{'X': value} for value in (1, 2.5, 3, True, -2.0, 7, 0.1, 40)]
+    assert graph.get_batch_executor()._run(test_sets, True, 10 ** 6)[2] == []
+    check_traces(graph, test_sets)
+
+
+def test_long_loops_are_accelerated(pgcd, resumed):
+    test_sets = [{'X': value, 'Y': 1} for value in (3, 10 ** 6, 5)] + [{'X': 10 ** 9, 'Y': 1}]
+    traces = pgcd.get_all_traces(test_sets)
+    assert [isinstance(trace.path, CompressedPath) for trace in traces] == [
+        False, True, False, True
+    ]
+    check_traces(pgcd, test_sets)
+    paths = pgcd.get_all_paths([{'X': value, 'Y': 1} for value in (3, 10 ** 4, 5)])
+    assert [len(path) for path in paths] == [8, 3 * 10 ** 4 - 1, 14]
+
+
+def test_iter_traces(pgcd):
+    test_sets = get_test_sets(pgcd, 'iter', count=600)
+    assert [describe(trace) for trace in pgcd.iter_traces(iter(test_sets))] == [
+        describe(pgcd.get_trace(test_set)) for test_set in test_sets
+    ]
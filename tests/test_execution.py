@@ -0,0 +1,136 @@
+"""
+Autors: Yoann Gauthier and Thibaut Seys
+Date: 18/10/2026
+
+This file tests the compiled execution of the programs against the evaluation of the nodes of the
+abstract syntax tree, edge by edge.
+"""
+import random
+from array import array
+
+import pytest
+
+import model.control_flow_graph
+from model.error import ExecutionError
+from model.trace import CompressedPath
+from tests.test_tu import PROGRAMS
+
+
+PROGRAMS = PROGRAMS + [
+    '1: Y := ( X / 2 ) ; if 2: ( ( Y >= 1 ) | ( Z = 0 ) ) then { 3: Z := ( Z - Y ) } else '
+    '{ 4: Z := ( 2 * Z ) } ; while 5: !( Z <= 0 ) do { 6: Z := ( Z - 1 ) }',
+    '1: X := ( 10 / ( X - Y ) ) ; if 2: ( true & !( X < 1 ) ) then { 3: skip } else { 4: skip }',
+]
+
+
+def walk(control_flow_graph, test_set, max_length=2000):
+    """
+    Runs the test set evaluating the nodes of the edges, as the first implementation did.
+    Returns the path and the values, None if the path gets longer than max_length.
+    """
+    values = dict(test_set)
+    vertex = control_flow_graph.root_vertex
+    path = [vertex]
+    while vertex != control_flow_graph.end_vertex:
+        if len(path) > max_length:
+            return None
+        for edge in control_flow_graph.get_child_edges(vertex):
+            if edge.eval(values) is not None:
+                break
+        else:
+            raise ExecutionError
+        vertex = edge.child_vertex
+        path.append(vertex)
+    return path, values
+
+
+def run(function, *args):
+    """Returns the result of function, or the type of the exception it raised"""
+    try:
+        return function(*args)
+    except (ExecutionError, ZeroDivisionError) as error:
+        return type(error)
+
+
+def get_expected(control_flow_graph, seed, count=40):
+    """
+    Returns random test sets of the program whose execution ends, with their path (vertex ids) and
+    final values, or the type of the error they raise
+    """
+    graph = control_flow_graph.freeze()
+    ids = {vertex: index for index, vertex in enumerate(graph.vertices)}
+    generator = random.Random(seed)
+    expected = []
+    while len(expected) < count:
+        test_set = {variable: generator.randint(-4, 8) for variable in graph.variables}
+        if generator.random() < 0.2:
+            # a variable missing from the test set can not be read
+            del test_set[generator.choice(graph.variables)]
+        result = run(walk, control_flow_graph, test_set)
+        if result is None:
+            continue
+        if not isinstance(result, type):
+            path, values = result
+            result = [ids[vertex] for vertex in path], values
+        expected.append((test_set, result))
+    return expected
+
+
+def trace_values(graph, test_set):
+    environment = graph.to_environment(test_set)
+    path = graph.get_tracer()(environment, array('i'))
+    return list(path), graph.to_test_set(environment)
+
+
+@pytest.mark.parametrize('source', PROGRAMS)
+def test_tracer(parse_program, source):
+    control_flow_graph = parse_program(source)
+    graph = control_flow_graph.freeze()
+    for test_set, result in get_expected(control_flow_graph, len(source)):
+        assert run(trace_values, graph, test_set) == result
+        path = run(lambda: list(graph.get_path(test_set)))
+        assert path == (result if isinstance(result, type) else result[0])
+
+
+@pytest.mark.parametrize('steps', [1, 3, 8, 1 << 14])
+@pytest.mark.parametrize('source', PROGRAMS)
+def test_traces(parse_program, monkeypatch, source, steps):
+    # the traces are stopped, accelerated and compressed every steps steps
+    monkeypatch.setattr(model.control_flow_graph, 'ACCELERATION_STEPS', steps)
+    control_flow_graph = parse_program(source)
+    graph = control_flow_graph.freeze()
+    expected = get_expected(control_flow_graph, len(source))
+    traces = graph.get_all_traces([test_set for test_set, _ in expected])
+    for (test_set, result), trace in zip(expected, traces):
+        if isinstance(result, type):
+            assert isinstance(trace.error, result)
+        else:
+            assert trace.error is None
+            assert list(trace.path) == result[0]
+
+
+def test_copied_values_are_not_converted(build_graph):
+    graph = build_graph('1: Y := X ; 2: Z := Y')
+    for value in (True, 'text', 1.5):
+        assert trace_values(graph, {'X': value})[1] == {'X': value, 'Y': value, 'Z': value}
+
+
+def test_long_loop_is_accelerated(pgcd):
+    trace = pgcd.get_trace({'X': 10 ** 9, 'Y': 1})
+    assert isinstance(trace.path, CompressedPath)
+    assert len(trace.path) == 3 * 10 ** 9 - 1
+    assert trace.conditions == {(0, False), (0, True), (1, False)}
+
+
+def test_long_chains(build_graph):
+    """Operands are not put between parentheses, python can not compile 200 nested ones"""
+    graph = build_graph(
+        '1: X := ( X' + ' + 1' * 250 + ' ) ; if 2: ( ( X < 0 )' +
+        ''.join(' | ( X = {} )'.format(value) for value in range(250)) +
+        ' ) then { 3: Y := 1 } else { 4: Y := 2 }'
+    )
+    assert trace_values(graph, {'X': 0}) == ([0, 1, 3, 4], {'X': 250, 'Y': 2})
+    assert trace_values(graph, {'X': -1}) == ([0, 1, 2, 4], {'X': 249, 'Y': 1})
+    trace = graph.get_trace({'X': -250})
+    assert list(trace.path) == [0, 1, 2, 4]
+    assert trace.conditions == {(0, False), (1, True)} | {(atom, False) for atom in range(2, 251)}
@@ -0,0 +1,116 @@
+"""
+Autors: Yoann Gauthier and Thibaut Seys
+Date: 18/10/2026
+
+This file tests the i loop paths (iTB) against the first implementation, which rescanned the
+whole path at every step.
+"""
+import pytest
+
+from model.criteria import iTB
+
+
+NESTED = (
+    'while 1: ( X < 3 ) do { while 2: ( Y < 3 ) do { if 3: ( Y = 1 ) then { 4: Y := ( Y + 1 ) } '
+    'else { 5: skip } } ; 6: X := ( X + 1 ) }'
+)
+SEQUENCE = (
+    'while 1: ( X < 3 ) do { 2: X := ( X + 1 ) } ; while 3: ( Y < 3 ) do { 4: Y := ( Y + 1 ) }'
+)
+TRIPLE = (
+    'while 1: ( X < 3 ) do { while 2: ( Y < 3 ) do { while 3: ( Z < 3 ) do '
+    '{ 4: Z := ( Z + 1 ) } } }'
+)
+# a loop containing two successive loops, the only case where the rule changed
+SUCCESSIVE = (
+    'while 1: ( X < 3 ) do { while 2: ( Y < 3 ) do { 3: Y := ( Y + 1 ) } ; '
+    'while 4: ( Z < 3 ) do { 5: Z := ( Z + 1 ) } ; 6: X := ( X + 1 ) }'
+)
+
+
+def is_over(operations, i, path):
+    """The check of the first implementation, on the whole path"""
+    pile = [vertex for vertex in path if operations[vertex] == 'while']
+    if not pile:
+        return False
+    lengths = {vertex: 0 for vertex in pile}
+    memory = [pile[0]]
+    previous = pile[0]
+    for vertex in pile:
+        if vertex == previous:
+            lengths[vertex] += 1
+            if lengths[vertex] > i + 1:
+                return True
+        else:
+            if vertex not in memory:
+                memory.append(vertex)
+                lengths[vertex] = 1
+            else:
+                memory.remove(previous)
+                lengths[vertex] += 1
+                lengths[previous] = 0
+                if lengths[vertex] > i + 1:
+                    return True
+            previous = vertex
+    return False
+
+
+def get_reference_paths(graph, i, max_length=200):
+    """The i loop paths of the first implementation, None if one is longer than max_length"""
+    paths = set()
+    path = []
+
+    def search(vertex):
+        path.append(vertex)
+        if len(path) > max_length:
+            return False
+        if not is_over(graph.vertex_operations, i, path):
+            if vertex == graph.end_vertex:
+                paths.add(tuple(path))
+            elif not all(search(child) for child in graph.get_child_vertices(vertex)):
+                return False
+        path.pop()
+        return True
+
+    return paths if search(graph.root_vertex) else None
+
+
+@pytest.mark.parametrize('source', [NESTED, SEQUENCE, TRIPLE])
+@pytest.mark.parametrize('i', [0, 1, 2])
+def test_same_paths_as_first_implementation(build_graph, source, i):
+    graph = build_graph(source)
+    paths = [tuple(path) for path in graph.iter_i_loop_paths(i)]
+    assert len(paths) == len(set(paths))
+    assert set(paths) == get_reference_paths(graph, i)
+    assert graph.count_i_loop_paths(i) == len(paths)
+
+
+@pytest.mark.parametrize('i', [0, 1, 2, 3])
+def test_pgcd_paths(pgcd, i):
+    paths = [tuple(path) for path in pgcd.iter_i_loop_paths(i)]
+    assert set(paths) == get_reference_paths(pgcd, i)
+    assert all(pgcd.is_i_loop_path(path, i) for path in paths)
+
+
+def test_successive_inner_loops(build_graph):
+    """
+    Coming back to the outer loop ends the rows of both inner loops. The first implementation
+    only ended the row of the last one: the outer loop then started its row again, so there
+    were more paths for i = 1 and no end to them for i = 2.
+    """
+    graph = build_graph(SUCCESSIVE)
+    assert [graph.count_i_loop_paths(i) for i in range(4)] == [1, 5, 91, 4369]
+    assert len(get_reference_paths(graph, 1)) == 9
+    assert get_reference_paths(graph, 2) is None
+    for i in range(3):
+        paths = list(graph.iter_i_loop_paths(i))
+        assert len(paths) == graph.count_i_loop_paths(i)
+        assert all(graph.is_i_loop_path(path, i) for path in paths)
+
+
+def test_itb_on_pgcd(pgcd):
+    criteria = iTB(1, sample_size=None)
+    # {'X': 3, 'Y': 1} goes three times through the loop vertex, it is not an i loop path
+    criteria.check(pgcd, [{'X': 1, 'Y': 1}, {'X': 2, 'Y': 1}, {'X': 3, 'Y': 1}])
+    assert criteria.get_to_cover_count() == 3
+    assert criteria.get_covered_count() == 2
@@ -0,0 +1,79 @@
+"""
+Autors: Yoann Gauthier and Thibaut Seys
+Date: 18/10/2026
+
+This file tests the precedence and associativity of the operators read by ProgramParser.
+"""
+import pytest
+
+from model.error import ParsingError
+from model.parser import ProgramParser
+from model.tokenizer import Tokenizer
+
+
+def parse(source):
+    return ProgramParser(Tokenizer.tokenize(source)).parse()
+
+
+def parse_condition(condition):
+    """Returns the dict of the condition of a while statement"""
+    return parse('while 1: {} do 2: skip'.format(condition)).to_dict()['1: while']
+
+
+def variable(name):
+    return {'variable': name}
+
+
+def test_arithmetic_operators_are_left_associative():
+    assert parse('1: X := ( X - Y + 2 * Z )').to_dict()['1: assignment']['right'] == {
+        'arithmetic operator': '*',
+        'left': {
+            'arithmetic operator': '+',
+            'left': {'arithmetic operator': '-', 'left': variable('X'), 'right': variable('Y')},
+            'right': {'number': 2},
+        },
+        'right': variable('Z'),
+    }
+
+
+def test_boolean_operators_are_left_associative():
+    assert parse_condition('( true & false | !( X = 1 ) )') == {
+        'boolean operator': 'or',
+        'left': {
+            'boolean operator': 'and', 'left': {'boolean': 'true'}, 'right': {'boolean': 'false'}
+        },
+        'right': {'not': {'comparator': '=', 'left': variable('X'), 'right': {'number': 1}}},
+    }
+
+
+def test_comparator_binds_tighter_than_boolean_operators():
+    assert parse_condition('( X < Y & ( Z >= 2 ) )') == {
+        'boolean operator': 'and',
+        'left': {'comparator': '<', 'left': variable('X'), 'right': variable('Y')},
+        'right': {'comparator': '>=', 'left': variable('Z'), 'right': {'number': 2}},
+    }
+
+
+def test_deep_nesting():
+    depth = 20000
+    node = parse('1: X := ' + '( ' * depth + 'X' + ' + 1 )' * depth)
+    assert node.is_program()
+    node = parse('while 1: ' + '!( ' * depth + 'X < 1' + ' )' * depth + ' do 2: skip')
+    assert node.is_program()
+
+
+@pytest.mark.parametrize('source', [
+    '1: X := ( X + Y < Z )',
+    '1: X := ( X < Y )',
+    'while 1: ( X + 1 ) do 2: skip',
+    'while 1: ( X < Y < Z ) do 2: skip',
+    'while 1: ( X < Y + 1 ) do 2: skip',
+    'while 1: ( ( X < Y ) + 1 ) do 2: skip',
+    'while 1: ( X & Y ) do 2: skip',
+    '1: X := ( X Y )',
+    '1: skip 2: skip',
+    '1: skip ;',
+])
+def test_rejected(source):
+    with pytest.raises(ParsingError):
+        parse(source)
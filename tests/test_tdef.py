@@ -0,0 +1,87 @@
+"""
+Autors: Yoann Gauthier and Thibaut Seys
+Date: 18/10/2026
+
+This file tests the definitions covered by TDef against the first implementation, which scanned
+the whole pile of definitions at every reference.
+"""
+import os
+import random
+
+import pytest
+
+from model.criteria import TDef
+from model.testsets import iter_test_sets
+from tests.conftest import EXAMPLES
+from tests.test_tu import PROGRAMS
+
+
+PROGRAMS = PROGRAMS + [
+    # definitions following each other before a reference: the first implementation removed the
+    # first one from the pile while scanning it, so that the second one was skipped
+    '1: Y := X ; 2: Y := 1 ; 3: Z := Y ; 4: Z := ( Z + 1 )',
+    # loops defining a variable again before using it
+    '1: Y := 0 ; while 2: ( X > 0 ) do { 3: Y := ( X * 2 ) ; 4: Y := ( Y + 1 ) ; '
+    '5: X := ( X - 1 ) } ; 6: Z := Y',
+    '1: Z := 0 ; while 2: ( X > 0 ) do { 3: Y := X ; 4: X := ( X - 1 ) ; 5: Y := ( Y + Z ) ; '
+    'if 6: ( Y < 3 ) then { 7: Z := Y } else { 8: Z := 1 } }',
+]
+
+
+def get_reference_covered(control_flow_graph, paths):
+    """The covered definitions of the first implementation, as (variable, vertex id) pairs"""
+    vertices = control_flow_graph.freeze().vertices
+    covered = []
+    for path in paths:
+        pile = []
+        for vertex in (vertices[vertex_id] for vertex_id in path):
+            for variable in control_flow_graph.get_ref_variables(vertex):
+                for element in pile:
+                    if variable == element[0] and element not in covered:
+                        covered.append(element)
+                        pile.remove(element)
+            for variable in control_flow_graph.get_def_variables(vertex):
+                pile.append((variable, vertex))
+    ids = {vertex: index for index, vertex in enumerate(vertices)}
+    return {(variable, ids[vertex]) for variable, vertex in covered}
+
+
+def check(control_flow_graph, test_sets):
+    graph = control_flow_graph.freeze()
+    paths = [list(graph.get_path(test_set)) for test_set in test_sets]
+    criteria = TDef()
+    criteria.check_criteria_against_paths(graph, paths)
+    assert len(criteria.covered) == len(set(criteria.covered))
+    assert set(criteria.covered) == get_reference_covered(control_flow_graph, paths)
+    return criteria
+
+
+@pytest.mark.parametrize('test_sets_file', [
+    'pgcd_test_sets_{}.json'.format(number) for number in range(1, 6)
+])
+def test_pgcd(parse_program, test_sets_file):
+    with open(os.path.join(EXAMPLES, 'pgcd.txt')) as program_file:
+        control_flow_graph = parse_program(program_file.read())
+    check(control_flow_graph, iter_test_sets(os.path.join(EXAMPLES, test_sets_file)))
+
+
+@pytest.mark.parametrize('source', PROGRAMS)
+def test_programs(parse_program, source):
+    control_flow_graph = parse_program(source)
+    generator = random.Random(source)
+    for _ in range(20):
+        test_sets = [
+            {variable: generator.randint(1, 6) for variable in 'XYZ'}
+            for _ in range(generator.randint(1, 4))
+        ]
+        check(control_flow_graph, test_sets)
+
+
+def test_skipped_definition(parse_program):
+    control_flow_graph = parse_program(PROGRAMS[-3])
+    graph = control_flow_graph.freeze()
+    criteria = check(control_flow_graph, [{'X': 1}])
+    # Y is referenced once, after Y := X and Y := 1: the scan of the pile skips Y := 1
+    assert sorted(
+        (variable, graph.labels[vertex]) for variable, vertex in criteria.covered
+    ) == [('Y', 1), ('Z', 3)]
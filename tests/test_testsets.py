@@ -0,0 +1,70 @@
+"""
+Autors: Yoann Gauthier and Thibaut Seys
+Date: 18/10/2026
+
+This file tests the lazy readers of the test sets files against json.
+"""
+from json import JSONDecodeError, dumps, load
+
+import pytest
+
+from model.testsets import iter_test_sets
+
+
+TEST_SETS = [
+    {'X': 1, 'Y': 2},
+    {'X': -3, 'Y': 0.5, 'name': 'a "quoted" ] string, with {braces}'},
+    {'X': [1, [2, 3]], 'Y': {'nested': {'Z': None}}},
+    {},
+]
+
+
+def write(tmp_path, text):
+    path = tmp_path / 'test_sets.json'
+    path.write_text(text)
+    return str(path)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 7, 1 << 16])
+def test_json_array(tmp_path, chunk_size):
+    path = write(tmp_path, ' \n' + dumps(TEST_SETS, indent=2) + '\n\n')
+    with open(path) as test_sets_file:
+        assert load(test_sets_file) == TEST_SETS
+    assert list(iter_test_sets(path, chunk_size)) == TEST_SETS
+
+
+def test_empty_json_array(tmp_path):
+    assert list(iter_test_sets(write(tmp_path, '[ ]'))) == []
+
+
+def test_json_lines(tmp_path):
+    text = '\n'.join(dumps(test_set) for test_set in TEST_SETS)
+    path = write(tmp_path, text.replace('\n', '\n\n', 1) + '\n')
+    assert list(iter_test_sets(path)) == TEST_SETS
+
+
+def test_json_lines_error_gives_the_line(tmp_path):
+    path = write(tmp_path, '{"X": 1}\n{"X": \n')
+    with pytest.raises(JSONDecodeError, match='line 2'):
+        list(iter_test_sets(path))
+
+
+@pytest.mark.parametrize('chunk_size', [1, 4, 1 << 16])
+def test_truncated_json_array(tmp_path, chunk_size):
+    text = dumps(TEST_SETS)
+    path = write(tmp_path, text[:len(text) // 2])
+    with pytest.raises(JSONDecodeError):
+        list(iter_test_sets(path, chunk_size))
+
+
+@pytest.mark.parametrize('text', ['[{"X": 1}] x', '[{"X": 1}]\n[{"X": 2}]', '[{"X": 1}],'])
+@pytest.mark.parametrize('chunk_size', [1, 4, 1 << 16])
+def test_data_after_json_array(tmp_path, text, chunk_size):
+    with pytest.raises(ValueError, match='Extra data'):
+        list(iter_test_sets(write(tmp_path, text), chunk_size))
+
+
+@pytest.mark.parametrize('text', ['[{"X": 1},]', '[,{"X": 1}]', '[{"X": 1}}]'])
+def test_invalid_json_array(tmp_path, text):
+    with pytest.raises(JSONDecodeError):
+        list(iter_test_sets(write(tmp_path, text)))
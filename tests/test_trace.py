@@ -0,0 +1,100 @@
+"""
+Autors: Yoann Gauthier and Thibaut Seys
+Date: 18/10/2026
+
+This file tests the traces of the test sets given several times (TraceMemo).
+"""
+import tracemalloc
+
+import pytest
+
+from model.criteria import TA, TDef
+from model.error import ExecutionError
+from model.session import CoverageSession
+from model.trace import SHOWN_MULTIPLICITIES, TraceMemo
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_iter_traces(pgcd, jobs):
+    test_sets = [{'X': value % 7 + 1, 'Y': value % 5 + 1} for value in range(2000)]
+    test_sets += [{'X': 1}, {'X': 1, 'Y': 1.0}, {'X': 1, 'Y': True}] * 3
+    memo = TraceMemo(pgcd)
+    traces = list(memo.iter_traces(iter(test_sets), jobs))
+    assert len(traces) == len(test_sets)
+    for test_set, trace in zip(test_sets, traces):
+        expected = pgcd.get_trace(test_set)
+        assert type(trace.error) == type(expected.error)
+        assert trace.path is None and expected.path is None or trace.path == expected.path
+    assert memo.test_set_count == len(test_sets)
+    assert memo.run_count == 35 + 3
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_memory_of_repeated_test_sets(pgcd, jobs):
+    """A test set given again does not wait in memory for the next test set to run"""
+    def get_peak(count):
+        memo = TraceMemo(pgcd)
+        test_sets = ({'X': 4, 'Y': 6} if index else {'X': 9, 'Y': 6} for index in range(count))
+        tracemalloc.start()
+        for _ in memo.iter_traces(test_sets, jobs):
+            pass
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        assert memo.run_count == 2
+        return peak
+
+    assert get_peak(100000) < 2 * get_peak(10000) + 100000
+
+
+def test_forgotten_keys(pgcd):
+    memo = TraceMemo(pgcd, size=2)
+    for value in [1, 1, 2, 3, 1, 4, 1]:
+        memo.get_trace({'X': value, 'Y': 1})
+    # X = 1 is forgotten after X = 3, given twice before
+    assert (memo.run_count, memo.rerun_count) == (5, 1)
+    assert memo.get_multiplicities() == [({'X': 1, 'Y': 1}, 4)]
+    assert str(memo).split('\n')[0] == (
+        'Test sets : 7 (5 run, 1 again after their key was forgotten)'
+    )
+
+
+def test_bounded_multiplicities(pgcd):
+    memo = TraceMemo(pgcd, size=4)
+    list(memo.iter_traces({'X': value // 3 + 1, 'Y': 1} for value in range(300)))
+    assert memo.run_count == 100
+    multiplicities = memo.get_multiplicities()
+    assert len(multiplicities) == SHOWN_MULTIPLICITIES
+    assert all(count == 3 for _, count in multiplicities)
+    assert len(memo._forgotten_multiplicities) <= SHOWN_MULTIPLICITIES
+
+
+def test_session_keeps_no_traces(pgcd):
+    session = CoverageSession(pgcd, [TA()])
+    test_sets = [{'X': value, 'Y': 1} for value in range(1000, 1200)]
+    tracemalloc.start()
+    session.add_all(test_sets)
+    # the traces of a chunk are run at once, only the memory kept after them is measured
+    kept = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # the paths of the 200 traces take 2.5 MB
+    assert kept < 1000000
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_session_skips_known_test_sets(pgcd, jobs):
+    session = CoverageSession(pgcd, [TA(), TDef()])
+    test_sets = [{'X': value, 'Y': value % 7 + 1} for value in range(1, 501)]
+    session.add_all(test_sets + test_sets[:100], jobs)
+    assert session.test_set_count == 600
+    assert (session.memo.test_set_count, session.memo.run_count) == (600, 500)
+    assert not session.add(test_sets[0])
+    assert session.test_set_count == 601
+    assert session.memo.run_count == 500
+
+
+def test_session_raises_failed_test_sets_again(pgcd):
+    session = CoverageSession(pgcd, [TA()])
+    for _ in range(2):
+        with pytest.raises(ExecutionError):
+            session.add({'X': 1})
+    assert session.memo.run_count == 2
@@ -0,0 +1,117 @@
+"""
+Autors: Yoann Gauthier and Thibaut Seys
+Date: 18/10/2026
+
+This file tests the def-use pairs of TU against a search on the control flow graph.
+"""
+import os
+import random
+
+import pytest
+
+from model.criteria import TU
+from model.testsets import iter_test_sets
+from tests.conftest import EXAMPLES
+
+
+PROGRAMS = [
+    'while 1 : !( X = Y ) do if 2 : !( X <= Y ) then 3 : X := ( X - Y ) else 4 : Y := ( Y - X )',
+    '1: Z := 0 ; while 2: ( X > 0 ) do { if 3: ( ( Z < 5 ) & !( Y = X ) ) then { 4: Z := ( Z + X ) '
+    '} else { 5: Y := ( Y + 1 ) } ; 6: X := ( X - 1 ) } ; 7: X := ( Z * Y )',
+    '1: Y := X ; if 2: ( Y < 0 ) then { 3: Y := ( 0 - Y ) } else { 4: skip } ; '
+    '5: Z := ( Y * Y ) ; 6: Z := ( Z + X )',
+    '1: I := 0 ; while 2: ( I < X ) do { 3: J := 0 ; while 4: ( J < I ) do { 5: Y := ( Y + J ) ; '
+    '6: J := ( J + 1 ) } ; 7: I := ( I + 1 ) }',
+]
+
+
+def get_reference_pairs(control_flow_graph):
+    """
+    The (variable, def vertex, use vertex) pairs for which a path from the definition reaches the
+    use without defining the variable again, found by a search from each definition
+    """
+    vertices = control_flow_graph.freeze().vertices
+    ids = {vertex: index for index, vertex in enumerate(vertices)}
+    pairs = set()
+    for def_vertex in vertices:
+        for variable in control_flow_graph.get_def_variables(def_vertex):
+            pile = [edge.child_vertex for edge in control_flow_graph.get_child_edges(def_vertex)]
+            seen = set()
+            while pile:
+                vertex = pile.pop()
+                if vertex in seen:
+                    continue
+                seen.add(vertex)
+                if variable in control_flow_graph.get_ref_variables(vertex):
+                    pairs.add((variable, ids[def_vertex], ids[vertex]))
+                if variable not in control_flow_graph.get_def_variables(vertex):
+                    pile += [
+                        edge.child_vertex for edge in control_flow_graph.get_child_edges(vertex)
+                    ]
+    return pairs
+
+
+def get_reference_covered(control_flow_graph, pairs, path):
+    """The pairs whose use follows the definition in path, without definition in between"""
+    vertices = control_flow_graph.freeze().vertices
+    covered = set()
+    for variable, def_vertex, use_vertex in pairs:
+        for start, vertex in enumerate(path):
+            if vertex != def_vertex:
+                continue
+            for position in range(start + 1, len(path)):
+                if path[position] == use_vertex:
+                    covered.add((variable, def_vertex, use_vertex))
+                    break
+                if variable in control_flow_graph.get_def_variables(vertices[path[position]]):
+                    break
+    return covered
+
+
+def get_labels(graph, pairs):
+    return sorted((variable, graph.labels[def_vertex], graph.labels[use_vertex])
+                  for variable, def_vertex, use_vertex in pairs)
+
+
+def test_pgcd_pairs(pgcd):
+    assert get_labels(pgcd, pgcd.get_def_use_pairs()) == [
+        ('X', 3, 1), ('X', 3, 2), ('X', 3, 3), ('X', 3, 4),
+        ('Y', 4, 1), ('Y', 4, 2), ('Y', 4, 3), ('Y', 4, 4),
+    ]
+
+
+@pytest.mark.parametrize('test_sets_file, coverage, not_covered', [
+    ('pgcd_test_sets_2.json', 25.0, [
+        ('X', 3, 2), ('X', 3, 3), ('X', 3, 4),
+        ('Y', 4, 2), ('Y', 4, 3), ('Y', 4, 4),
+    ]),
+    ('pgcd_test_sets_5.json', 87.5, [('Y', 4, 4)]),
+])
+def test_pgcd_coverage(pgcd, test_sets_file, coverage, not_covered):
+    criteria = TU()
+    criteria.check(pgcd, list(iter_test_sets(os.path.join(EXAMPLES, test_sets_file))))
+    assert criteria.get_coverage() == coverage
+    assert get_labels(pgcd, set(criteria.to_cover) - set(criteria.covered)) == not_covered
+
+
+@pytest.mark.parametrize('source', PROGRAMS)
+def test_pairs(parse_program, source):
+    control_flow_graph = parse_program(source)
+    graph = control_flow_graph.freeze()
+    pairs = graph.get_def_use_pairs()
+    assert len(pairs) == len(set(pairs))
+    assert set(pairs) == get_reference_pairs(control_flow_graph)
+
+
+@pytest.mark.parametrize('source', PROGRAMS)
+def test_covered_pairs(parse_program, source):
+    control_flow_graph = parse_program(source)
+    graph = control_flow_graph.freeze()
+    pairs = get_reference_pairs(control_flow_graph)
+    generator = random.Random(0)
+    for _ in range(30):
+        test_set = {variable: generator.randint(1, 6) for variable in graph.variables}
+        path = list(graph.get_path(test_set))
+        criteria = TU()
+        criteria.check(graph, [test_set])
+        assert set(criteria.covered) == get_reference_covered(control_flow_graph, pairs, path)